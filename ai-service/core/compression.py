@@ -0,0 +1,66 @@
+"""
+Zstd Response Compression
+Nén response JSON lớn (contexts của RAG) trên đường ai-service -> backend
+"""
+from typing import Optional
+
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class ZstdMiddleware:
+    """
+    ASGI middleware nén response bằng zstd khi client gửi `Accept-Encoding: zstd`
+
+    Chỉ nén response một khối (không streaming) có kích thước >= minimum_size.
+    Response streaming (SSE) hoặc đã có Content-Encoding được giữ nguyên.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 3) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "zstd" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        body_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, body_started
+
+            if message["type"] == "http.response.start":
+                # Giữ lại headers cho tới khi biết body có nén được không
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or body_started:
+                await send(message)
+                return
+
+            body_started = True
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self.compressor.compress(body)
+            headers["Content-Encoding"] = "zstd"
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
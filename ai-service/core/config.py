@@ -22,6 +22,15 @@ class Settings(BaseSettings):
     QDRANT_COLLECTION_NAME: str = "jvb_embeddings"
     QDRANT_API_KEY: Optional[str] = None
     QDRANT_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = True  # gRPC: vectors travel as binary protobuf instead of JSON
+    QDRANT_HNSW_M: int = 16  # HNSW graph degree used when creating the collection
+    QDRANT_HNSW_EF_CONSTRUCT: int = 128  # HNSW build-time beam width
+    QDRANT_HNSW_EF: int = 128  # HNSW beam width at search time (higher = better recall, slower)
+    QDRANT_ENABLE_QUANTIZATION: bool = True  # int8 scalar quantization for the vector index
+    # int8: 1 byte/dim (~4x nhỏ hơn float32); binary: 1 bit/dim (~32x, so khớp bằng XOR + popcount),
+    # nên tăng oversampling (~3.0) để rescore bù recall. Chỉ áp dụng khi tạo collection mới
+    QDRANT_QUANTIZATION_TYPE: str = "int8"
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0  # Fetch N x limit candidates, then rescore
     
     
     # Cohere Settings (Embeddings & LLM)
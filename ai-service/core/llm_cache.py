@@ -15,6 +15,9 @@ from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Version tăng mỗi khi vector trong Qdrant thay đổi (ingest/xóa document)
+DOCUMENTS_VERSION_KEY = "rag:documents_version"
+
 
 class LLMCacheManager:
     """Cache manager for deterministic or near-deterministic helper LLM tasks."""
@@ -101,5 +104,29 @@ class LLMCacheManager:
         self._memory_cache[key] = (time.time() + ttl, serialized)
         return redis_ok or True
 
+    def get_version(self, key: str) -> Optional[int]:
+        """
+        Đọc version counter dùng chung giữa các worker (Redis)
+
+        Trả None khi không có Redis: cache in-process dựa trên version không
+        invalidate được ở worker khác, nên caller không được cache.
+        """
+        if not (self.enabled and self.client):
+            return None
+        try:
+            return int(self.client.get(key) or 0)
+        except Exception as e:
+            logger.debug(f"Version read failed: {e}")
+            return None
+
+    def bump_version(self, key: str) -> None:
+        """Tăng version counter -> mọi cache gắn version cũ trên mọi worker bị bỏ qua"""
+        if not (self.enabled and self.client):
+            return
+        try:
+            self.client.incr(key)
+        except Exception as e:
+            logger.warning(f"Version bump failed: {e}")
+
 
 llm_cache = LLMCacheManager()
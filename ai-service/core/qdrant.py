@@ -3,7 +3,18 @@ Qdrant Client Manager
 Quản lý kết nối đến Qdrant vector database
 """
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    VectorParams,
+    HnswConfigDiff,
+    SearchParams,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+)
 from core.config import settings
 
 
@@ -22,9 +33,10 @@ class QdrantManager:
                 host=settings.QDRANT_HOST,
                 port=settings.QDRANT_PORT,
                 api_key=settings.QDRANT_API_KEY,
+                grpc_port=settings.QDRANT_GRPC_PORT,
                 timeout=30,
                 https=False,  # Local Qdrant không dùng HTTPS
-                prefer_grpc=False  # Dùng HTTP REST API thay vì gRPC
+                prefer_grpc=settings.QDRANT_PREFER_GRPC  # gRPC: vector nhị phân thay vì JSON
             )
             
             # Create collection if not exists
@@ -49,7 +61,14 @@ class QdrantManager:
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=settings.VECTOR_DIMENSION,
-                        distance=Distance.COSINE
+                        distance=Distance.COSINE,
+                        # Vector gốc để trên disk khi đã có bản quantized trong RAM
+                        on_disk=settings.QDRANT_ENABLE_QUANTIZATION
+                    ),
+                    quantization_config=self._quantization_config(),
+                    hnsw_config=HnswConfigDiff(
+                        m=settings.QDRANT_HNSW_M,
+                        ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT
                     )
                 )
                 
@@ -61,6 +80,42 @@ class QdrantManager:
             print(f"❌ Collection setup error: {e}")
             raise
     
+    def _quantization_config(self):
+        """int8 scalar hoặc binary quantization, kept in RAM (None if disabled)"""
+        if not settings.QDRANT_ENABLE_QUANTIZATION:
+            return None
+        if settings.QDRANT_QUANTIZATION_TYPE == "binary":
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=True)
+            )
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+    
+    def get_search_params(self) -> SearchParams:
+        """
+        Search params cho ANN search: HNSW ef + quantized search với rescoring
+        
+        Rescore trên vector gốc sau khi oversample để giữ recall.
+        """
+        quantization = None
+        if settings.QDRANT_ENABLE_QUANTIZATION:
+            quantization = QuantizationSearchParams(
+                ignore=False,
+                rescore=True,
+                oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING
+            )
+        
+        return SearchParams(
+            hnsw_ef=settings.QDRANT_HNSW_EF,
+            exact=False,
+            quantization=quantization
+        )
+    
     def disconnect(self):
         """Disconnect from Qdrant"""
         if self.client:
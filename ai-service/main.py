@@ -4,14 +4,17 @@ Microservice xử lý AI operations: Embeddings, RAG, Document Processing
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from datetime import datetime
 
 from core.config import settings
+from core.compression import ZstdMiddleware
 from core.qdrant import qdrant_manager
 from core.memory import memory_manager
 from core.llm_cache import llm_cache
 from routers import embedding, rag, document
+from services.rag_service import rag_service
 
 # Import new multi-agent router
 try:
@@ -49,6 +52,9 @@ async def lifespan(app: FastAPI):
         print("🧠 Connecting LLM Cache...")
         llm_cache.connect()
     
+    # Background worker for request metrics (keeps logging off the response path)
+    rag_service.start_metrics_worker()
+    
     print("✅ AI Service started successfully!")
     print(f"📡 Listening on {settings.HOST}:{settings.PORT}")
     print("=" * 60)
@@ -57,6 +63,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("🛑 Shutting down AI Service...")
+    await rag_service.stop_metrics_worker()
     qdrant_manager.disconnect()
     
     if settings.ENABLE_MULTI_AGENT:
@@ -73,7 +80,9 @@ app = FastAPI(
     title=settings.SERVICE_NAME,
     description="AI Processing Service - Embeddings, RAG, Document Processing",
     version=settings.SERVICE_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson encode nhanh hơn json chuẩn - đáng kể với vector embeddings, RAG contexts
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -85,6 +94,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Nén response JSON lớn (RAG contexts) khi backend gửi Accept-Encoding: zstd
+app.add_middleware(ZstdMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(embedding.router)
 app.include_router(rag.router)
@@ -3,8 +3,10 @@ Multi-Agent Router
 API endpoints for Multi-Agent AI System
 """
 from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from pydantic import BaseModel
+import asyncio
 import json
 
 from services.master_orchestrator import master_orchestrator
@@ -13,6 +15,9 @@ from core.config import settings
 
 router = APIRouter(prefix="/api/agent", tags=["multi-agent"])
 
+# Khoảng gửi SSE comment giữ kết nối trong lúc agent xử lý (giây)
+STREAM_HEARTBEAT_INTERVAL = 10.0
+
 
 # ============================================
 # Request/Response Models
@@ -68,6 +73,48 @@ class ChatHistoryResponse(BaseModel):
     user_id: str
 
 
+# ============================================
+# Helpers
+# ============================================
+
+def _build_query_context(request: AgentQueryRequest) -> dict:
+    """
+    Build orchestrator context từ AgentQueryRequest
+    """
+    return {
+        "document_ids": request.document_ids or [],
+        "top_k": request.top_k,
+        "score_threshold": request.score_threshold,
+        "chat_history": request.chat_history or [],
+        "conversation_summary": request.conversation_summary,
+        "source_ids": request.source_ids or [],
+        "source_metadata": request.source_metadata or [],
+        "trace_id": request.trace_id,
+        "persisted_by_backend": bool(request.persisted_by_backend),
+    }
+
+
+def _to_agent_response(result: dict) -> AgentQueryResponse:
+    """
+    Map kết quả orchestrator sang AgentQueryResponse
+    """
+    return AgentQueryResponse(
+        answer=result.get("answer", ""),
+        intent=result.get("intent", "unknown"),
+        agent_used=result.get("agent_used", "unknown"),
+        preprocessing=result.get("preprocessing", {}),
+        metadata=result.get("metadata", {}),
+        processing_time=result.get("processing_time", 0)
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """
+    Format một Server-Sent Event
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
 # ============================================
 # Endpoints
 # ============================================
@@ -104,35 +151,15 @@ async def agent_query(request: AgentQueryRequest):
                 detail="Multi-Agent system is not enabled"
             )
         
-        # Build context
-        context = {
-            "document_ids": request.document_ids or [],
-            "top_k": request.top_k,
-            "score_threshold": request.score_threshold,
-            "chat_history": request.chat_history or [],
-            "conversation_summary": request.conversation_summary,
-            "source_ids": request.source_ids or [],
-            "source_metadata": request.source_metadata or [],
-            "trace_id": request.trace_id,
-            "persisted_by_backend": bool(request.persisted_by_backend),
-        }
-        
         # Process query
         result = await master_orchestrator.process_query(
             query=request.query,
             user_id=request.user_id,
             session_id=request.session_id,
-            context=context
+            context=_build_query_context(request)
         )
         
-        return AgentQueryResponse(
-            answer=result.get("answer", ""),
-            intent=result.get("intent", "unknown"),
-            agent_used=result.get("agent_used", "unknown"),
-            preprocessing=result.get("preprocessing", {}),
-            metadata=result.get("metadata", {}),
-            processing_time=result.get("processing_time", 0)
-        )
+        return _to_agent_response(result)
     
     except Exception as e:
         raise HTTPException(
@@ -141,6 +168,67 @@ async def agent_query(request: AgentQueryRequest):
         )
 
 
+@router.post("/query/stream")
+async def agent_query_stream(request: AgentQueryRequest):
+    """
+    Multi-Agent Query dạng Server-Sent Events
+    
+    Events:
+        - start: gửi ngay khi nhận request
+        - delta: {"text": ...} phần nội dung câu trả lời
+        - result: AgentQueryResponse đầy đủ (answer + metadata)
+        - error: {"detail": ...} nếu xử lý thất bại
+    
+    Trong lúc agent xử lý, gửi comment ": ping" định kỳ để giữ kết nối.
+    
+    Args:
+        request: AgentQueryRequest
+    
+    Returns:
+        StreamingResponse (text/event-stream)
+    """
+    if not settings.ENABLE_MULTI_AGENT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Multi-Agent system is not enabled"
+        )
+    
+    async def event_stream():
+        yield _sse("start", {"trace_id": request.trace_id})
+        
+        task = asyncio.create_task(
+            master_orchestrator.process_query(
+                query=request.query,
+                user_id=request.user_id,
+                session_id=request.session_id,
+                context=_build_query_context(request)
+            )
+        )
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=STREAM_HEARTBEAT_INTERVAL)
+                if done:
+                    break
+                yield ": ping\n\n"
+            result = task.result()
+        except Exception as e:
+            yield _sse("error", {"detail": f"Agent query failed: {str(e)}"})
+            return
+        finally:
+            if not task.done():
+                task.cancel()
+        
+        response = _to_agent_response(result)
+        yield _sse("delta", {"text": response.answer})
+        yield _sse("result", response.model_dump())
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/analyze-data")
 async def analyze_data(
     query: str = Form(...),
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
 from typing import Optional
 import json
 
+from core.llm_cache import llm_cache, DOCUMENTS_VERSION_KEY
 from services.document_service import document_processing_service
 from services.embedding_service import embedding_service
 
@@ -76,7 +77,7 @@ async def process_document(
         )
         
         # 4. Generate embeddings
-        embeddings = embedding_service.embed_texts(
+        embeddings = await embedding_service.aembed_texts(
             texts=chunk_texts,
             input_type="search_document"
         )
@@ -92,6 +93,8 @@ async def process_document(
             chunks_data=chunks_data,
             metadata=meta
         )
+        # Vector mới -> bỏ contexts đã cache của các câu hỏi trước
+        llm_cache.bump_version(DOCUMENTS_VERSION_KEY)
         
         # 7. Return chunk data to Backend for PostgreSQL storage
         chunks_for_backend = [
@@ -154,6 +157,7 @@ async def delete_document_vectors(document_id: str):
                 ]
             )
         )
+        llm_cache.bump_version(DOCUMENTS_VERSION_KEY)
         
         return {
             "success": True,
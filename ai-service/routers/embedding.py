@@ -25,7 +25,7 @@ async def generate_embeddings(request: EmbedRequest):
         EmbedResponse với embeddings
     """
     try:
-        embeddings = embedding_service.embed_texts(
+        embeddings = await embedding_service.aembed_texts(
             texts=request.texts,
             input_type=request.input_type
         )
@@ -3,6 +3,8 @@ RAG Router
 API endpoints cho RAG (Retrieval Augmented Generation)
 """
 from fastapi import APIRouter, HTTPException, status
+from pydantic import TypeAdapter
+from typing import List
 
 from models.schemas import (
     RAGQueryRequest, RAGQueryResponse, ContextChunk,
@@ -14,6 +16,9 @@ from services.rag_service import rag_service
 
 router = APIRouter(prefix="/api/rag", tags=["rag"])
 
+# Validate cả list contexts trong một lần gọi pydantic-core
+_CONTEXT_ADAPTER = TypeAdapter(List[ContextChunk])
+
 
 @router.post("/query", response_model=RAGQueryResponse)
 async def rag_query(request: RAGQueryRequest):
@@ -43,18 +48,7 @@ async def rag_query(request: RAGQueryRequest):
         )
         
         # Convert contexts to ContextChunk objects
-        contexts = [
-            ContextChunk(
-                chunk_id=ctx["chunk_id"],
-                document_id=ctx["document_id"],
-                chunk_text=ctx["chunk_text"],
-                chunk_index=ctx["chunk_index"],
-                score=ctx["score"],
-                file_name=ctx["file_name"],
-                title=ctx.get("title")
-            )
-            for ctx in result.get("contexts", [])
-        ]
+        contexts = _CONTEXT_ADAPTER.validate_python(result.get("contexts", []))
         
         return RAGQueryResponse(
             answer=result["answer"],
@@ -109,18 +103,7 @@ async def chat(request: ChatRequest):
         # Convert contexts if present
         contexts = None
         if result.get("contexts"):
-            contexts = [
-                ContextChunk(
-                    chunk_id=ctx["chunk_id"],
-                    document_id=ctx["document_id"],
-                    chunk_text=ctx["chunk_text"],
-                    chunk_index=ctx["chunk_index"],
-                    score=ctx["score"],
-                    file_name=ctx["file_name"],
-                    title=ctx.get("title")
-                )
-                for ctx in result["contexts"]
-            ]
+            contexts = _CONTEXT_ADAPTER.validate_python(result["contexts"])
         
         return ChatResponse(
             message=result.get("answer", result.get("message", "")),  # Support both keys
@@ -156,18 +139,7 @@ async def vector_search(request: VectorSearchRequest):
             score_threshold=request.score_threshold
         )
         
-        results = [
-            ContextChunk(
-                chunk_id=ctx["chunk_id"],
-                document_id=ctx["document_id"],
-                chunk_text=ctx["chunk_text"],
-                chunk_index=ctx["chunk_index"],
-                score=ctx["score"],
-                file_name=ctx["file_name"],
-                title=ctx.get("title")
-            )
-            for ctx in contexts
-        ]
+        results = _CONTEXT_ADAPTER.validate_python(contexts)
         
         return VectorSearchResponse(
             results=results,
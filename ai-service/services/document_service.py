@@ -2,12 +2,13 @@
 Document Processing Service
 Xử lý documents: load, split, embed, và lưu vào Qdrant
 """
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List
+import io
 import tempfile
 import os
 import logging
 import time
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.text_splitter import Language, RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
 from langchain.schema import Document as LangchainDocument
 from qdrant_client.models import PointStruct
@@ -19,6 +20,27 @@ from services.embedding_service import embedding_service
 
 logger = logging.getLogger(__name__)
 
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+IMAGE_MIME_BY_EXT = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".heic": "image/heic",
+}
+CODE_LANGUAGES = {
+    ".py": Language.PYTHON,
+    ".java": Language.JAVA,
+    ".js": Language.JS,
+    ".cpp": Language.CPP,
+    ".ts": Language.TS,
+    ".html": Language.HTML,
+    ".md": Language.MARKDOWN,
+}
+CODE_EXTENSIONS = frozenset(CODE_LANGUAGES) | {".css"}
+# Số point mỗi request upsert Qdrant
+QDRANT_UPSERT_BATCH_SIZE = 256
+
 
 class DocumentProcessingService:
     """Service xử lý document processing pipeline"""
@@ -32,6 +54,7 @@ class DocumentProcessingService:
             length_function=self._count_tokens,
             separators=["\n\n", "\n", " ", ""]
         )
+        self._build_loaders()
 
     def _init_token_encoder(self):
         """Initialize tokenizer for chunk size and overlap measurements."""
@@ -176,6 +199,193 @@ class DocumentProcessingService:
 
         return documents
 
+    # ------------------------------------------------------------------
+    # Per-format loaders – selected once per document via dict lookup
+    # ------------------------------------------------------------------
+    def _build_loaders(self) -> None:
+        """
+        Precompute loader dispatch tables and language-specific code splitters.
+        Runs once at startup so each document only pays a dict lookup.
+        """
+        # Code splitters are expensive to build (separator regexes per language)
+        self._code_splitters = {
+            ext: RecursiveCharacterTextSplitter.from_language(
+                language=language,
+                chunk_size=settings.CHUNK_SIZE,
+                chunk_overlap=settings.CHUNK_OVERLAP,
+            )
+            for ext, language in CODE_LANGUAGES.items()
+        }
+        self._default_code_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP,
+        )
+
+        # MIME lookup first (only unambiguous binary formats), then extension.
+        # Generic/text MIME types fall through to the extension so e.g. a .py
+        # uploaded as text/plain is still chunked as code.
+        self._loaders_by_mime = {
+            "application/pdf": self._load_pdf,
+            DOCX_MIME_TYPE: self._load_docx,
+        }
+        self._loaders_by_ext = {
+            ".pdf": self._load_pdf,
+            ".docx": self._load_docx,
+            ".csv": self._load_csv,
+            ".xlsx": self._load_xlsx,
+            **{ext: self._load_image for ext in IMAGE_MIME_BY_EXT},
+            **{ext: self._load_code for ext in CODE_EXTENSIONS},
+        }
+
+    def _select_loader(self, file_type: str, ext: str) -> Callable[[bytes, str, str, str], List[LangchainDocument]]:
+        loader = self._loaders_by_mime.get(file_type) or self._loaders_by_ext.get(ext)
+        if loader is not None:
+            return loader
+        if file_type.startswith("image/"):
+            return self._load_image
+        return self._load_text
+
+    @staticmethod
+    def _write_temp_file(file_data: bytes, ext: str) -> str:
+        """Loaders that only accept a path (PyPDF, docx2txt, openpyxl) get a temp file."""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
+            tmp_file.write(file_data)
+            return tmp_file.name
+
+    @staticmethod
+    def _decode_text(file_data: bytes) -> str:
+        """Decode UTF-8 with universal newlines (same result as reading the file in text mode)."""
+        return io.TextIOWrapper(io.BytesIO(file_data), encoding="utf-8", errors="replace").read()
+
+    def _load_pdf(self, file_data: bytes, file_name: str, file_type: str, ext: str) -> List[LangchainDocument]:
+        tmp_file_path = self._write_temp_file(file_data, ext)
+        try:
+            loader = PyPDFLoader(tmp_file_path)
+            documents = loader.load()
+            
+            # Check if text extraction was successful
+            total_text = "".join(d.page_content for d in documents).strip()
+            
+            # If very little text → scanned/image-based PDF → OCR each page
+            if len(total_text) < 150:
+                logger.info(f"📄 PDF '{file_name}' has very little text ({len(total_text)} chars). "
+                            f"Treating as scanned PDF → Vision OCR...")
+                documents = self._ocr_pdf_pages(tmp_file_path, file_name)
+                
+                if not documents:
+                    # Last resort: treat entire PDF text (even if short) as content
+                    if total_text:
+                        documents = [LangchainDocument(
+                            page_content=total_text,
+                            metadata={
+                                "file_name": file_name, "file_type": ext,
+                                "pre_chunked": False, "source": file_name,
+                                "is_image_ocr": True,
+                            }
+                        )]
+                        logger.warning(f"⚠️ OCR failed, using original sparse text ({len(total_text)} chars)")
+            else:
+                for d in documents:
+                    d.metadata.update({
+                        "file_name": file_name, "file_type": ext,
+                        "pre_chunked": False, "source": file_name
+                    })
+            return documents
+        finally:
+            os.unlink(tmp_file_path)
+
+    def _load_image(self, file_data: bytes, file_name: str, file_type: str, ext: str) -> List[LangchainDocument]:
+        logger.info(f"🖼️ Image '{file_name}' detected (type={file_type}, ext={ext}). Running Vision OCR...")
+        
+        # Determine correct MIME type
+        if file_type.startswith("image/"):
+            m_type = file_type
+        else:
+            m_type = IMAGE_MIME_BY_EXT.get(ext, "image/jpeg")
+
+        vision_text = self._ocr_image_with_gemini(
+            image_bytes=file_data,
+            mime_type=m_type,
+            context_hint=f"Standalone image file: {file_name}",
+        )
+
+        if vision_text:
+            logger.info(f"✅ Image OCR complete: {len(vision_text)} chars extracted from '{file_name}'")
+            return [LangchainDocument(
+                page_content=f"[IMAGE: {file_name}]\n{vision_text}",
+                metadata={
+                    "source": file_name,
+                    "file_name": file_name,
+                    "file_type": ext,
+                    "pre_chunked": False,
+                    "is_image_ocr": True,
+                    "ocr_method": "gemini_vision",
+                }
+            )]
+
+        # Even on failure, create a minimal document so processing doesn't 400
+        logger.error(f"❌ Image OCR returned no text for '{file_name}'. "
+                     f"Creating placeholder document.")
+        return [LangchainDocument(
+            page_content=f"[IMAGE: {file_name}]\n"
+                         f"(Hình ảnh đã được tải lên nhưng không thể trích xuất nội dung văn bản. "
+                         f"File: {file_name})",
+            metadata={
+                "source": file_name,
+                "file_name": file_name,
+                "file_type": ext,
+                "pre_chunked": False,
+                "is_image_ocr": True,
+                "ocr_failed": True,
+            }
+        )]
+
+    def _load_docx(self, file_data: bytes, file_name: str, file_type: str, ext: str) -> List[LangchainDocument]:
+        tmp_file_path = self._write_temp_file(file_data, ext)
+        try:
+            documents = Docx2txtLoader(tmp_file_path).load()
+        finally:
+            os.unlink(tmp_file_path)
+        for d in documents:
+            d.metadata.update({"file_name": file_name, "file_type": ext, "pre_chunked": False, "source": file_name})
+        return documents
+
+    def _load_code(self, file_data: bytes, file_name: str, file_type: str, ext: str) -> List[LangchainDocument]:
+        text = self._decode_text(file_data)
+        splitter = self._code_splitters.get(ext, self._default_code_splitter)
+        
+        chunks = splitter.create_documents([text])
+        for chunk in chunks:
+            chunk.metadata.update({
+                "file_name": file_name,
+                "file_type": ext,
+                "pre_chunked": True,
+                "is_code": True,
+                "source": file_name
+            })
+        return chunks
+
+    def _load_csv(self, file_data: bytes, file_name: str, file_type: str, ext: str) -> List[LangchainDocument]:
+        df = pd.read_csv(io.BytesIO(file_data))
+        return self._process_dataframe(df, file_name, ext, title="CSV Data")
+
+    def _load_xlsx(self, file_data: bytes, file_name: str, file_type: str, ext: str) -> List[LangchainDocument]:
+        documents = []
+        with pd.ExcelFile(io.BytesIO(file_data)) as xls:
+            for sheet_name in xls.sheet_names:
+                df = pd.read_excel(xls, sheet_name=sheet_name)
+                documents.extend(
+                    self._process_dataframe(df, file_name, ext, title=f"Sheet: {sheet_name}", is_sheet=True)
+                )
+        return documents
+
+    def _load_text(self, file_data: bytes, file_name: str, file_type: str, ext: str) -> List[LangchainDocument]:
+        text = self._decode_text(file_data)
+        return [LangchainDocument(
+            page_content=text,
+            metadata={"source": file_name, "file_name": file_name, "file_type": ext, "pre_chunked": False}
+        )]
+
     # ------------------------------------------------------------------
     # Main entry: load document from raw bytes
     # ------------------------------------------------------------------
@@ -189,170 +399,12 @@ class DocumentProcessingService:
         Load document từ bytes data và tiền xử lý/chunking riêng cho từng định dạng.
         Supports: PDF (text + scanned), DOCX, images, code files, CSV/XLSX, plain text.
         """
-        from langchain.text_splitter import Language
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_name)[1]) as tmp_file:
-                tmp_file.write(file_data)
-                tmp_file_path = tmp_file.name
-            
             ext = os.path.splitext(file_name)[1].lower()
-            code_extensions = [".py", ".java", ".js", ".cpp", ".ts", ".md", ".html", ".css"]
-            image_extensions = [".jpg", ".jpeg", ".png", ".webp", ".heic"]
-            
-            documents = []
-            
-            # ==================== PDF ====================
-            if file_type in ["application/pdf", ".pdf"] or ext == ".pdf":
-                loader = PyPDFLoader(tmp_file_path)
-                documents = loader.load()
-                
-                # Check if text extraction was successful
-                total_text = "".join(d.page_content for d in documents).strip()
-                
-                # If very little text → scanned/image-based PDF → OCR each page
-                if len(total_text) < 150:
-                    logger.info(f"📄 PDF '{file_name}' has very little text ({len(total_text)} chars). "
-                                f"Treating as scanned PDF → Vision OCR...")
-                    documents = self._ocr_pdf_pages(tmp_file_path, file_name)
-                    
-                    if not documents:
-                        # Last resort: treat entire PDF text (even if short) as content
-                        if total_text:
-                            documents = [LangchainDocument(
-                                page_content=total_text,
-                                metadata={
-                                    "file_name": file_name, "file_type": ext,
-                                    "pre_chunked": False, "source": file_name,
-                                    "is_image_ocr": True,
-                                }
-                            )]
-                            logger.warning(f"⚠️ OCR failed, using original sparse text ({len(total_text)} chars)")
-                else:
-                    for d in documents:
-                        d.metadata.update({
-                            "file_name": file_name, "file_type": ext,
-                            "pre_chunked": False, "source": file_name
-                        })
-
-            # ==================== IMAGE FILES ====================
-            elif (file_type and file_type.startswith("image/")) or ext in image_extensions:
-                logger.info(f"🖼️ Image '{file_name}' detected (type={file_type}, ext={ext}). Running Vision OCR...")
-                
-                # Determine correct MIME type
-                mime_map = {
-                    ".jpg": "image/jpeg",
-                    ".jpeg": "image/jpeg",
-                    ".png": "image/png",
-                    ".webp": "image/webp",
-                    ".heic": "image/heic",
-                }
-                if file_type and file_type.startswith("image/"):
-                    m_type = file_type
-                else:
-                    m_type = mime_map.get(ext, "image/jpeg")
-
-                vision_text = self._ocr_image_with_gemini(
-                    image_bytes=file_data,
-                    mime_type=m_type,
-                    context_hint=f"Standalone image file: {file_name}",
-                )
-
-                if vision_text:
-                    documents = [LangchainDocument(
-                        page_content=f"[IMAGE: {file_name}]\n{vision_text}",
-                        metadata={
-                            "source": file_name,
-                            "file_name": file_name,
-                            "file_type": ext,
-                            "pre_chunked": False,
-                            "is_image_ocr": True,
-                            "ocr_method": "gemini_vision",
-                        }
-                    )]
-                    logger.info(f"✅ Image OCR complete: {len(vision_text)} chars extracted from '{file_name}'")
-                else:
-                    # Even on failure, create a minimal document so processing doesn't 400
-                    logger.error(f"❌ Image OCR returned no text for '{file_name}'. "
-                                 f"Creating placeholder document.")
-                    documents = [LangchainDocument(
-                        page_content=f"[IMAGE: {file_name}]\n"
-                                     f"(Hình ảnh đã được tải lên nhưng không thể trích xuất nội dung văn bản. "
-                                     f"File: {file_name})",
-                        metadata={
-                            "source": file_name,
-                            "file_name": file_name,
-                            "file_type": ext,
-                            "pre_chunked": False,
-                            "is_image_ocr": True,
-                            "ocr_failed": True,
-                        }
-                    )]
-
-            # ==================== DOCX ====================
-            elif file_type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", ".docx"] or ext == ".docx":
-                loader = Docx2txtLoader(tmp_file_path)
-                documents = loader.load()
-                for d in documents:
-                    d.metadata.update({"file_name": file_name, "file_type": ext, "pre_chunked": False, "source": file_name})
-                    
-            # ==================== CODE FILES ====================
-            elif ext in code_extensions:
-                with open(tmp_file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    text = f.read()
-                
-                lang_map = {
-                    ".py": Language.PYTHON, ".java": Language.JAVA, ".js": Language.JS,
-                    ".cpp": Language.CPP, ".ts": Language.TS, ".html": Language.HTML,
-                    ".md": Language.MARKDOWN
-                }
-                
-                lc_lang = lang_map.get(ext)
-                if lc_lang:
-                    splitter = RecursiveCharacterTextSplitter.from_language(
-                        language=lc_lang, chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP
-                    )
-                else:
-                    splitter = RecursiveCharacterTextSplitter(chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP)
-                
-                chunks = splitter.create_documents([text])
-                for chunk in chunks:
-                    chunk.metadata.update({
-                        "file_name": file_name,
-                        "file_type": ext,
-                        "pre_chunked": True,
-                        "is_code": True,
-                        "source": file_name
-                    })
-                    documents.append(chunk)
-
-            # ==================== CSV / XLSX ====================
-            elif ext in [".csv", ".xlsx"]:
-                if ext == ".csv":
-                    df = pd.read_csv(tmp_file_path)
-                    docs = self._process_dataframe(df, file_name, ext, title="CSV Data")
-                    documents.extend(docs)
-                else:
-                    xls = pd.ExcelFile(tmp_file_path)
-                    for sheet_name in xls.sheet_names:
-                        df = pd.read_excel(tmp_file_path, sheet_name=sheet_name)
-                        docs = self._process_dataframe(df, file_name, ext, title=f"Sheet: {sheet_name}", is_sheet=True)
-                        documents.extend(docs)
-
-            # ==================== PLAIN TEXT / OTHER ====================
-            else:
-                with open(tmp_file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    text = f.read()
-                documents = [LangchainDocument(
-                    page_content=text,
-                    metadata={"source": file_name, "file_name": file_name, "file_type": ext, "pre_chunked": False}
-                )]
-            
-            os.unlink(tmp_file_path)
-            return documents
-            
+            file_type = file_type or ""
+            loader = self._select_loader(file_type, ext)
+            return loader(file_data, file_name, file_type, ext)
         except Exception as e:
-            if 'tmp_file_path' in locals() and os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
             raise Exception(f"Document loading error: {e}")
 
     def _process_dataframe(self, df, file_name: str, ext: str, title: str, is_sheet: bool = False) -> List[LangchainDocument]:
@@ -524,11 +576,14 @@ class DocumentProcessingService:
                 
                 points.append(point)
             
-            # Upsert to Qdrant
-            qdrant_manager.client.upsert(
-                collection_name=qdrant_manager.collection_name,
-                points=points
-            )
+            # Upsert to Qdrant theo batch, không chờ index xong (wait=False)
+            # Batch giữ mỗi request dưới giới hạn message 4MB của gRPC
+            for start in range(0, len(points), QDRANT_UPSERT_BATCH_SIZE):
+                qdrant_manager.client.upsert(
+                    collection_name=qdrant_manager.collection_name,
+                    points=points[start:start + QDRANT_UPSERT_BATCH_SIZE],
+                    wait=False
+                )
             
             return True
         
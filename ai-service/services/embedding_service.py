@@ -3,17 +3,29 @@ Embedding Service
 Xử lý việc generate embeddings từ texts bằng Cohere API
 """
 from typing import List
+import asyncio
 import cohere
 from core.config import settings
 
 
+# Cohere embed nhận tối đa 96 texts mỗi request
+EMBED_BATCH_SIZE = 96
+# Số request embed chạy song song (tránh vượt rate limit của Cohere)
+EMBED_MAX_CONCURRENCY = 4
+
+VALID_INPUT_TYPES = ("search_document", "search_query")
+
+
 class EmbeddingService:
     """Service xử lý embedding generation"""
     
     def __init__(self):
         """Initialize Cohere client"""
         self.cohere_client = cohere.Client(settings.COHERE_API_KEY)
+        self.async_client = cohere.AsyncClient(settings.COHERE_API_KEY)
         self.model = settings.COHERE_EMBEDDING_MODEL
+        # Dùng chung cho mọi request -> giới hạn tổng số call đồng thời tới Cohere
+        self._semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
     
     def embed_texts(
         self,
@@ -35,17 +47,66 @@ class EmbeddingService:
         """
         try:
             # Validate input_type
-            if input_type not in ["search_document", "search_query"]:
+            if input_type not in VALID_INPUT_TYPES:
                 input_type = "search_document"
             
-            # Call Cohere API
-            response = self.cohere_client.embed(
-                texts=texts,
-                model=self.model,
-                input_type=input_type
-            )
+            # Call Cohere API - tuần tự từng batch (giới hạn texts/request của Cohere)
+            embeddings = []
+            for start in range(0, len(texts), EMBED_BATCH_SIZE):
+                response = self.cohere_client.embed(
+                    texts=texts[start:start + EMBED_BATCH_SIZE],
+                    model=self.model,
+                    input_type=input_type
+                )
+                embeddings.extend(response.embeddings)
             
-            return response.embeddings
+            return embeddings
+        
+        except Exception as e:
+            raise Exception(f"Cohere embedding error: {e}")
+    
+    async def aembed_texts(
+        self,
+        texts: List[str],
+        input_type: str = "search_document",
+        batch_size: int = EMBED_BATCH_SIZE
+    ) -> List[List[float]]:
+        """
+        Generate embeddings cho danh sách texts - async, chia batch và gọi song song
+        
+        Mỗi batch tối đa batch_size texts, tối đa EMBED_MAX_CONCURRENCY request
+        cùng lúc. Kết quả giữ đúng thứ tự của texts.
+        
+        Args:
+            texts: Danh sách texts cần embed
+            input_type: "search_document" (cho lưu trữ) hoặc "search_query" (cho query)
+            batch_size: Số texts mỗi request (<= 96)
+        
+        Returns:
+            List[List[float]]: Danh sách embedding vectors
+        
+        Raises:
+            Exception: Nếu embedding thất bại
+        """
+        if input_type not in VALID_INPUT_TYPES:
+            input_type = "search_document"
+        batch_size = min(batch_size, EMBED_BATCH_SIZE)
+        
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with self._semaphore:
+                response = await self.async_client.embed(
+                    texts=batch,
+                    model=self.model,
+                    input_type=input_type
+                )
+                return response.embeddings
+        
+        try:
+            results = await asyncio.gather(*[
+                embed_batch(texts[start:start + batch_size])
+                for start in range(0, len(texts), batch_size)
+            ])
+            return [embedding for batch in results for embedding in batch]
         
         except Exception as e:
             raise Exception(f"Cohere embedding error: {e}")
@@ -2,7 +2,8 @@
 AI Orchestrator - Multi-Model Query Processing
 Main orchestrator that routes queries to appropriate handlers based on intent
 """
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
+import hashlib
 import time
 
 from core.config import settings
@@ -10,6 +11,7 @@ from core.model_manager import model_manager
 from services.intent_classifier import intent_classifier
 from services.embedding_service import embedding_service
 from core.qdrant import qdrant_manager
+from core.llm_cache import llm_cache, DOCUMENTS_VERSION_KEY
 from qdrant_client.models import Filter, FieldCondition, MatchValue, MatchAny
 
 
@@ -19,10 +21,15 @@ class AIOrchestrator:
     Routes to appropriate handler based on intent classification
     """
     
+    # Seconds to keep each user's last retrieval (re-sent question -> reuse contexts)
+    LAST_RETRIEVAL_TTL = 900
+    
     def __init__(self):
         """Initialize orchestrator"""
         self.model_manager = model_manager
         self.intent_classifier = intent_classifier
+        # user_id -> (retrieval hash, stored_at, contexts)
+        self._last_retrieval: Dict[str, Tuple[str, float, List[Dict[str, Any]]]] = {}
     
     async def process_query(
         self,
@@ -698,6 +705,24 @@ HƯỚNG DẪN GIẢI CHI TIẾT:"""
                 # Other errors, re-raise
                 raise
     
+    def _get_last_retrieval(self, user_id: str, retrieval_hash: str) -> Optional[List[Dict[str, Any]]]:
+        """Lấy contexts của lần retrieve trước nếu câu hỏi + bộ lọc giống hệt (và chưa hết hạn)"""
+        now = time.time()
+        
+        # Lazy sweep các entry đã hết hạn
+        expired = [
+            key for key, (_, stored_at, _) in self._last_retrieval.items()
+            if now - stored_at > self.LAST_RETRIEVAL_TTL
+        ]
+        for key in expired:
+            del self._last_retrieval[key]
+        
+        entry = self._last_retrieval.get(user_id)
+        if entry and entry[0] == retrieval_hash:
+            # Copy: caller có thể sửa contexts, không được đụng vào entry dùng chung
+            return [dict(ctx) for ctx in entry[2]]
+        return None
+    
     async def _retrieve_contexts(
         self,
         query: str,
@@ -708,7 +733,23 @@ HƯỚNG DẪN GIẢI CHI TIẾT:"""
     ) -> List[Dict[str, Any]]:
         """
         Retrieve contexts using Vector RAG only.
+        
+        Câu hỏi gửi lại y hệt (cùng documents, top_k, threshold) dùng lại contexts
+        của lần trước, bỏ qua embed query + Qdrant search. Key gồm version tài liệu
+        (tăng khi ingest/xóa document) nên cache tự hết hiệu lực khi vector đổi;
+        không có Redis để đọc version thì không cache.
         """
+        documents_version = llm_cache.get_version(DOCUMENTS_VERSION_KEY)
+        retrieval_hash = None
+        if documents_version is not None:
+            retrieval_hash = hashlib.sha256(
+                f"{query}\x00{sorted(document_ids or [])}\x00{top_k}\x00{score_threshold}\x00{documents_version}".encode("utf-8")
+            ).hexdigest()
+            cached = self._get_last_retrieval(user_id, retrieval_hash)
+            if cached is not None:
+                print("♻️ Reusing contexts from previous identical query")
+                return cached
+        
         try:
             # Fallback to Vector RAG only (original implementation)
             print("📊 Using Vector RAG only")
@@ -764,6 +805,9 @@ HƯỚNG DẪN GIẢI CHI TIẾT:"""
                     "source": "vector"
                 })
             
+            # Không cache kết quả rỗng (document có thể đang được index)
+            if retrieval_hash is not None and contexts:
+                self._last_retrieval[user_id] = (retrieval_hash, time.time(), [dict(ctx) for ctx in contexts])
             return contexts
         
         except Exception as e:
@@ -6,19 +6,60 @@ NOTE: This service is being deprecated in favor of the new Orchestrator.
 Keeping for backward compatibility.
 """
 from typing import List, Optional, Dict, Any
+import logging
 import time
 import asyncio
 
 from core.config import settings
+from core.qdrant import qdrant_manager
+from services.embedding_service import embedding_service
 from services.orchestrator import orchestrator
+from qdrant_client.models import Filter, FieldCondition, MatchValue, MatchAny
+
+logger = logging.getLogger(__name__)
+
+def format_contexts(
+    contexts: List[Dict[str, Any]],
+    template: str = "[TÀI LIỆU {i}] - {title}\n{chunk_text}\n",
+    separator: str = "\n"
+) -> str:
+    """
+    Format danh sách contexts thành một chuỗi cho prompt
+    
+    Args:
+        contexts: Danh sách contexts từ vector search
+        template: Template cho mỗi context (fields: i, title, file_name, chunk_text, score)
+        separator: Chuỗi nối giữa các context
+    
+    Returns:
+        str: Contexts đã format
+    """
+    return separator.join([
+        template.format(
+            i=idx,
+            title=ctx.get("title", ctx.get("file_name", "Document")),
+            file_name=ctx.get("file_name", ""),
+            chunk_text=ctx.get("chunk_text", ""),
+            score=ctx.get("score", 0)
+        )
+        for idx, ctx in enumerate(contexts, 1)
+    ])
 
 
 class RAGService:
     """Service xử lý RAG pipeline - now using Orchestrator"""
     
+    # Metrics worker: flush after this many events or this many seconds
+    METRICS_BATCH_SIZE = 100
+    METRICS_FLUSH_INTERVAL = 1.0
+    METRICS_QUEUE_MAXSIZE = 10000
+    
     def __init__(self):
         """Initialize with new Orchestrator"""
         self.orchestrator = orchestrator
+        # Metrics are queued on the request path and drained by a background task
+        self._metrics_q: Optional[asyncio.Queue] = None
+        self._metrics_task: Optional[asyncio.Task] = None
         print("✅ RAGService initialized with Multi-Model Orchestrator")
     
     async def query_with_orchestrator(
@@ -52,6 +93,8 @@ class RAGService:
         Returns:
             Dict with answer, contexts, intent, model, etc.
         """
+        start_time = time.time()
+        
         try:
             # Use defaults if not provided
             top_k = top_k or settings.RAG_TOP_K
@@ -68,11 +111,85 @@ class RAGService:
                 max_tokens=max_tokens
             )
             
+            self._record_metrics({
+                "latency": time.time() - start_time,
+                "tokens": result.get("tokens_used"),
+                "cache_hit": False
+            })
+            
             return result
         
         except Exception as e:
             raise Exception(f"Orchestrator query error: {e}")
     
+    def start_metrics_worker(self):
+        """Start background metrics worker (gọi trong app startup)"""
+        if self._metrics_task is None:
+            self._metrics_q = asyncio.Queue(maxsize=self.METRICS_QUEUE_MAXSIZE)
+            self._metrics_task = asyncio.create_task(self._metrics_worker())
+    
+    async def stop_metrics_worker(self):
+        """Stop background metrics worker và flush các events còn lại"""
+        if self._metrics_task is None:
+            return
+        
+        self._metrics_task.cancel()
+        try:
+            await self._metrics_task
+        except asyncio.CancelledError:
+            pass
+        
+        remaining = []
+        while not self._metrics_q.empty():
+            remaining.append(self._metrics_q.get_nowait())
+        if remaining:
+            self._flush_metrics(remaining)
+        
+        self._metrics_task = None
+        self._metrics_q = None
+    
+    def _record_metrics(self, event: Dict[str, Any]):
+        """Queue a metrics event without blocking the response path"""
+        if self._metrics_q is None:
+            return
+        try:
+            self._metrics_q.put_nowait(event)
+        except asyncio.QueueFull:
+            pass  # Drop metrics rather than slow down requests
+    
+    async def _metrics_worker(self):
+        """Drain metrics queue in batches of METRICS_BATCH_SIZE or every METRICS_FLUSH_INTERVAL"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._metrics_q.get()]
+            deadline = loop.time() + self.METRICS_FLUSH_INTERVAL
+            
+            while len(batch) < self.METRICS_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._metrics_q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            self._flush_metrics(batch)
+    
+    def _flush_metrics(self, batch: List[Dict[str, Any]]):
+        """Ship a batch of metrics events to logs"""
+        try:
+            latencies = [e["latency"] for e in batch]
+            tokens = sum(e.get("tokens") or 0 for e in batch)
+            cache_hits = sum(1 for e in batch if e.get("cache_hit"))
+            logger.info(
+                f"📈 RAG metrics: {len(batch)} requests, "
+                f"avg latency {sum(latencies) / len(latencies):.3f}s, "
+                f"max latency {max(latencies):.3f}s, "
+                f"tokens {tokens}, cache hits {cache_hits}"
+            )
+        except Exception as e:
+            logger.debug(f"Metrics flush failed: {e}")
+    
     def classify_query_type(self, question: str) -> str:
         """
         Phân loại câu hỏi để áp dụng strategy phù hợp
@@ -149,12 +266,14 @@ class RAGService:
                 )
             
             query_filter = Filter(must=filter_conditions) if filter_conditions else None
+            search_params = qdrant_manager.get_search_params()
             
             # Search in Qdrant
             search_results = qdrant_manager.client.search(
                 collection_name=qdrant_manager.collection_name,
                 query_vector=query_vector,
                 query_filter=query_filter,
+                search_params=search_params,
                 limit=top_k,
                 score_threshold=score_threshold
             )
@@ -168,6 +287,7 @@ class RAGService:
                         collection_name=qdrant_manager.collection_name,
                         query_vector=query_vector,
                         query_filter=query_filter,
+                        search_params=search_params,
                         limit=top_k,
                         score_threshold=min_threshold
                     )
@@ -207,13 +327,10 @@ class RAGService:
             str: Prompt đầy đủ
         """
         # Build context string
-        context_parts = []
-        for idx, ctx in enumerate(contexts, 1):
-            context_parts.append(
-                f"[TÀI LIỆU {idx}] - {ctx['file_name']}\n{ctx['chunk_text']}\n"
-            )
-        
-        context_str = "\n".join(context_parts)
+        context_str = format_contexts(
+            contexts,
+            template="[TÀI LIỆU {i}] - {file_name}\n{chunk_text}\n"
+        )
         
         # Build full prompt
         prompt = f"""Bạn là trợ lý học tập thông minh, giúp sinh viên trả lời câu hỏi dựa trên tài liệu học tập.
@@ -260,11 +377,11 @@ TRẢ LỜI:"""
             max_tokens = max_tokens or settings.LLM_MAX_TOKENS
             
             # Build context section
-            context_section = "TÀI LIỆU THAM KHẢO:\n"
-            for idx, ctx in enumerate(contexts, 1):
-                title = ctx.get("title", ctx.get("file_name", "Document"))
-                score = ctx.get("score", 0)
-                context_section += f"\n[TÀI LIỆU {idx}] - {title} (độ liên quan: {score:.2f})\n{ctx['chunk_text']}\n"
+            context_section = "TÀI LIỆU THAM KHẢO:\n" + format_contexts(
+                contexts,
+                template="\n[TÀI LIỆU {i}] - {title} (độ liên quan: {score:.2f})\n{chunk_text}\n",
+                separator=""
+            )
             
             # Build system prompt based on query type
             if query_type == "creative":
@@ -390,12 +507,14 @@ TRẢ LỜI:"""
             )
             
             if not contexts:
+                processing_time = time.time() - start_time
+                self._record_metrics({"latency": processing_time, "tokens": 0, "cache_hit": False})
                 return {
                     "answer": "Tôi không tìm thấy tài liệu phù hợp để trả lời câu hỏi này. Vui lòng upload thêm tài liệu hoặc thử câu hỏi khác.",
                     "contexts": [],
                     "model": self.llm_model,
                     "tokens_used": 0,
-                    "processing_time": time.time() - start_time,
+                    "processing_time": processing_time,
                     "query_type": query_type
                 }
             
@@ -413,6 +532,7 @@ TRẢ LỜI:"""
             )
             
             processing_time = time.time() - start_time
+            self._record_metrics({"latency": processing_time, "tokens": tokens_used, "cache_hit": False})
             
             return {
                 "answer": answer,
@@ -447,6 +567,8 @@ TRẢ LỜI:"""
         Returns:
             Dict với response và metadata
         """
+        start_time = time.time()
+        
         try:
             # Get last user message
             last_message = messages[-1]["content"]
@@ -462,10 +584,11 @@ TRẢ LỜI:"""
             
             # Build chat prompt with context
             if contexts:
-                context_str = "\n\n".join([
-                    f"[{ctx['file_name']}]: {ctx['chunk_text']}"
-                    for ctx in contexts
-                ])
+                context_str = format_contexts(
+                    contexts,
+                    template="[{file_name}]: {chunk_text}",
+                    separator="\n\n"
+                )
                 
                 system_message = f"""Bạn là trợ lý học tập. Dựa vào tài liệu sau để trả lời:
 
@@ -492,6 +615,12 @@ Trả lời ngắn gọn, chính xác dựa trên tài liệu."""
                 max_tokens=max_tokens or settings.LLM_MAX_TOKENS
             )
             
+            self._record_metrics({
+                "latency": time.time() - start_time,
+                "tokens": None,
+                "cache_hit": False
+            })
+            
             return {
                 "message": response.text,
                 "contexts": contexts if contexts else None,
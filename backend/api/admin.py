@@ -8,8 +8,10 @@ from sqlalchemy import func, distinct, case
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
+from core.cache import cache_manager, document_cache_key, group_cache_key
 from core.databases import get_db
 from api.dependencies import AdminUser
+from services.auth_service import auth_service
 from services.user_presence import user_presence
 from models.users import User, LoginHistory
 from models.documents import Document, DocumentShare
@@ -229,6 +231,7 @@ async def change_user_role(
 
     user.role = request.role
     db.commit()
+    await auth_service.invalidate_user_cache(user.id)
     return {"message": f"User role changed to {request.role}"}
 
 
@@ -253,6 +256,7 @@ async def ban_user(
 
     user.is_active = not user.is_active
     db.commit()
+    await auth_service.invalidate_user_cache(user.id)
 
     status_text = "unbanned" if user.is_active else "banned"
     return {"message": f"User {status_text}", "is_active": user.is_active}
@@ -279,6 +283,7 @@ async def delete_user(
 
     db.delete(user)
     db.commit()
+    await auth_service.invalidate_user_cache(user_id)
     return {"message": "User deleted"}
 
 
@@ -350,6 +355,7 @@ async def delete_group(
 
     db.delete(group)
     db.commit()
+    await cache_manager.delete(group_cache_key(group_id))
     return {"message": "Group deleted"}
 
 
@@ -433,6 +439,7 @@ async def delete_document(
 
     db.delete(doc)
     db.commit()
+    await cache_manager.delete(document_cache_key(document_id))
     return {"message": "Document deleted"}
 
 
@@ -40,7 +40,7 @@ async def register(
     Returns:
         Success message (KHÔNG trả token, phải login sau khi đăng ký)
     """
-    result = auth_service.register_user(
+    result = await auth_service.register_user(
         email=request.email,
         username=request.username,
         password=request.password,
@@ -177,7 +177,10 @@ async def refresh(
                 detail="Refresh token not found"
             )
         
-        new_access_token = await token_service.refresh_access_token(refresh_token)
+        new_access_token = await token_service.refresh_access_token(
+            refresh_token,
+            access_token=request_obj.cookies.get("access_token")
+        )
         
         # Set new access token cookie
         response.set_cookie(
@@ -1,36 +1,43 @@
 """
 Chat routes - Chat sessions, messages
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import date, datetime
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from uuid import UUID, uuid4
+import asyncio
+import orjson
 import re
 
-from core.databases import get_db
-from api.dependencies import get_current_user, CurrentUser
+from core.databases import AsyncSessionLocal, get_async_db
+from core.cache import cache_manager, chat_session_list_cache_key
+from core.responses import ORJSONResponse
+from api.dependencies import CurrentUser, HttpClient
 from services.chat_service import chat_service
 from services.chat_history_service import chat_history_service
 from services.minio_service import minio_service
 from schemas.chat import (
     ChatSessionResponse, ChatSessionCreateRequest, ChatMessageResponse,
     ChatMessageCreateRequest, MessageFeedbackRequest, ChatSessionDetailResponse,
-    AIUsageResponse, ChatAskRequest, ChatAskResponse, ContextChunkResponse,
-    ChatSessionUpdateTitleRequest
+    AIUsageResponse, ChatAskRequest, ChatAskResponse,
+    ChatSessionUpdateTitleRequest, ChatSessionListAdapter
 )
 from models.users import User
 from models.chat import ChatSession, ChatMessage, MessageFeedback, AIUsageHistory
 from models.documents import Document
 import httpx
+import logging
 import time
-from core.config import settings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/chat", 
-    tags=["chat"],
-    dependencies=[Depends(get_current_user)]  # Apply authentication to all endpoints
+    tags=["chat"]  # Authentication gắn ở protected_router (main.py)
 )
 
 
@@ -46,22 +53,135 @@ SPREADSHEET_MIME_TYPES = {
     "application/vnd.ms-excel",
     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
 }
+CHAT_SESSION_CACHE_TTL = 300  # Ownership/meta của session (giây)
+CHAT_SESSION_LIST_CACHE_TTL = 30  # Danh sách sessions của user (giây)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Callback nhận (event, data) khi ask chạy ở chế độ SSE
+SSEEventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+def _session_cache_key(session_id: UUID) -> str:
+    return f"chatsess:{session_id}"
+
+
+async def _get_session_meta(
+    db: AsyncSession,
+    session_id: UUID,
+    user_id: UUID,
+) -> Optional[Dict[str, Any]]:
+    """
+    Metadata của session thuộc về user, ưu tiên Redis cache trước khi SELECT.
+    Trả về None cho cả "không tồn tại" lẫn "không phải owner" (không lộ sự tồn tại).
+    """
+    cache_key = _session_cache_key(session_id)
+    meta = await cache_manager.get_json(cache_key)
+    if meta is not None:
+        return meta if meta["user_id"] == str(user_id) else None
+
+    result = await db.execute(
+        select(
+            ChatSession.user_id,
+            ChatSession.title,
+            ChatSession.session_type,
+            ChatSession.model_name,
+        ).where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+
+    meta = {
+        "user_id": str(row.user_id),
+        "title": row.title,
+        "session_type": row.session_type,
+        "model_name": row.model_name,
+    }
+    await cache_manager.set_json(cache_key, meta, CHAT_SESSION_CACHE_TTL)
+    return meta
 
 
-def _resolve_canonical_document_ids(db: Session, user_id: UUID, document_ids: List[str]) -> List[str]:
+async def _invalidate_session_cache(user_id: UUID, session_id: Optional[UUID] = None) -> None:
+    keys = [chat_session_list_cache_key(user_id)]
+    if session_id is not None:
+        keys.append(_session_cache_key(session_id))
+    await cache_manager.delete(*keys)
+
+
+async def record_usage(
+    user_id: UUID,
+    session_id: UUID,
+    model_name: str,
+    tokens_used: int,
+) -> None:
+    """
+    Ghi AIUsageHistory bằng async session riêng (chạy qua BackgroundTasks,
+    sau khi response đã trả về)
+    
+    message_count/total_tokens_used của session do trigger trên chat_messages
+    cập nhật ngay khi INSERT message, ở đây chỉ xóa cache danh sách session
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            db.add(
+                AIUsageHistory(
+                    user_id=user_id,
+                    session_id=session_id,
+                    model_name=model_name,
+                    tokens_used=tokens_used,
+                    request_type="chat_message",
+                    status="success"
+                )
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            logger.exception(
+                "background usage tracking failed",
+                extra={"user_id": str(user_id), "session_id": str(session_id)},
+            )
+            return
+
+    await _invalidate_session_cache(user_id)
+
+
+async def _resolve_canonical_document_ids(db: AsyncSession, user_id: UUID, document_ids: List[str]) -> List[str]:
     """Map user document IDs to canonical IDs used for vector retrieval."""
     if not document_ids:
         return []
 
+    valid_ids: List[UUID] = []
+    for raw_id in document_ids:
+        try:
+            valid_ids.append(UUID(str(raw_id)))
+        except Exception:
+            continue
+
+    # One IN query instead of one SELECT per document ID
+    canonical_map: Dict[str, str] = {}
+    if valid_ids:
+        result = await db.execute(
+            select(Document.id, Document.canonical_document_id).where(
+                Document.id.in_(valid_ids),
+                Document.user_id == user_id
+            )
+        )
+        canonical_map = {
+            str(doc_id): str(canonical_id or doc_id)
+            for doc_id, canonical_id in result.all()
+        }
+
     out: List[str] = []
     seen = set()
 
     for raw_id in document_ids:
-        doc = db.query(Document).filter(
-            Document.id == raw_id,
-            Document.user_id == user_id
-        ).first()
-        mapped = str(doc.canonical_document_id or doc.id) if doc else str(raw_id)
+        key = str(raw_id)
+        try:
+            key = str(UUID(key))
+        except Exception:
+            pass
+        mapped = canonical_map.get(key, str(raw_id))
         if mapped not in seen:
             seen.add(mapped)
             out.append(mapped)
@@ -76,6 +196,84 @@ def _resolve_trace_id(request: Request) -> str:
     return str(uuid4())
 
 
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data, default=str).decode()}\n\n"
+
+
+def _dump_json(value: Any) -> bytes:
+    """Serialize request body bằng orjson (UUID/datetime native, fallback str)."""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+async def _post_ai_service(http: httpx.AsyncClient, url: str, **kwargs: Any) -> Dict[str, Any]:
+    response = await http.post(url, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _stream_agent_query(
+    http: httpx.AsyncClient,
+    ai_request: Dict[str, Any],
+    on_event: SSEEventCallback,
+) -> Dict[str, Any]:
+    """
+    Gọi /api/agent/query/stream, chuyển tiếp delta qua on_event và
+    trả về payload cuối (cùng format với /api/agent/query).
+    """
+    answer_buf: List[str] = []
+    ai_data: Optional[Dict[str, Any]] = None
+    event = "message"
+
+    async with http.stream(
+        "POST",
+        "/api/agent/query/stream",
+        content=_dump_json(ai_request),
+        headers=JSON_HEADERS,
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                event = "message"
+                continue
+            if line.startswith(":"):
+                continue  # heartbeat
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+                continue
+            if not line.startswith("data:"):
+                continue
+
+            payload = orjson.loads(line[len("data:"):].strip())
+            if event == "delta":
+                answer_buf.append(payload.get("text", ""))
+                await on_event("delta", payload)
+            elif event == "result":
+                ai_data = payload
+            elif event == "error":
+                raise httpx.HTTPError(payload.get("detail") or "AI Service stream failed")
+
+    if ai_data is None:
+        raise httpx.HTTPError("AI Service stream ended without a result")
+    if not ai_data.get("answer"):
+        ai_data["answer"] = "".join(answer_buf)
+    return ai_data
+
+
+def _chat_message_payload(message: ChatMessage) -> Dict[str, Any]:
+    """ChatMessageResponse dạng dict (serialize thẳng bằng orjson, bỏ qua Pydantic)."""
+    return {
+        "id": message.id,
+        "session_id": message.session_id,
+        "user_id": message.user_id,
+        "role": message.role,
+        "content": message.content,
+        "retrieved_chunks": [str(chunk_id) for chunk_id in (message.retrieved_chunks or [])],
+        "total_tokens": message.total_tokens or 0,
+        "confidence_score": message.confidence_score,
+        "created_at": message.created_at,
+    }
+
+
 def _is_spreadsheet_document(doc: Document) -> bool:
     file_type = (doc.file_type or "").lower().strip()
     if file_type in SPREADSHEET_MIME_TYPES:
@@ -84,17 +282,8 @@ def _is_spreadsheet_document(doc: Document) -> bool:
     return any(file_name.endswith(ext) for ext in SPREADSHEET_EXTENSIONS)
 
 
-def _extract_object_name(file_path: str) -> str:
-    normalized = (file_path or "").strip()
-    if not normalized:
-        return ""
-    if "/" in normalized:
-        return normalized.split("/", 1)[1]
-    return normalized
-
-
-def _select_spreadsheet_doc(
-    db: Session,
+async def _select_spreadsheet_doc(
+    db: AsyncSession,
     user_id: UUID,
     document_ids: List[str],
     trace_id: str,
@@ -112,17 +301,17 @@ def _select_spreadsheet_doc(
     if not valid_ids:
         return None
 
-    rows = (
-        db.query(Document)
-        .filter(Document.user_id == user_id)
-        .filter(
+    result = await db.execute(
+        select(Document)
+        .where(Document.user_id == user_id)
+        .where(
             or_(
                 Document.id.in_(valid_ids),
                 Document.canonical_document_id.in_(valid_ids),
             )
         )
-        .all()
     )
+    rows = result.scalars().all()
 
     spreadsheet_candidates = [doc for doc in rows if _is_spreadsheet_document(doc)]
     if len(spreadsheet_candidates) == 1:
@@ -374,21 +563,37 @@ def _build_message_persistence_payload(
 @router.get("/sessions", response_model=List[ChatSessionResponse])
 async def list_chat_sessions(
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
     limit: int = 10
 ):
     """
     Lấy danh sách chat sessions của user
+    
+    Payload (đã dump JSON, hoặc lấy từ cache) trả thẳng qua ORJSONResponse -
+    FastAPI không validate lại theo response_model (chỉ dùng cho docs)
     """
-    sessions = chat_service.get_user_chat_sessions(
-        user_id=str(current_user.id),
+    cache_key = chat_session_list_cache_key(current_user.id)
+    cache_field = f"{skip}:{limit}"
+    cached = await cache_manager.hget_json(cache_key, cache_field)
+    if cached is not None:
+        return ORJSONResponse(cached)
+    
+    sessions = await chat_service.get_user_chat_sessions(
+        user_id=current_user.id,
         db=db,
         skip=skip,
         limit=limit
     )
     
-    return sessions
+    # Validate + dump cả list trong một lần gọi vào pydantic-core
+    payload = ChatSessionListAdapter.dump_python(
+        ChatSessionListAdapter.validate_python(sessions, from_attributes=True),
+        mode="json",
+    )
+    await cache_manager.hset_json(cache_key, cache_field, payload, CHAT_SESSION_LIST_CACHE_TTL)
+    
+    return ORJSONResponse(payload)
 
 
 # ============================================
@@ -398,19 +603,20 @@ async def list_chat_sessions(
 async def create_chat_session(
     request: ChatSessionCreateRequest,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Tạo chat session mới
     """
-    new_session = chat_service.create_chat_session(
-        user_id=str(current_user.id),
+    new_session = await chat_service.create_chat_session(
+        user_id=current_user.id,
         title=request.title,
         session_type=request.session_type,
-        context_documents=request.context_documents or [],
+        context_documents=[str(doc_id) for doc_id in (request.context_documents or [])],
         model_name=request.model_name,
         db=db
     )
+    await _invalidate_session_cache(current_user.id)
 
     if chat_history_service.enabled:
         chat_history_service.ensure_conversation(
@@ -430,14 +636,14 @@ async def create_chat_session(
 async def get_chat_session(
     session_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lấy chi tiết chat session
     """
-    session = chat_service.get_chat_session_by_id(
+    session = await chat_service.get_chat_session_by_id(
         session_id=session_id,
-        user_id=str(current_user.id),
+        user_id=current_user.id,
         db=db
     )
     
@@ -452,17 +658,20 @@ async def update_chat_session_title(
     session_id: UUID,
     request: ChatSessionUpdateTitleRequest,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cập nhật tiêu đề chat session
     """
-    return chat_service.update_chat_session_title(
+    session = await chat_service.update_chat_session_title(
         session_id=session_id,
-        user_id=str(current_user.id),
+        user_id=current_user.id,
         title=request.title,
         db=db
     )
+    await _invalidate_session_cache(current_user.id, session_id)
+    
+    return session
 
 
 # ============================================
@@ -472,51 +681,48 @@ async def update_chat_session_title(
 async def send_chat_message(
     request: ChatMessageCreateRequest,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Gửi tin nhắn trong chat session
     """
-    # Kiểm tra session tồn tại và user có quyền
-    session = db.query(ChatSession).filter(
-        ChatSession.id == request.session_id
-    ).first()
+    # Ownership check (không khớp -> 404); message_count do trigger trên
+    # chat_messages tăng khi INSERT message
+    result = await db.execute(
+        select(ChatSession.title, ChatSession.session_type)
+        .where(
+            ChatSession.id == request.session_id,
+            ChatSession.user_id == current_user.id
+        )
+    )
+    session_row = result.first()
     
-    if not session:
+    if session_row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat session not found"
         )
     
-    if session.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to send messages to this session"
-        )
-    
-    # Tạo message
+    # Tạo message (ID gán sẵn; created_at do Postgres sinh, lấy về qua RETURNING)
     new_message = ChatMessage(
+        id=uuid4(),
         session_id=request.session_id,
         user_id=current_user.id,
         role="user",
         content=request.content,
-        retrieved_chunks=request.retrieved_chunks or []
+        retrieved_chunks=request.retrieved_chunks or [],
     )
     
     db.add(new_message)
-    
-    # Cập nhật message count
-    session.message_count += 1
-    
-    db.commit()
-    db.refresh(new_message)
+    await db.commit()
+    await _invalidate_session_cache(current_user.id)
 
     if chat_history_service.enabled:
         chat_history_service.ensure_conversation(
             conversation_id=str(request.session_id),
             user_id=str(current_user.id),
-            title=session.title,
-            session_type=session.session_type,
+            title=session_row.title,
+            session_type=session_row.session_type,
         )
         chat_history_service.append_message(
             conversation_id=str(request.session_id),
@@ -537,28 +743,22 @@ async def send_chat_message(
 async def get_session_messages(
     session_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
     limit: int = 50
 ):
     """
     Lấy danh sách tin nhắn trong session
+    
+    Message dựng thành dict và serialize thẳng bằng orjson (response_model chỉ dùng cho docs)
     """
-    session = db.query(ChatSession).filter(
-        ChatSession.id == session_id
-    ).first()
+    session_meta = await _get_session_meta(db, session_id, current_user.id)
     
-    if not session:
+    if not session_meta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat session not found"
         )
-    
-    if session.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to view this session"
-        )
 
     if chat_history_service.enabled:
         mongo_messages = chat_history_service.get_session_messages(
@@ -567,47 +767,50 @@ async def get_session_messages(
             limit=limit,
         )
         if mongo_messages:
-            return [_mongo_message_to_response(message, session_id) for message in mongo_messages]
+            return ORJSONResponse([_mongo_message_to_response(message, session_id) for message in mongo_messages])
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session_id
-    ).order_by(ChatMessage.created_at.asc()).offset(skip).limit(limit).all()
+    result = await db.execute(
+        select(ChatMessage)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at.asc())
+        .offset(skip)
+        .limit(limit)
+    )
     
-    return messages
+    return ORJSONResponse([_chat_message_payload(message) for message in result.scalars().all()])
 
 
 @router.get("/sessions/{session_id}/timeline")
 async def get_session_timeline(
     session_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
     limit: int = 50,
 ):
     """Return message timeline with source references for UI/source resolution debugging."""
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-    if not session:
+    session_meta = await _get_session_meta(db, session_id, current_user.id)
+    if not session_meta:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat session not found",
         )
 
-    if session.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to view this session",
-        )
-
     if not chat_history_service.enabled:
-        fallback_messages = db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
-        ).order_by(ChatMessage.created_at.asc()).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.asc())
+            .offset(skip)
+            .limit(limit)
+        )
+        fallback_messages = result.scalars().all()
         return {
             "session_id": str(session_id),
             "source_catalog": {},
             "messages": [
                 {
-                    "message": ChatMessageResponse.model_validate(msg).model_dump(),
+                    "message": ChatMessageResponse.from_orm_trusted(msg).model_dump(),
                     "source_refs": [],
                     "attached_files": [],
                     "doc_map": [],
@@ -676,48 +879,43 @@ async def send_message_feedback(
     message_id: UUID,
     request: MessageFeedbackRequest,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Gửi feedback cho tin nhắn
     """
-    message = db.query(ChatMessage).filter(
-        ChatMessage.id == message_id
-    ).first()
+    # Message phải thuộc session của user
+    result = await db.execute(
+        select(ChatMessage.id)
+        .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+        .where(ChatMessage.id == message_id, ChatSession.user_id == current_user.id)
+    )
     
-    if not message:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Message not found"
         )
     
-    if message.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to send feedback for this message"
-        )
-    
-    # Kiểm tra feedback đã tồn tại
-    feedback = db.query(MessageFeedback).filter(
-        MessageFeedback.message_id == message_id
-    ).first()
-    
-    if not feedback:
-        feedback = MessageFeedback(message_id=message_id)
-        db.add(feedback)
-    
-    # Cập nhật feedback
-    if request.rating is not None:
-        feedback.rating = request.rating
-    if request.is_helpful is not None:
-        feedback.is_helpful = request.is_helpful
-    if request.comment is not None:
-        feedback.comment = request.comment
-    if request.feedback_type is not None:
-        feedback.feedback_type = request.feedback_type
+    # Upsert một statement (message_id UNIQUE): chỉ ghi đè các field được gửi lên
+    values = {
+        key: value
+        for key, value in {
+            "rating": request.rating,
+            "is_helpful": request.is_helpful,
+            "comment": request.comment,
+            "feedback_type": request.feedback_type,
+        }.items()
+        if value is not None
+    }
+    stmt = pg_insert(MessageFeedback).values(message_id=message_id, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MessageFeedback.message_id],
+        set_={**values, "updated_at": func.timezone("utc", func.clock_timestamp())},
+    )
     
-    db.commit()
-    db.refresh(feedback)
+    await db.execute(stmt)
+    await db.commit()
     
     return {"message": "Feedback sent successfully"}
 
@@ -729,64 +927,78 @@ async def send_message_feedback(
 async def delete_chat_session(
     session_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Xóa chat session
     """
-    session = db.query(ChatSession).filter(
-        ChatSession.id == session_id
-    ).first()
+    result = await db.execute(
+        select(ChatSession).where(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id
+        )
+    )
+    session = result.scalar_one_or_none()
     
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat session not found"
         )
-    
-    if session.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to delete this session"
-        )
 
     if chat_history_service.enabled:
         chat_history_service.clear_conversation(str(session_id))
 
-    db.delete(session)
-    db.commit()
+    await db.delete(session)
+    await db.commit()
+    await _invalidate_session_cache(current_user.id, session_id)
 
 
 # ============================================
 # Ask AI in chat session (Integration Endpoint)
 # ============================================
-@router.post("/sessions/{session_id}/ask", response_model=ChatAskResponse)
-async def ask_in_chat_session(
+async def _ask_in_chat_session(
     session_id: UUID,
     request: ChatAskRequest,
-    current_user: CurrentUser,
-    http_request: Request,
-    db: Session = Depends(get_db)
-):
+    current_user: User,
+    trace_id: str,
+    http: httpx.AsyncClient,
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    on_event: Optional[SSEEventCallback] = None,
+) -> Dict[str, Any]:
     """
-    Hỏi AI trong chat session - Tự động lưu messages và gọi AI Service
+    Flow chung cho ask (JSON và SSE)
     
     Flow:
     1. Validate session & user permission
     2. Save user message to chat_messages
     3. Call AI Service internally
     4. Save AI response to chat_messages
-    5. Update session stats
-    6. Track usage to ai_usage_history
+    5. Update session stats (background task)
+    6. Track usage to ai_usage_history (background task)
     7. Return complete conversation
+    
+    Khi có on_event, AI Service được gọi dạng stream và các delta được
+    chuyển tiếp qua callback; AI message chỉ được lưu sau khi stream kết thúc.
+    
+    User message được commit trong transaction ngắn riêng trước khi chờ AI:
+    trigger đếm message UPDATE dòng chat_sessions, giữ transaction mở suốt lời
+    gọi AI (tới 300s) sẽ khóa session và giữ connection trong thời gian đó.
+    
+    Returns:
+        Payload theo schema ChatAskResponse (dict thuần cho orjson)
     """
     start_time = time.time()
-    trace_id = _resolve_trace_id(http_request)
     
     # 1. Validate session
-    session = db.query(ChatSession).filter(
-        ChatSession.id == session_id
-    ).first()
+    result = await db.execute(
+        select(ChatSession).where(
+            ChatSession.id == session_id,
+            ChatSession.user_id == current_user.id
+        )
+    )
+    session = result.scalar_one_or_none()
     
     if not session:
         raise HTTPException(
@@ -794,27 +1006,23 @@ async def ask_in_chat_session(
             detail="Chat session not found"
         )
     
-    if session.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to use this session"
-        )
+    # Đọc trước: sau rollback các attribute bị expire (không lazy load được trong async)
+    session_model_name = session.model_name
     
-    # 2. Save user message
+    # 2. Build user message (ID gán sẵn, commit song song với AI call)
     user_message = ChatMessage(
+        id=uuid4(),
         session_id=session_id,
         user_id=current_user.id,
         role="user",
         content=request.question,
         retrieved_chunks=[],
-        total_tokens=0
+        total_tokens=0,
     )
-    db.add(user_message)
-    db.flush()  # Get ID without committing
     
     try:
         # 3. Call AI Service internally (Multi-Agent System)
-        ai_service_url = f"{settings.AI_SERVICE_URL}/api/agent/query"
+        ai_service_url = "/api/agent/query"
         
         # Prepare request for AI Service
         # Logic: 
@@ -825,18 +1033,17 @@ async def ask_in_chat_session(
         if request.document_ids is not None:
             # User explicitly specified (including [])
             raw_doc_ids = [str(doc_id) for doc_id in request.document_ids] if request.document_ids else []
-            doc_ids_to_use = _resolve_canonical_document_ids(db, current_user.id, raw_doc_ids) if raw_doc_ids else []
+            doc_ids_to_use = await _resolve_canonical_document_ids(db, current_user.id, raw_doc_ids) if raw_doc_ids else []
             # Persist non-empty doc lists to session so follow-up questions remember context
             if request.document_ids:
-                session.context_documents = [str(doc_id) for doc_id in request.document_ids]
-                db.flush()
+                session.context_documents = raw_doc_ids
         else:
             # Use session's persistent context (no global cross-session fallback)
             if session.context_documents:
-                doc_ids_to_use = _resolve_canonical_document_ids(
+                doc_ids_to_use = await _resolve_canonical_document_ids(
                     db,
                     current_user.id,
-                    [str(doc_id) for doc_id in session.context_documents],
+                    session.context_documents,
                 )
             else:
                 doc_ids_to_use = None
@@ -857,15 +1064,17 @@ async def ask_in_chat_session(
                 # Explicit file mention should override "last active" source context.
                 doc_ids_to_use = filename_mention_source_ids
                 session.context_documents = [str(source_id) for source_id in filename_mention_source_ids]
-                db.flush()
 
         explicit_source_ids = None
         fallback_source_ids = []
         if chat_history_service.enabled and doc_ids_to_use:
-            fallback_source_ids = chat_history_service.upsert_sources_from_document_ids(
-                db=db,
-                user_id=str(current_user.id),
-                document_ids=[str(doc_id) for doc_id in doc_ids_to_use],
+            # chat_history_service dùng sync Session API -> chạy qua run_sync
+            fallback_source_ids = await db.run_sync(
+                lambda sync_db: chat_history_service.upsert_sources_from_document_ids(
+                    db=sync_db,
+                    user_id=str(current_user.id),
+                    document_ids=[str(doc_id) for doc_id in doc_ids_to_use],
+                )
             )
         if request.document_ids is not None:
             # Explicit source selection also includes [] to clear active sources.
@@ -875,17 +1084,17 @@ async def ask_in_chat_session(
 
         spreadsheet_doc = None
         if request.document_ids is not None:
-            spreadsheet_doc = _select_spreadsheet_doc(
+            spreadsheet_doc = await _select_spreadsheet_doc(
                 db=db,
                 user_id=current_user.id,
                 document_ids=raw_doc_ids,
                 trace_id=trace_id,
             )
         elif session.context_documents:
-            spreadsheet_doc = _select_spreadsheet_doc(
+            spreadsheet_doc = await _select_spreadsheet_doc(
                 db=db,
                 user_id=current_user.id,
-                document_ids=[str(doc_id) for doc_id in session.context_documents],
+                document_ids=session.context_documents,
                 trace_id=trace_id,
             )
 
@@ -934,13 +1143,19 @@ async def ask_in_chat_session(
             source_metadata_for_ai = context_bundle.get("source_metadata") or []
         else:
             # Fallback: use relational storage if Mongo mode is disabled.
-            recent_messages = db.query(ChatMessage).filter(
-                ChatMessage.session_id == session_id
-            ).order_by(ChatMessage.created_at.desc()).limit(12).all()
+            # User message chưa được INSERT -> lấy 11 tin gần nhất + câu hỏi hiện tại
+            result = await db.execute(
+                select(ChatMessage)
+                .where(ChatMessage.session_id == session_id)
+                .order_by(ChatMessage.created_at.desc())
+                .limit(11)
+            )
+            recent_messages = result.scalars().all()
             chat_history_for_ai = [
                 {"role": m.role, "content": m.content}
                 for m in reversed(recent_messages)
             ]
+            chat_history_for_ai.append({"role": "user", "content": request.question})
             conversation_summary = None
             source_ids_for_ai = []
             source_metadata_for_ai = []
@@ -962,7 +1177,7 @@ async def ask_in_chat_session(
             )
 
         if spreadsheet_doc:
-            object_name = _extract_object_name(spreadsheet_doc.file_path)
+            object_name = spreadsheet_doc.object_name
             if not object_name:
                 raise HTTPException(
                     status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -981,7 +1196,7 @@ async def ask_in_chat_session(
                     detail=f"Không thể tải file từ lưu trữ: {e}",
                 )
 
-            ai_service_url = f"{settings.AI_SERVICE_URL}/api/agent/analyze-data"
+            ai_service_url = "/api/agent/analyze-data"
             form_data = {
                 "query": request.question,
                 "user_id": str(current_user.id),
@@ -995,19 +1210,18 @@ async def ask_in_chat_session(
                 )
             }
 
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                ai_response = await client.post(
-                    ai_service_url,
-                    data=form_data,
-                    files=files,
-                )
-                ai_response.raise_for_status()
-                ai_data = ai_response.json()
+            ai_call = _post_ai_service(
+                http,
+                ai_service_url,
+                data=form_data,
+                files=files,
+            )
         else:
+            # UUID/datetime giữ nguyên kiểu, orjson serialize ở biên (_dump_json)
             ai_request = {
                 "query": request.question,
-                "user_id": str(current_user.id),
-                "session_id": str(session_id),
+                "user_id": current_user.id,
+                "session_id": session_id,
                 "document_ids": doc_ids_to_use,
                 "top_k": request.top_k,
                 "score_threshold": request.score_threshold,
@@ -1027,16 +1241,29 @@ async def ask_in_chat_session(
             if request.max_tokens is not None:
                 ai_request["max_tokens"] = request.max_tokens
 
-            ai_request = _json_safe(ai_request)
-
-            # Call AI Service with timeout
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                ai_response = await client.post(
+            # Call AI Service qua client dùng chung (keep-alive pool)
+            if on_event is not None:
+                ai_call = _stream_agent_query(http, ai_request, on_event)
+            else:
+                ai_call = _post_ai_service(
+                    http,
                     ai_service_url,
-                    json=ai_request
+                    content=_dump_json(ai_request),
+                    headers=JSON_HEADERS,
                 )
-                ai_response.raise_for_status()
-                ai_data = ai_response.json()
+        
+        # INSERT user message chạy song song với AI call (không phụ thuộc nhau):
+        # request tới AI Service được gửi trước, commit lấp vào thời gian chờ.
+        # Commit ngay (không chỉ flush) để nhả lock dòng chat_sessions của trigger
+        # và trả connection về pool trong lúc chờ AI
+        db.add(user_message)
+        ai_task = asyncio.create_task(ai_call)
+        try:
+            await db.commit()
+        except Exception:
+            ai_task.cancel()
+            raise
+        ai_data = await ai_task
         
         # 4. Save AI response message (Multi-Agent response format)
         # Extract context information from metadata if available
@@ -1044,6 +1271,7 @@ async def ask_in_chat_session(
         retrieved_contexts = metadata.get("contexts", [])
         
         ai_message = ChatMessage(
+            id=uuid4(),
             session_id=session_id,
             user_id=current_user.id,
             role="assistant",
@@ -1052,10 +1280,8 @@ async def ask_in_chat_session(
                 ctx.get("chunk_id") for ctx in retrieved_contexts if ctx.get("chunk_id")
             ],
             total_tokens=metadata.get("tokens_used", 0),
-            confidence_score=None
+            confidence_score=None,
         )
-        db.add(ai_message)
-        db.flush()
 
         if chat_history_service.enabled:
             token_in = int(metadata.get("token_in", 0) or 0)
@@ -1112,25 +1338,20 @@ async def ask_in_chat_session(
                     confidence=0.8,
                 )
         
-        # 5. Update session stats
-        session.message_count += 2  # User + AI messages
-        session.total_tokens_used += metadata.get("tokens_used", 0)
+        # 5. INSERT AI message (user message đã commit ở bước 3) - transaction ngắn thứ hai
+        db.add(ai_message)
+        
+        # expire_on_commit=False -> không cần refresh
+        await db.commit()
         
-        # 6. Track usage
-        usage_record = AIUsageHistory(
+        # 6. Usage + session stats không hiển thị ngay -> ghi sau response
+        background_tasks.add_task(
+            record_usage,
             user_id=current_user.id,
             session_id=session_id,
-            model_name=metadata.get("model", session.model_name),
+            model_name=metadata.get("model", session_model_name),
             tokens_used=metadata.get("tokens_used", 0),
-            request_type="chat_message",
-            status="success"
         )
-        db.add(usage_record)
-        
-        # Commit all changes
-        db.commit()
-        db.refresh(user_message)
-        db.refresh(ai_message)
 
         if chat_history_service.enabled:
             chat_history_service.upsert_summary_if_needed(
@@ -1144,45 +1365,46 @@ async def ask_in_chat_session(
         
         # Convert contexts to response format (from metadata)
         contexts = [
-            ContextChunkResponse(
-                chunk_id=ctx.get("chunk_id", ""),
-                document_id=ctx.get("document_id", ""),
-                chunk_text=ctx.get("chunk_text", ""),
-                chunk_index=ctx.get("chunk_index", 0),
-                score=ctx.get("score", 0.0),
-                file_name=ctx.get("file_name", ""),
-                title=ctx.get("title")
-            )
+            {
+                "chunk_id": str(ctx.get("chunk_id", "")),
+                "document_id": str(ctx.get("document_id", "")),
+                "chunk_text": ctx.get("chunk_text", ""),
+                "chunk_index": int(ctx.get("chunk_index", 0)),
+                "score": float(ctx.get("score", 0.0)),
+                "file_name": ctx.get("file_name", ""),
+                "title": ctx.get("title"),
+            }
             for ctx in retrieved_contexts
         ]
         
-        return ChatAskResponse(
-            session_id=session_id,
-            user_message=user_message,
-            ai_message=ai_message,
-            contexts=contexts,
-            processing_time=processing_time,
-            model_used=metadata.get("model", session.model_name),
-            doc_map=metadata.get("doc_map", []),
-            quota_info=metadata.get("quota_info")
-        )
+        # Payload theo ChatAskResponse, trả thẳng qua ORJSONResponse
+        return {
+            "session_id": session_id,
+            "user_message": _chat_message_payload(user_message),
+            "ai_message": _chat_message_payload(ai_message),
+            "contexts": contexts,
+            "processing_time": processing_time,
+            "model_used": metadata.get("model", session.model_name),
+            "doc_map": metadata.get("doc_map", []),
+            "quota_info": metadata.get("quota_info"),
+        }
     
     except httpx.HTTPError as e:
         # AI Service call failed
-        db.rollback()
+        await db.rollback()
         
         # Log error to usage history
         error_record = AIUsageHistory(
             user_id=current_user.id,
             session_id=session_id,
-            model_name=session.model_name,
+            model_name=session_model_name,
             tokens_used=0,
             request_type="chat_message",
             status="failed",
             error_message=str(e)
         )
         db.add(error_record)
-        db.commit()
+        await db.commit()
         
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -1190,12 +1412,100 @@ async def ask_in_chat_session(
         )
 
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process chat request: {str(e)}"
         )
+
+
+@router.post("/sessions/{session_id}/ask", response_model=ChatAskResponse)
+async def ask_in_chat_session(
+    session_id: UUID,
+    request: ChatAskRequest,
+    current_user: CurrentUser,
+    http_request: Request,
+    http: HttpClient,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Hỏi AI trong chat session - Tự động lưu messages và gọi AI Service
+    
+    Payload được serialize thẳng bằng orjson (response_model chỉ dùng cho docs)
+    """
+    payload = await _ask_in_chat_session(
+        session_id=session_id,
+        request=request,
+        current_user=current_user,
+        trace_id=_resolve_trace_id(http_request),
+        http=http,
+        db=db,
+        background_tasks=background_tasks,
+    )
+    return ORJSONResponse(payload)
+
+
+@router.post("/sessions/{session_id}/ask/stream")
+async def ask_in_chat_session_stream(
+    session_id: UUID,
+    request: ChatAskRequest,
+    current_user: CurrentUser,
+    http_request: Request,
+    http: HttpClient,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Hỏi AI trong chat session, trả kết quả dạng Server-Sent Events
+    
+    Events:
+    - start: gửi ngay, trước khi gọi AI Service
+    - delta: {"text": ...} phần nội dung câu trả lời
+    - done: ChatAskResponse sau khi messages đã được lưu
+    - error: {"status_code": ..., "detail": ...}
+    """
+    trace_id = _resolve_trace_id(http_request)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_event(event: str, data: Dict[str, Any]) -> None:
+        await queue.put(_format_sse(event, data))
+
+    async def run() -> None:
+        try:
+            payload = await _ask_in_chat_session(
+                session_id=session_id,
+                request=request,
+                current_user=current_user,
+                trace_id=trace_id,
+                http=http,
+                db=db,
+                background_tasks=background_tasks,
+                on_event=on_event,
+            )
+            await queue.put(_format_sse("done", payload))
+        except HTTPException as e:
+            await queue.put(_format_sse("error", {"status_code": e.status_code, "detail": e.detail}))
+        finally:
+            await queue.put(None)
+
+    async def event_stream():
+        task = asyncio.create_task(run())
+        try:
+            yield _format_sse("start", {"session_id": str(session_id), "trace_id": trace_id})
+            while (item := await queue.get()) is not None:
+                yield item
+        finally:
+            # Client ngắt kết nối giữa chừng -> hủy; user message đã commit, AI message không được lưu
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
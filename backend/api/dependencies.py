@@ -5,9 +5,10 @@ Chứa các dependency dùng chung: authentication, authorization, etc.
 from typing import Annotated, Optional
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.databases import get_db
+from core.databases import get_async_db
 from services.auth_service import auth_service
 from models.users import User
 
@@ -17,7 +18,7 @@ security = HTTPBearer(auto_error=False)  # Don't auto error, we'll check cookie
 async def get_current_user(
     request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """
     FastAPI Dependency: Lấy thông tin user hiện tại từ JWT token
@@ -29,7 +30,7 @@ async def get_current_user(
     Args:
         request: Request object để đọc cookies
         credentials: HTTPAuthorizationCredentials from HTTPBearer (optional)
-        db: Database session
+        db: Async database session (chỉ dùng khi cache miss)
     
     Returns:
         Current user object
@@ -95,6 +96,15 @@ def verify_admin(
     return current_user
 
 
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """
+    Lấy HTTP client dùng chung (tạo trong lifespan) để gọi AI Service
+    
+    Client giữ connection pool keep-alive, tránh TCP/TLS handshake mỗi request
+    """
+    return request.app.state.http
+
+
 # ============================================
 # Type Aliases - Sử dụng Annotated để giảm code lặp
 # ============================================
@@ -104,3 +114,6 @@ CurrentUser = Annotated[User, Depends(get_current_user)]
 
 # AdminUser: Authenticated user với role admin
 AdminUser = Annotated[User, Depends(verify_admin)]
+
+# HttpClient: httpx.AsyncClient dùng chung tới AI Service
+HttpClient = Annotated[httpx.AsyncClient, Depends(get_http_client)]
@@ -1,30 +1,46 @@
 """
 Document routes - CRUD operations
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, StreamingResponse
+from sqlalchemy import func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 from uuid import UUID, uuid4
 from datetime import datetime
-import hashlib
+from urllib.parse import quote
+import json
+import logging
 import os
 import re
 
-from core.databases import get_db
-from api.dependencies import get_current_user, CurrentUser
+from core.cache import cache_manager, chat_session_list_cache_key, document_cache_key, HOT_READ_CACHE_TTL
+from core.celery_app import get_queue_depth
+from core.config import settings
+from core.databases import get_async_db
+from core.responses import ORJSONResponse
+from api.dependencies import CurrentUser
 from schemas.document import (
     DocumentResponse, DocumentCreateRequest, DocumentUpdateRequest,
-    DocumentShareRequest, DocumentShareResponse, DocumentDetailResponse
+    DocumentShareRequest, DocumentShareResponse, DocumentDetailResponse,
+    DocumentUploadInitRequest, DocumentUploadInitResponse, DocumentDownloadUrlResponse,
+    DocumentListAdapter
 )
 from models.users import User
+from models.chat import ChatSession
 from models.documents import Document, DocumentShare
-from services.minio_service import minio_service
+from services.minio_service import minio_service, PRESIGNED_DOWNLOAD_EXPIRES, PRESIGNED_UPLOAD_EXPIRES
 from services.ai_service import ai_service
+from tasks.document_tasks import process_document_task
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/documents", 
-    tags=["documents"],
-    dependencies=[Depends(get_current_user)]  # Apply authentication to all endpoints
+    tags=["documents"]  # Authentication gắn ở protected_router (main.py)
 )
 
 
@@ -42,6 +58,54 @@ IMAGE_MIME_TO_EXT = {
     "image/heic": ".heic",
     "image/gif": ".gif",
 }
+ALLOWED_UPLOAD_TYPES = frozenset({
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "text/plain",
+    "text/csv",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "text/html",
+    "text/javascript",
+    "text/x-python",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "image/heic",
+    "image/jpg",
+})
+ALLOWED_UPLOAD_EXTENSIONS = frozenset({
+    ".pdf", ".docx", ".txt", ".csv", ".xlsx", ".xls", ".py", ".java", ".js", ".ts",
+    ".html", ".css", ".md", ".cpp", ".jpg", ".jpeg", ".png", ".webp", ".heic",
+})
+
+# Bảng tra category khi upload không truyền category
+# Extension và MIME có thể cho ra 2 category khác nhau -> chọn theo CATEGORY_PRIORITY
+CATEGORY_PRIORITY = ("csv", "code", "document", "image", "text")
+# (dict sau ghi đè dict trước: .md vừa là text vừa là code -> code)
+CATEGORY_BY_EXT = {
+    ".txt": "text",
+    ".md": "text",
+    **{ext: "image" for ext in IMAGE_EXTENSIONS},
+    **{ext: "document" for ext in (".pdf", ".doc", ".docx")},
+    **{ext: "code" for ext in CODE_EXTENSIONS},
+    **{ext: "csv" for ext in SPREADSHEET_EXTENSIONS},
+}
+CATEGORY_BY_MIME = {
+    "text/csv": "csv",
+    "application/vnd.ms-excel": "csv",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "csv",
+    "text/javascript": "code",
+    "application/javascript": "code",
+    "text/x-python": "code",
+    "application/x-python-code": "code",
+    "application/pdf": "document",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "document",
+}
+CATEGORY_BY_MIME_PREFIX = (("image/", "image"), ("text/", "text"))
+
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20 MB
+DOCUMENT_TERMINAL_STATUSES = {"completed", "failed", "invalid"}
 
 
 def _looks_like_generic_image_name(stem: str) -> bool:
@@ -50,6 +114,32 @@ def _looks_like_generic_image_name(stem: str) -> bool:
     return bool(re.match(r"^(image|img|screenshot|pasted image)([-_ ]?\d+)?$", normalized))
 
 
+def _detect_category(ext: str, content_type: Optional[str]) -> str:
+    """
+    Tự nhận category từ extension + MIME (tra dict, không duyệt chuỗi if/elif)
+    
+    Args:
+        ext: Extension đã lowercase (vd: ".pdf")
+        content_type: MIME type client gửi lên
+    
+    Returns:
+        csv / code / document / image / text, hoặc general nếu không khớp
+    """
+    content_type = (content_type or "").lower()
+    mime_category = CATEGORY_BY_MIME.get(content_type)
+    if mime_category is None:
+        mime_category = next(
+            (category for prefix, category in CATEGORY_BY_MIME_PREFIX if content_type.startswith(prefix)),
+            None,
+        )
+    
+    candidates = {CATEGORY_BY_EXT.get(ext), mime_category}
+    for category in CATEGORY_PRIORITY:
+        if category in candidates:
+            return category
+    return "general"
+
+
 def _normalize_upload_filename(file_name: Optional[str], content_type: Optional[str]) -> str:
     raw_name = os.path.basename((file_name or "").strip()) or "upload"
     stem, ext = os.path.splitext(raw_name)
@@ -69,22 +159,126 @@ def _normalize_upload_filename(file_name: Optional[str], content_type: Optional[
     return raw_name if ext else f"{raw_name}{inferred_ext}"
 
 
-# ============================================
-# Helper function for background processing
-# ============================================
-def process_document_background(document_id: UUID):
+async def _get_owned_document(
+    db: AsyncSession,
+    document_id: UUID,
+    user_id: UUID,
+    include_shared: bool = False,
+    options: tuple = ()
+) -> Document:
     """
-    Wrapper function to process document in background with new DB session
+    Lấy document kèm kiểm tra quyền ngay trong WHERE (một query)
+    
+    Args:
+        db: Database session
+        document_id: ID của document
+        user_id: ID của user đang request
+        include_shared: Cho phép cả user được share (chỉ dùng cho thao tác đọc)
+        options: Loader options (selectinload, ...)
+    
+    Returns:
+        Document object
+    
+    Raises:
+        HTTPException: 404 nếu không tồn tại hoặc không có quyền (không lộ sự tồn tại)
     """
-    from core.databases import SessionLocal
+    access = Document.user_id == user_id
+    if include_shared:
+        access = or_(access, Document.shares.any(DocumentShare.shared_with_user_id == user_id))
+    
+    result = await db.execute(
+        select(Document).options(*options).where(Document.id == document_id, access)
+    )
+    document = result.scalar_one_or_none()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    return document
+
+
+def _upload_size(file: UploadFile) -> int:
+    """Kích thước file upload (bytes) mà không đọc nội dung vào RAM"""
+    if file.size is not None:
+        return file.size
+    
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+def _validate_upload(ext: str, content_type: Optional[str], file_size: int) -> None:
+    """Kiểm tra loại file + kích thước (400 / 413) trước khi nhận bytes"""
+    if content_type not in ALLOWED_UPLOAD_TYPES and ext not in ALLOWED_UPLOAD_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type {content_type} (ext {ext}) not supported. Allowed: PDF, DOCX, TXT, CSV, Code, Tables"
+        )
+    
+    if file_size > MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File quá lớn. Kích thước tối đa là 20 MB (file hiện tại: {file_size / (1024*1024):.1f} MB)"
+        )
+
+
+async def _ensure_processing_capacity() -> None:
+    """Backpressure: queue xử lý đã đầy thì từ chối sớm (503) thay vì dồn thêm task"""
+    queue_depth = await get_queue_depth()
+    if queue_depth is not None and queue_depth >= settings.MAX_PROCESS_BACKLOG:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Document processing queue is full, please retry later",
+            headers={"Retry-After": "30"}
+        )
+
+
+async def _enqueue_processing(db: AsyncSession, document_id: UUID, fallback_status: str) -> None:
+    """
+    Đẩy task xử lý document sang Celery; broker lỗi -> chuyển document về fallback_status
+    
+    Không có task thì document kẹt ở pending_validation mãi (không worker nào nhận)
+    
+    Args:
+        db: Database session
+        document_id: ID document vừa chuyển sang pending_validation
+        fallback_status: Trạng thái khi enqueue thất bại (uploading để client gọi lại /complete)
     
-    db = SessionLocal()
+    Raises:
+        HTTPException: 503 nếu không đẩy được task
+    """
     try:
-        ai_service.process_document(document_id, db)
+        process_document_task.delay(document_id=str(document_id))
     except Exception as e:
-        print(f"❌ Background processing error: {e}")
-    finally:
-        db.close()
+        logger.warning("document enqueue failed", extra={"document_id": str(document_id), "error": str(e)})
+        await db.execute(
+            update(Document)
+            .where(Document.id == document_id, Document.processing_status == "pending_validation")
+            .values(processing_status=fallback_status)
+        )
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Document processing queue is unavailable, please retry later",
+            headers={"Retry-After": "30"}
+        )
+
+
+def _presigned_download_url(document: Document) -> str:
+    """Presigned GET URL, MinIO trả kèm Content-Disposition attachment theo tên file gốc"""
+    encoded_name = quote(document.file_name, safe='')
+    return minio_service.get_presigned_url(
+        document.object_name,
+        expires=PRESIGNED_DOWNLOAD_EXPIRES,
+        response_headers={
+            "response-content-disposition": f"attachment; filename*=UTF-8''{encoded_name}",
+            "response-content-type": document.file_type,
+        }
+    )
 
 
 # ============================================
@@ -93,18 +287,35 @@ def process_document_background(document_id: UUID):
 @router.get("", response_model=List[DocumentResponse])
 async def list_documents(
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    tag: Optional[str] = Query(None, description="Chỉ lấy documents có tag này")
 ):
     """
-    Lấy danh sách documents của user
+    Lấy danh sách documents của user (lọc theo tag nếu có)
+    
+    Payload dump một lần rồi trả thẳng qua ORJSONResponse (response_model chỉ dùng cho docs)
     """
-    documents = db.query(Document).filter(
-        Document.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    # Document chưa upload xong (uploading) không hiện trong danh sách
+    query = select(Document).where(
+        Document.user_id == current_user.id,
+        Document.processing_status != "uploading",
+    )
+    if tag:
+        # ARRAY containment (tags @> ARRAY[tag]) -> dùng ix_documents_tags_gin
+        query = query.where(Document.tags.contains([tag]))
+    
+    result = await db.execute(
+        query
+        .offset(skip)
+        .limit(limit)
+    )
     
-    return documents
+    return ORJSONResponse(DocumentListAdapter.dump_python(
+        [DocumentResponse.from_orm_trusted(document) for document in result.scalars().all()],
+        mode="json",
+    ))
 
 
 # ============================================
@@ -113,7 +324,7 @@ async def list_documents(
 @router.get("/batch-status")
 async def get_batch_document_status(
     current_user: CurrentUser,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     document_ids: str = Query(..., description="Comma-separated document IDs"),
 ):
     """
@@ -129,10 +340,13 @@ async def get_batch_document_status(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid document ID format")
 
-    docs = db.query(Document).filter(
-        Document.id.in_(parsed_ids),
-        Document.user_id == current_user.id
-    ).all()
+    result = await db.execute(
+        select(Document.id, Document.is_processed, Document.processing_status).where(
+            Document.id.in_(parsed_ids),
+            Document.user_id == current_user.id
+        )
+    )
+    docs = result.all()
 
     return [
         {
@@ -149,17 +363,16 @@ async def get_batch_document_status(
 # ============================================
 @router.post("/upload", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
-    background_tasks: BackgroundTasks,
     current_user: CurrentUser,
     file: UploadFile = File(...),
     title: Optional[str] = Form(None),
     category: Optional[str] = Form(None),
     tags: Optional[str] = Form(None),  # JSON string: '["tag1", "tag2"]'
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload tài liệu: Upload file lên MinIO, lưu metadata vào PostgreSQL, 
-    và trigger background task để xử lý AI (split, embed, lưu Qdrant)
+    và đẩy Celery task để xử lý (hash, kiểm tra MIME, dedup, split, embed, lưu Qdrant)
     
     Args:
         file: File upload (REQUIRED)
@@ -174,176 +387,181 @@ async def upload_document(
         category: Category
         tags: Tags (JSON string)
     """
-    import json
-    
-    # Validate file type
-    allowed_types = [
-        "application/pdf",
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        "text/plain",
-        "text/csv",
-        "application/vnd.ms-excel",
-        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        "text/html",
-        "text/javascript",
-        "text/x-python",
-        "image/jpeg",
-        "image/png",
-        "image/webp",
-        "image/heic",
-        "image/jpg"
-    ]
-    
     normalized_file_name = _normalize_upload_filename(file.filename, file.content_type)
     ext = os.path.splitext(normalized_file_name)[1].lower()
-    is_image_upload = ((file.content_type or "").startswith("image/") or ext in IMAGE_EXTENSIONS)
-
-    allowed_exts = ['.pdf', '.docx', '.txt', '.csv', '.xlsx', '.xls', '.py', '.java', '.js', '.ts', '.html', '.css', '.md', '.cpp', '.jpg', '.jpeg', '.png', '.webp', '.heic']
     
-    if file.content_type not in allowed_types and ext not in allowed_exts:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File type {file.content_type} (ext {ext}) not supported. Allowed: PDF, DOCX, TXT, CSV, Code, Tables"
-        )
-
-    # Validate file size (max 20 MB)
-    MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB in bytes
+    # Validate file type + size (max 20 MB) - dùng kích thước đã spool, không đọc file
+    file_size = _upload_size(file)
+    _validate_upload(ext, file.content_type, file_size)
+    await _ensure_processing_capacity()
     
     try:
-        # 1. Read file and compute content hash (dedup key)
-        file_data = await file.read()
-        content_hash = hashlib.sha256(file_data).hexdigest()
-
-        if len(file_data) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File quá lớn. Kích thước tối đa là 20 MB (file hiện tại: {len(file_data) / (1024*1024):.1f} MB)"
-            )
+        # 1. Auto-detect category if not provided
+        detected_category = category or _detect_category(ext, file.content_type)
         
-        # 2. Auto-detect category if not provided
-        detected_category = category
-        if not detected_category:
-            content_type = (file.content_type or "").lower()
-
-            # Auto-detect based on MIME + extension
-            if ext in SPREADSHEET_EXTENSIONS or content_type in {
-                "text/csv",
-                "application/vnd.ms-excel",
-                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            }:
-                detected_category = "csv"
-            elif ext in CODE_EXTENSIONS or content_type in {
-                "text/javascript",
-                "application/javascript",
-                "text/x-python",
-                "application/x-python-code",
-            }:
-                detected_category = "code"
-            elif file.content_type == "application/pdf" or ext == ".pdf":
-                detected_category = "document"
-            elif (
-                file.content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                or ext in {".doc", ".docx"}
-            ):
-                detected_category = "document"
-            elif content_type.startswith("image/"):
-                detected_category = "image"
-            elif ext in ['.jpg', '.jpeg', '.png', '.webp', '.heic']:
-                detected_category = "image"
-            elif content_type.startswith("text/") or ext in {".txt", ".md"}:
-                detected_category = "text"
-            else:
-                detected_category = "general"
-        
-        # 3. Parse tags (optional)
+        # 2. Parse tags (optional)
         parsed_tags = []
         if tags:
             try:
                 parsed_tags = json.loads(tags)
-            except:
+            except json.JSONDecodeError:
                 parsed_tags = [tag.strip() for tag in tags.split(",")]
 
-        # 4. Dedup lookup within the same user: if same hash already processed,
-        # reuse canonical vectors/chunks and skip re-embedding.
-        # NOTE: images are intentionally processed separately so each upload
-        # has its own document_id/source identity for citations.
-        existing_processed = None
-        if not is_image_upload:
-            existing_processed = db.query(Document).filter(
-                Document.user_id == current_user.id,
-                Document.content_hash == content_hash,
-                Document.is_processed == True,
-                Document.processing_status == "completed"
-            ).order_by(Document.created_at.asc()).first()
-
-        if existing_processed:
-            canonical_id = existing_processed.canonical_document_id or existing_processed.id
-            dedup_document = Document(
-                user_id=current_user.id,
-                title=title or normalized_file_name,
-                file_name=normalized_file_name,
-                # Reuse physical object to avoid duplicate MinIO storage.
-                file_path=existing_processed.file_path,
-                content_hash=content_hash,
-                canonical_document_id=canonical_id,
-                file_size=existing_processed.file_size,
-                file_type=existing_processed.file_type,
-                category=detected_category,
-                tags=parsed_tags,
-                is_processed=True,
-                processing_status="completed"
-            )
-            db.add(dedup_document)
-            db.commit()
-            db.refresh(dedup_document)
-            return dedup_document
-
-        # 5. Upload new file to MinIO (no dedup match)
-        upload_result = minio_service.upload_file(
-            file_data=file_data,
+        # 3. Upload file to MinIO
+        # Stream thẳng UploadFile.file lên MinIO (put_object là sync -> threadpool)
+        upload_result = await run_in_threadpool(
+            minio_service.upload_file,
+            file_obj=file.file,
             file_name=normalized_file_name,
             content_type=file.content_type,
-            user_id=str(current_user.id)
+            user_id=str(current_user.id),
+            length=file_size
         )
         
-        # 6. Create document record in PostgreSQL
+        # 4. Create document record in PostgreSQL
+        # Canonical document for newly processed file is itself -> gán id trước,
+        # một INSERT + một COMMIT. Hash/MIME sniff/dedup do worker làm
+        # (pending_validation), request upload không phải đọc lại file
+        new_document_id = uuid4()
         new_document = Document(
+            id=new_document_id,
+            canonical_document_id=new_document_id,
             user_id=current_user.id,
             title=title or normalized_file_name,  # Auto-use filename if no title
             file_name=normalized_file_name,
             file_path=upload_result["file_path"],
-            content_hash=content_hash,
+            object_name=upload_result["object_name"],
             file_size=upload_result["size"],
             file_type=file.content_type,
             category=detected_category,  # Auto-detected or user-provided
             tags=parsed_tags,  # Optional - can be empty
             is_processed=False,
-            processing_status="pending"
+            processing_status="pending_validation"
         )
         
         db.add(new_document)
-        db.commit()
-        db.refresh(new_document)
-
-        # Canonical document for newly processed file is itself.
-        new_document.canonical_document_id = new_document.id
-        db.commit()
-        db.refresh(new_document)
-        
-        # 7. Trigger background task to process document
-        # Use wrapper function to create new DB session for background task
-        background_tasks.add_task(
-            process_document_background,
-            document_id=new_document.id
+        await db.commit()
+        await db.refresh(new_document)
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Upload failed: {str(e)}"
         )
-        
-        return new_document
     
+    # 5. Đẩy task xử lý document sang Celery worker (retry + scale riêng)
+    # File đã nằm trên MinIO nhưng không có task -> failed để không kẹt pending_validation
+    await _enqueue_processing(db, new_document.id, fallback_status="failed")
+    
+    return new_document
+
+
+# ============================================
+# Direct upload: presigned PUT (bytes không đi qua backend)
+# ============================================
+@router.post("/upload/init", response_model=DocumentUploadInitResponse, status_code=status.HTTP_201_CREATED)
+async def init_upload(
+    request: DocumentUploadInitRequest,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Khởi tạo upload: tạo document (status uploading) và trả presigned PUT URL
+    
+    Client PUT file lên upload_url rồi gọi POST /upload/{document_id}/complete
+    """
+    normalized_file_name = _normalize_upload_filename(request.file_name, request.content_type)
+    ext = os.path.splitext(normalized_file_name)[1].lower()
+    
+    _validate_upload(ext, request.content_type, request.file_size)
+    await _ensure_processing_capacity()
+    
+    object_name = minio_service.new_object_name(normalized_file_name, str(current_user.id))
+    try:
+        # Ký URL chỉ tính toán local (client có region), không gọi MinIO
+        upload_url = minio_service.get_presigned_upload_url(object_name)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Upload failed: {str(e)}"
         )
+    
+    new_document_id = uuid4()
+    new_document = Document(
+        id=new_document_id,
+        canonical_document_id=new_document_id,
+        user_id=current_user.id,
+        title=request.title or normalized_file_name,
+        file_name=normalized_file_name,
+        file_path=f"{settings.MINIO_BUCKET_NAME}/{object_name}",
+        object_name=object_name,
+        file_size=request.file_size,
+        file_type=request.content_type,
+        category=request.category or _detect_category(ext, request.content_type),
+        tags=request.tags or [],
+        is_processed=False,
+        processing_status="uploading"
+    )
+    db.add(new_document)
+    await db.commit()
+    
+    return DocumentUploadInitResponse(
+        document_id=new_document_id,
+        upload_url=upload_url,
+        expires_in=int(PRESIGNED_UPLOAD_EXPIRES.total_seconds())
+    )
+
+
+@router.post("/upload/{document_id}/complete", response_model=DocumentResponse)
+async def complete_upload(
+    document_id: UUID,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Xác nhận client đã PUT xong file: kiểm tra object trên MinIO và đẩy task xử lý
+    """
+    document = await _get_owned_document(db, document_id, current_user.id)
+    if document.processing_status != "uploading":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload already completed"
+        )
+    
+    stat = await run_in_threadpool(minio_service.stat_file, document.object_name)
+    if stat is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File has not been uploaded yet"
+        )
+    if stat["size"] > MAX_UPLOAD_SIZE:
+        # Presigned PUT không giới hạn được kích thước -> kiểm tra lại sau khi upload
+        await run_in_threadpool(minio_service.delete_file, document.object_name)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File quá lớn. Kích thước tối đa là 20 MB (file hiện tại: {stat['size'] / (1024*1024):.1f} MB)"
+        )
+    
+    await _ensure_processing_capacity()
+    
+    # Chỉ một request complete chuyển được uploading -> pending_validation
+    result = await db.execute(
+        update(Document)
+        .where(Document.id == document.id, Document.processing_status == "uploading")
+        .values(file_size=stat["size"], processing_status="pending_validation")
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload already completed"
+        )
+    await db.commit()
+    
+    # Enqueue lỗi -> trả về uploading, client gọi lại /complete (object vẫn còn trên MinIO)
+    await _enqueue_processing(db, document.id, fallback_status="uploading")
+    
+    return document
 
 
 # ============================================
@@ -353,48 +571,42 @@ async def upload_document(
 async def download_document(
     document_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Download file gốc từ MinIO
+    Download file gốc: redirect tới presigned GET URL, bytes đi thẳng từ MinIO
     """
-    from fastapi.responses import StreamingResponse
+    # Owner hoặc user được share; không có quyền cũng trả 404
+    document = await _get_owned_document(db, document_id, current_user.id, include_shared=True)
     
-    document = db.query(Document).filter(
-        Document.id == document_id
-    ).first()
-    
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found"
+    try:
+        return RedirectResponse(
+            _presigned_download_url(document),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT
         )
-    
-    # Kiểm tra quyền truy cập
-    if document.user_id != current_user.id:
-        # TODO: Kiểm tra document có được share không
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this document"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Download failed: {str(e)}"
         )
+
+
+@router.get("/{document_id}/download-url", response_model=DocumentDownloadUrlResponse)
+async def get_download_url(
+    document_id: UUID,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Presigned GET URL dạng JSON - cho client gọi API bằng Authorization header
+    (header không theo được redirect sang host MinIO)
+    """
+    document = await _get_owned_document(db, document_id, current_user.id, include_shared=True)
     
     try:
-        # Get object name from file_path (remove bucket prefix)
-        object_name = document.file_path.split("/", 1)[1]
-        
-        # Download from MinIO
-        file_data = minio_service.download_file(object_name)
-        
-        # Return as streaming response
-        from io import BytesIO
-        from urllib.parse import quote
-        encoded_name = quote(document.file_name, safe='')
-        return StreamingResponse(
-            BytesIO(file_data),
-            media_type=document.file_type,
-            headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_name}"
-            }
+        return DocumentDownloadUrlResponse(
+            url=_presigned_download_url(document),
+            expires_in=int(PRESIGNED_DOWNLOAD_EXPIRES.total_seconds())
         )
     except Exception as e:
         raise HTTPException(
@@ -410,43 +622,27 @@ async def download_document(
 async def preview_document(
     document_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Serve file inline (for browser preview, no Content-Disposition: attachment)
     """
-    from fastapi.responses import StreamingResponse
-
-    document = db.query(Document).filter(
-        Document.id == document_id
-    ).first()
-
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found"
-        )
-
-    if document.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this document"
-        )
+    document = await _get_owned_document(db, document_id, current_user.id, include_shared=True)
 
     try:
-        object_name = document.file_path.split("/", 1)[1]
-        file_data = minio_service.download_file(object_name)
+        response = await run_in_threadpool(minio_service.open_stream, document.object_name)
 
-        from io import BytesIO
-        from urllib.parse import quote
         encoded_name = quote(document.file_name, safe='')
+        headers = {
+            "Content-Disposition": f"inline; filename*=UTF-8''{encoded_name}",
+            "Cache-Control": "private, max-age=300",
+        }
+        if response.headers.get("Content-Length"):
+            headers["Content-Length"] = response.headers["Content-Length"]
         return StreamingResponse(
-            BytesIO(file_data),
+            minio_service.iter_stream(response),
             media_type=document.file_type,
-            headers={
-                "Content-Disposition": f"inline; filename*=UTF-8''{encoded_name}",
-                "Cache-Control": "private, max-age=300",
-            }
+            headers=headers
         )
     except Exception as e:
         raise HTTPException(
@@ -462,28 +658,40 @@ async def preview_document(
 async def get_document(
     document_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Lấy chi tiết document
     """
-    document = db.query(Document).filter(
-        Document.id == document_id
-    ).first()
-    
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found"
+    cache_key = document_cache_key(document_id)
+    cached = await cache_manager.get_json(cache_key)
+    if cached is not None:
+        user_id = str(current_user.id)
+        can_access = cached["user_id"] == user_id or any(
+            share["shared_with_user_id"] == user_id for share in cached["shares"] or []
         )
-    
-    # Kiểm tra quyền truy cập
-    if document.user_id != current_user.id:
-        # TODO: Kiểm tra document có được share không
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this document"
+        if not can_access:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
+            )
+        return cached
+    
+    # chunks/embeddings/shares đều nằm trong response -> eager load bằng SELECT ... IN
+    document = await _get_owned_document(
+        db, document_id, current_user.id, include_shared=True,
+        options=(
+            selectinload(Document.chunks),
+            selectinload(Document.embeddings),
+            selectinload(Document.shares)
         )
+    )
+    
+    # Chỉ cache khi đã xử lý xong - worker đổi status/chunks mà không qua API
+    if document.processing_status in DOCUMENT_TERMINAL_STATUSES:
+        payload = DocumentDetailResponse.model_validate(document).model_dump(mode="json")
+        await cache_manager.set_json(cache_key, payload, HOT_READ_CACHE_TTL)
+        return payload
     
     return document
 
@@ -496,26 +704,12 @@ async def update_document(
     document_id: UUID,
     request: DocumentUpdateRequest,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Cập nhật document
     """
-    document = db.query(Document).filter(
-        Document.id == document_id
-    ).first()
-    
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found"
-        )
-    
-    if document.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to update this document"
-        )
+    document = await _get_owned_document(db, document_id, current_user.id)
     
     # Cập nhật fields
     if request.title is not None:
@@ -525,8 +719,9 @@ async def update_document(
     if request.tags is not None:
         document.tags = request.tags
     
-    db.commit()
-    db.refresh(document)
+    await db.commit()
+    await db.refresh(document)
+    await cache_manager.delete(document_cache_key(document_id))
     
     return document
 
@@ -538,51 +733,61 @@ async def update_document(
 async def delete_document(
     document_id: UUID,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Xóa document (bao gồm file từ MinIO và vectors từ Qdrant)
     """
-    document = db.query(Document).filter(
-        Document.id == document_id
-    ).first()
-    
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found"
-        )
-    
-    if document.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to delete this document"
-        )
+    document = await _get_owned_document(db, document_id, current_user.id)
     
     try:
         canonical_id = document.canonical_document_id or document.id
 
         # 1. Delete vectors only when this is the last document referencing
         # the canonical vector set.
-        remaining_canonical_refs = db.query(Document).filter(
-            Document.id != document.id,
-            Document.canonical_document_id == canonical_id,
-        ).count()
+        remaining_canonical_refs = await db.scalar(
+            select(func.count()).select_from(Document).where(
+                Document.id != document.id,
+                Document.canonical_document_id == canonical_id,
+            )
+        )
         if document.is_processed and remaining_canonical_refs == 0:
             await ai_service.delete_document_vectors(canonical_id, db)
 
         # 2. Delete file object only when no other document references it.
-        remaining_file_refs = db.query(Document).filter(
-            Document.id != document.id,
-            Document.file_path == document.file_path,
-        ).count()
+        remaining_file_refs = await db.scalar(
+            select(func.count()).select_from(Document).where(
+                Document.id != document.id,
+                Document.file_path == document.file_path,
+            )
+        )
         if remaining_file_refs == 0:
-            object_name = document.file_path.split("/", 1)[1]
-            minio_service.delete_file(object_name)
-
-        # 3. Delete from PostgreSQL (cascade deletes chunks & embeddings of this row)
-        db.delete(document)
-        db.commit()
+            await run_in_threadpool(minio_service.delete_file, document.object_name)
+
+        # 3. Bỏ document khỏi context_documents các chat session của user
+        # (tìm qua GIN index), giữ nguyên updated_at để không đổi thứ tự danh sách
+        await db.execute(
+            update(ChatSession)
+            .where(
+                ChatSession.user_id == current_user.id,
+                ChatSession.context_documents.contains([str(document_id)])
+            )
+            .values(
+                context_documents=func.array_remove(
+                    ChatSession.context_documents,
+                    literal(str(document_id), ChatSession.context_documents.type.item_type)
+                ),
+                updated_at=ChatSession.updated_at
+            )
+        )
+        
+        # 4. Delete from PostgreSQL (cascade deletes chunks & embeddings of this row)
+        await db.delete(document)
+        await db.commit()
+        await cache_manager.delete(
+            document_cache_key(document_id),
+            chat_session_list_cache_key(current_user.id)
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -599,31 +804,15 @@ async def share_document(
     document_id: UUID,
     request: DocumentShareRequest,
     current_user: CurrentUser,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Chia sẻ document với user khác
     """
-    document = db.query(Document).filter(
-        Document.id == document_id
-    ).first()
-    
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found"
-        )
-    
-    if document.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to share this document"
-        )
+    await _get_owned_document(db, document_id, current_user.id)
     
     # Kiểm tra user được share tồn tại
-    shared_user = db.query(User).filter(
-        User.id == request.shared_with_user_id
-    ).first()
+    shared_user = await db.get(User, request.shared_with_user_id)
     
     if not shared_user:
         raise HTTPException(
@@ -631,28 +820,20 @@ async def share_document(
             detail="User not found"
         )
     
-    # Kiểm tra đã share chưa
-    existing_share = db.query(DocumentShare).filter(
-        DocumentShare.document_id == document_id,
-        DocumentShare.shared_with_user_id == request.shared_with_user_id
-    ).first()
-    
-    if existing_share:
-        # Cập nhật permission
-        existing_share.permission = request.permission
-        db.commit()
-        db.refresh(existing_share)
-        return existing_share
-    
-    # Tạo share mới
-    new_share = DocumentShare(
+    # Tạo share hoặc cập nhật permission trong một câu UPSERT
+    stmt = pg_insert(DocumentShare).values(
         document_id=document_id,
         shared_with_user_id=request.shared_with_user_id,
         permission=request.permission
     )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DocumentShare.document_id, DocumentShare.shared_with_user_id],
+        set_={"permission": request.permission, "updated_at": func.timezone("utc", func.clock_timestamp())},
+    ).returning(DocumentShare)
     
-    db.add(new_share)
-    db.commit()
-    db.refresh(new_share)
+    result = await db.execute(stmt)
+    share = result.scalar_one()
+    await db.commit()
+    await cache_manager.delete(document_cache_key(document_id))
     
-    return new_share
+    return share
@@ -2,12 +2,16 @@
 Group routes - Groups management
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 from uuid import UUID
 
+from core.cache import cache_manager, group_cache_key, GROUP_CACHE_TTL
 from core.databases import get_db
-from api.dependencies import get_current_user, CurrentUser
+from core.responses import ORJSONResponse
+from api.dependencies import CurrentUser
 from schemas.group import (
     GroupResponse, GroupCreateRequest, GroupUpdateRequest,
     GroupMemberAddRequest, GroupMessageCreateRequest, GroupDetailResponse,
@@ -18,8 +22,7 @@ from models.groups import Group, GroupMember, GroupMessage, GroupFile
 
 router = APIRouter(
     prefix="/api/groups", 
-    tags=["groups"],
-    dependencies=[Depends(get_current_user)]  # Apply authentication to all endpoints
+    tags=["groups"]  # Authentication gắn ở protected_router (main.py)
 )
 
 
@@ -35,27 +38,53 @@ async def list_groups(
 ):
     """
     Lấy danh sách groups của user, kèm avatar 2 member mới nhất
+    
+    Dict đã ở dạng JSON: trả thẳng qua ORJSONResponse, bỏ qua jsonable_encoder
     """
     # Lấy groups mà user đã join
     member_groups = db.query(Group).join(GroupMember).filter(
         GroupMember.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    ).order_by(Group.created_at.desc(), Group.id).offset(skip).limit(limit).all()
+    
+    # 2 member mới nhất của mọi group trong trang - một query (window function)
+    # thay vì 1 query/group + 1 query/member
+    avatars_by_group = {group.id: [] for group in member_groups}
+    if member_groups:
+        recent_rank = func.row_number().over(
+            partition_by=GroupMember.group_id,
+            order_by=GroupMember.joined_at.desc()
+        ).label("recent_rank")
+        recent_members = db.query(
+            GroupMember.group_id,
+            GroupMember.user_id,
+            recent_rank
+        ).filter(
+            GroupMember.group_id.in_(avatars_by_group.keys())
+        ).subquery()
+        
+        rows = db.query(
+            recent_members.c.group_id,
+            User.avatar_url,
+            User.full_name,
+            User.username
+        ).join(
+            User, User.id == recent_members.c.user_id
+        ).filter(
+            recent_members.c.recent_rank <= 2
+        ).order_by(
+            recent_members.c.group_id,
+            recent_members.c.recent_rank
+        ).all()
+        
+        for row in rows:
+            avatars_by_group[row.group_id].append({
+                "avatar_url": row.avatar_url,
+                "full_name": row.full_name or row.username,
+            })
     
     result = []
     for group in member_groups:
-        # Get last 2 members for avatar display
-        recent_members = db.query(GroupMember).filter(
-            GroupMember.group_id == group.id
-        ).order_by(GroupMember.joined_at.desc()).limit(2).all()
-        
-        member_avatars = []
-        for m in recent_members:
-            u = db.query(User).filter(User.id == m.user_id).first()
-            if u:
-                member_avatars.append({
-                    "avatar_url": u.avatar_url,
-                    "full_name": u.full_name or u.username,
-                })
+        member_avatars = avatars_by_group[group.id]
         
         result.append({
             "id": str(group.id),
@@ -71,7 +100,7 @@ async def list_groups(
             "member_avatars": member_avatars,
         })
     
-    return result
+    return ORJSONResponse(result)
 
 
 # ============================================
@@ -91,23 +120,20 @@ async def create_group(
         group_type=request.group_type,
         is_public=request.is_public,
         description=request.description,
-        created_by=current_user.id,
-        member_count=1
+        created_by=current_user.id
     )
     
-    db.add(new_group)
-    db.commit()
-    db.refresh(new_group)
-    
-    # Thêm creator vào group
+    # Thêm creator vào group - cùng transaction với group (một COMMIT),
+    # group_id được ORM điền khi flush
     creator_member = GroupMember(
-        group_id=new_group.id,
+        group=new_group,
         user_id=current_user.id,
         role="owner"
     )
     
-    db.add(creator_member)
+    db.add_all([new_group, creator_member])
     db.commit()
+    db.refresh(new_group)
     
     return new_group
 
@@ -124,9 +150,27 @@ async def get_group(
     """
     Lấy chi tiết group
     """
-    group = db.query(Group).filter(
-        Group.id == group_id
-    ).first()
+    cache_key = group_cache_key(group_id)
+    cached = await cache_manager.get_json(cache_key)
+    if cached is not None:
+        is_member = any(m["user_id"] == str(current_user.id) for m in cached["members"])
+        if not is_member and not cached["is_public"]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have permission to access this group"
+            )
+        return cached
+    
+    # members/messages/files đều được serialize -> eager load bằng SELECT ... IN
+    group = db.get(
+        Group,
+        group_id,
+        options=[
+            selectinload(Group.members),
+            selectinload(Group.messages),
+            selectinload(Group.files)
+        ]
+    )
     
     if not group:
         raise HTTPException(
@@ -134,19 +178,18 @@ async def get_group(
             detail="Group not found"
         )
     
-    # Kiểm tra user có quyền truy cập
-    member = db.query(GroupMember).filter(
-        GroupMember.group_id == group_id,
-        GroupMember.user_id == current_user.id
-    ).first()
+    # Kiểm tra user có quyền truy cập (members đã được load sẵn)
+    is_member = any(m.user_id == current_user.id for m in group.members)
     
-    if not member and not group.is_public:
+    if not is_member and not group.is_public:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have permission to access this group"
         )
     
-    return group
+    payload = GroupDetailResponse.model_validate(group).model_dump(mode="json")
+    await cache_manager.set_json(cache_key, payload, GROUP_CACHE_TTL)
+    return payload
 
 
 # ============================================
@@ -162,9 +205,7 @@ async def update_group(
     """
     Cập nhật group
     """
-    group = db.query(Group).filter(
-        Group.id == group_id
-    ).first()
+    group = db.get(Group, group_id)
     
     if not group:
         raise HTTPException(
@@ -194,6 +235,7 @@ async def update_group(
     
     db.commit()
     db.refresh(group)
+    await cache_manager.delete(group_cache_key(group_id))
     
     return group
 
@@ -211,9 +253,7 @@ async def add_group_member(
     """
     Thêm member vào group
     """
-    group = db.query(Group).filter(
-        Group.id == group_id
-    ).first()
+    group = db.get(Group, group_id)
     
     if not group:
         raise HTTPException(
@@ -234,9 +274,7 @@ async def add_group_member(
         )
     
     # Kiểm tra user được thêm tồn tại
-    target_user = db.query(User).filter(
-        User.id == request.user_id
-    ).first()
+    target_user = db.get(User, request.user_id)
     
     if not target_user:
         raise HTTPException(
@@ -244,29 +282,24 @@ async def add_group_member(
             detail="User not found"
         )
     
-    # Kiểm tra đã là member chưa
-    existing_member = db.query(GroupMember).filter(
-        GroupMember.group_id == group_id,
-        GroupMember.user_id == request.user_id
-    ).first()
+    # Thêm member: ON CONFLICT DO NOTHING thay cho SELECT kiểm tra trước -
+    # không có dòng trả về nghĩa là đã là member (kể cả khi hai request chạy đồng thời)
+    inserted_id = db.execute(
+        pg_insert(GroupMember)
+        .values(group_id=group_id, user_id=request.user_id, role="member")
+        .on_conflict_do_nothing(index_elements=[GroupMember.group_id, GroupMember.user_id])
+        .returning(GroupMember.id)
+    ).scalar_one_or_none()
     
-    if existing_member:
+    if inserted_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is already a member of this group"
         )
     
-    # Thêm member
-    new_member = GroupMember(
-        group_id=group_id,
-        user_id=request.user_id,
-        role="member"
-    )
-    
-    db.add(new_member)
-    group.member_count += 1
-    
+    # member_count do trigger trên group_members tăng trong cùng transaction
     db.commit()
+    await cache_manager.delete(group_cache_key(group_id))
     
     return {"message": "Member added successfully"}
 
@@ -283,7 +316,7 @@ async def list_group_members(
     """
     Lấy danh sách thành viên của group
     """
-    group = db.query(Group).filter(Group.id == group_id).first()
+    group = db.get(Group, group_id)
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
 
@@ -329,9 +362,7 @@ async def send_group_message(
     """
     Gửi tin nhắn trong group
     """
-    group = db.query(Group).filter(
-        Group.id == group_id
-    ).first()
+    group = db.get(Group, group_id)
     
     if not group:
         raise HTTPException(
@@ -362,6 +393,7 @@ async def send_group_message(
     db.add(new_message)
     db.commit()
     db.refresh(new_message)
+    await cache_manager.delete(group_cache_key(group_id))
     
     return {"message": "Message sent successfully", "data": new_message}
 
@@ -378,9 +410,7 @@ async def delete_group(
     """
     Xóa group
     """
-    group = db.query(Group).filter(
-        Group.id == group_id
-    ).first()
+    group = db.get(Group, group_id)
     
     if not group:
         raise HTTPException(
@@ -397,6 +427,7 @@ async def delete_group(
     
     db.delete(group)
     db.commit()
+    await cache_manager.delete(group_cache_key(group_id))
 
 
 # ============================================
@@ -411,7 +442,7 @@ async def leave_group(
     """
     Rời khỏi group
     """
-    group = db.query(Group).filter(Group.id == group_id).first()
+    group = db.get(Group, group_id)
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
 
@@ -426,8 +457,7 @@ async def leave_group(
     if group.created_by == current_user.id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Group owner cannot leave. Delete the group instead.")
 
-    db.delete(member)
-    group.member_count = max(0, (group.member_count or 1) - 1)
+    db.delete(member)  # member_count do trigger trên group_members giảm
 
     # Add system message
     system_msg = GroupMessage(
@@ -439,5 +469,6 @@ async def leave_group(
     db.add(system_msg)
 
     db.commit()
+    await cache_manager.delete(group_cache_key(group_id))
 
     return {"message": "Left group successfully"}
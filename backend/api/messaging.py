@@ -9,7 +9,9 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Query
 from sqlalchemy.orm import Session
 
-from core.databases import get_db, SessionLocal
+from core.cache import cache_manager, group_cache_key
+from core.databases import get_db, SessionLocal, AsyncSessionLocal
+from core.responses import ORJSONResponse
 from api.dependencies import get_current_user, CurrentUser
 from services.messaging_service import messaging_service
 from services.user_presence import user_presence
@@ -92,7 +94,8 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(None)):
 
     db = SessionLocal()
     try:
-        user = await auth_service.get_current_user_from_token(token, db)
+        async with AsyncSessionLocal() as auth_db:
+            user = await auth_service.get_current_user_from_token(token, auth_db)
     except Exception:
         await websocket.close(code=4001)
         db.close()
@@ -224,6 +227,7 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(None)):
                 )
 
                 if gm:
+                    await cache_manager.delete(group_cache_key(group_id))
                     members = messaging_service.get_group_members(group_id, db)
                     member_ids = [str(m["user"].id) for m in members if m["user"]]
 
@@ -410,6 +414,7 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(None)):
                 else:
                     deleted = messaging_service.delete_group_message(message_id, user_id, db)
                     if deleted:
+                        await cache_manager.delete(group_cache_key(deleted.group_id))
                         members = messaging_service.get_group_members(str(deleted.group_id), db)
                         member_ids = [str(m["user"].id) for m in members if m["user"]]
                         event = {
@@ -454,7 +459,7 @@ async def get_conversations(
     current_user: CurrentUser,
     db: Session = Depends(get_db),
 ):
-    """Lấy tất cả conversations (direct + group) thống nhất"""
+    """Lấy tất cả conversations (direct + group) thống nhất - trả thẳng qua ORJSONResponse"""
     conversations = messaging_service.get_unified_conversations(str(current_user.id), db)
 
     # Enrich with online status
@@ -482,7 +487,7 @@ async def get_conversations(
             else:
                 convo["last_activity"] = None
 
-    return conversations
+    return ORJSONResponse(conversations)
 
 
 @router.post("/conversations")
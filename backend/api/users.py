@@ -2,21 +2,32 @@
 User routes - Profile, Settings
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+import os
 
+from core.cache import cache_manager, user_cache_key, user_settings_cache_key, HOT_READ_CACHE_TTL
 from core.databases import get_db
-from api.dependencies import get_current_user, CurrentUser
+from api.dependencies import CurrentUser
+from services.auth_service import auth_service
 from services.user_service import user_service
 from services.minio_service import minio_service
 from schemas.user import UserResponse, UserUpdateRequest, UserSettingsResponse, UserSettingsUpdateRequest, ChangePasswordRequest
 from models.users import User
+from utils.validators import sniff_image_mime
 
 router = APIRouter(
     prefix="/api/users", 
-    tags=["users"],
-    dependencies=[Depends(get_current_user)]  # Apply authentication to all endpoints
+    tags=["users"]  # Authentication gắn ở protected_router (main.py)
 )
 
+AVATAR_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
 
 # ============================================
 # Get current user
@@ -50,6 +61,7 @@ async def update_current_user(
         full_name=request.full_name,
         db=db
     )
+    await auth_service.invalidate_user_cache(current_user.id)
     
     return updated_user
 
@@ -66,6 +78,11 @@ async def get_user(
     """
     Lấy thông tin user theo ID (public profile)
     """
+    cache_key = user_cache_key(user_id)
+    cached = await cache_manager.get_json(cache_key)
+    if cached is not None:
+        return cached
+    
     user = user_service.get_user_by_id(user_id, db)
     
     if not user:
@@ -74,7 +91,9 @@ async def get_user(
             detail="User not found"
         )
     
-    return user
+    payload = UserResponse.from_orm_trusted(user).model_dump(mode="json")
+    await cache_manager.set_json(cache_key, payload, HOT_READ_CACHE_TTL)
+    return payload
 
 
 # ============================================
@@ -88,8 +107,15 @@ async def get_user_settings(
     """
     Lấy cài đặt của user hiện tại
     """
+    cache_key = user_settings_cache_key(current_user.id)
+    cached = await cache_manager.get_json(cache_key)
+    if cached is not None:
+        return cached
+    
     settings = user_service.get_user_settings(str(current_user.id), db)
-    return settings
+    payload = UserSettingsResponse.from_orm_trusted(settings).model_dump(mode="json")
+    await cache_manager.set_json(cache_key, payload, HOT_READ_CACHE_TTL)
+    return payload
 
 
 # ============================================
@@ -113,6 +139,7 @@ async def update_user_settings(
         two_factor_enabled=request.two_factor_enabled,
         db=db
     )
+    await cache_manager.delete(user_settings_cache_key(current_user.id))
     
     return settings
 
@@ -130,7 +157,7 @@ async def change_password(
     Đổi mật khẩu của user hiện tại
     """
     try:
-        user_service.change_password(
+        await user_service.change_password(
             user_id=str(current_user.id),
             current_password=request.current_password,
             new_password=request.new_password,
@@ -166,23 +193,39 @@ async def upload_avatar(
             detail=f"Invalid file type. Allowed types: {', '.join(allowed_types)}"
         )
     
-    # Validate file size (5MB max)
-    file_content = await file.read()
-    if len(file_content) > 5 * 1024 * 1024:
+    # Validate file size (5MB max) - dùng kích thước đã spool, không đọc file
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
+    if file_size > 5 * 1024 * 1024:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File size exceeds 5MB limit"
         )
     
+    # Kiểm tra magic bytes - chặn file khác (vd .exe) đổi tên/Content-Type thành ảnh
+    header = file.file.read(12)
+    file.file.seek(0)
+    detected_type = sniff_image_mime(header)
+    if detected_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File content is not a supported image"
+        )
+    
     try:
-        # Upload to MinIO
-        file_extension = file.filename.split(".")[-1] if "." in file.filename else "jpg"
+        # Upload to MinIO (extension + content type theo nội dung thật của file)
+        file_extension = AVATAR_EXTENSIONS[detected_type]
         object_name = f"avatars/{current_user.id}.{file_extension}"
         
-        avatar_url = minio_service.upload_file_bytes(
-            file_content=file_content,
+        avatar_url = await run_in_threadpool(
+            minio_service.upload_fileobj,
+            file_obj=file.file,
             object_name=object_name,
-            content_type=file.content_type
+            content_type=detected_type,
+            length=file_size
         )
         
         # Update user avatar URL
@@ -191,6 +234,7 @@ async def upload_avatar(
             avatar_url=avatar_url,
             db=db
         )
+        await auth_service.invalidate_user_cache(current_user.id)
         
         return updated_user
         
@@ -1,6 +1,8 @@
-from core.databases import SessionLocal
+from core.databases import SessionLocal, register_models
 from services.messaging_service import MessagingService
 
+register_models()
+
 db = SessionLocal()
 try:
     convos = MessagingService.get_unified_conversations("3f091b25-f72c-49ff-b28f-13b4faceb308", db)
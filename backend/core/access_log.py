@@ -0,0 +1,56 @@
+"""
+Access Log Sampling
+Thay access log của uvicorn/gunicorn (một dòng cho mọi request) bằng log lấy mẫu
+"""
+import logging
+import random
+import time
+from typing import Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger("access")
+
+
+class AccessLogMiddleware:
+    """
+    ASGI middleware ghi access log cho một tỉ lệ request (sample_rate)
+
+    Request lỗi 5xx luôn được ghi. Path trong skip_paths (health check của
+    Docker/load balancer) đi thẳng vào app, không đo thời gian cũng không log.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 0.01, skip_paths: Iterable[str] = ()) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        sampled = random.random() < self.sample_rate
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if sampled or status_code >= 500:
+                logger.info(
+                    "request",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    },
+                )
@@ -0,0 +1,179 @@
+"""
+Quản lý kết nối Redis cho cache dữ liệu đọc nhiều (hot read paths)
+"""
+import json
+import logging
+import redis.asyncio as redis
+from typing import Any, Optional
+
+from .config import settings
+from .redis import get_redis_pool
+
+logger = logging.getLogger(__name__)
+
+
+HOT_READ_CACHE_TTL = 300  # document/user/settings (giây)
+GROUP_CACHE_TTL = 60  # Group detail kèm messages - đổi thường xuyên hơn
+
+
+def document_cache_key(document_id: Any) -> str:
+    return f"document:{document_id}"
+
+
+def user_cache_key(user_id: Any) -> str:
+    return f"user:{user_id}"
+
+
+def user_settings_cache_key(user_id: Any) -> str:
+    return f"user_settings:{user_id}"
+
+
+def group_cache_key(group_id: Any) -> str:
+    return f"group:{group_id}"
+
+
+def chat_session_list_cache_key(user_id: Any) -> str:
+    # Hash: mỗi field là một trang "{skip}:{limit}" -> invalidate bằng một DEL
+    return f"chat:user:{user_id}:sessions"
+
+
+class RedisCacheManager:
+    """
+    Cache JSON payload nhỏ trên Redis
+    
+    Khác với blacklist (fail-secure), cache là fail-open:
+    lỗi Redis chỉ làm cache miss, request vẫn đi xuống database
+    """
+    
+    def __init__(self):
+        self.redis_client: Optional[redis.Redis] = None
+    
+    async def connect(self):
+        """
+        Kết nối tới Redis server (bỏ qua nếu REDIS_CACHE_ENABLED=False -
+        mọi get là miss, set/delete là no-op)
+        """
+        if not settings.REDIS_CACHE_ENABLED:
+            return
+        
+        self.redis_client = redis.Redis(connection_pool=get_redis_pool(settings.REDIS_CACHE_DB))
+    
+    async def disconnect(self):
+        """
+        Ngắt kết nối Redis (pool dùng chung do close_redis_pools đóng)
+        """
+        if self.redis_client:
+            await self.redis_client.close()
+    
+    async def get_json(self, key: str) -> Optional[Any]:
+        """
+        Lấy giá trị JSON từ cache
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Giá trị đã decode, None nếu miss hoặc Redis lỗi
+        """
+        if not self.redis_client:
+            return None
+        
+        try:
+            value = await self.redis_client.get(key)
+            return json.loads(value) if value is not None else None
+        except Exception as e:
+            logger.warning("cache get failed", extra={"key": key, "error": str(e)})
+            return None
+    
+    async def set_json(self, key: str, value: Any, ttl: int) -> bool:
+        """
+        Lưu giá trị JSON vào cache
+        
+        Args:
+            key: Cache key
+            value: Giá trị JSON-serializable
+            ttl: Thời gian sống (giây)
+        
+        Returns:
+            True nếu lưu thành công
+        """
+        if not self.redis_client:
+            return False
+        
+        try:
+            await self.redis_client.setex(key, ttl, json.dumps(value, default=str))
+            return True
+        except Exception as e:
+            logger.warning("cache set failed", extra={"key": key, "error": str(e)})
+            return False
+    
+    async def hget_json(self, key: str, field: str) -> Optional[Any]:
+        """
+        Lấy một field JSON trong hash (dùng cho các trang của cùng một list)
+        
+        Args:
+            key: Hash key
+            field: Field trong hash
+        
+        Returns:
+            Giá trị đã decode, None nếu miss hoặc Redis lỗi
+        """
+        if not self.redis_client:
+            return None
+        
+        try:
+            value = await self.redis_client.hget(key, field)
+            return json.loads(value) if value is not None else None
+        except Exception as e:
+            logger.warning("cache hget failed", extra={"key": key, "error": str(e)})
+            return None
+    
+    async def hset_json(self, key: str, field: str, value: Any, ttl: int) -> bool:
+        """
+        Lưu một field JSON vào hash và đặt TTL cho cả hash
+        
+        Args:
+            key: Hash key
+            field: Field trong hash
+            value: Giá trị JSON-serializable
+            ttl: Thời gian sống của hash (giây)
+        
+        Returns:
+            True nếu lưu thành công
+        """
+        if not self.redis_client:
+            return False
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, field, json.dumps(value, default=str))
+                pipe.expire(key, ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning("cache hset failed", extra={"key": key, "error": str(e)})
+            return False
+    
+    async def delete(self, *keys: str) -> bool:
+        """
+        Xóa các key khỏi cache (invalidate)
+        
+        Args:
+            keys: Các cache key cần xóa
+        
+        Returns:
+            True nếu xóa thành công
+        """
+        if not self.redis_client or not keys:
+            return False
+        
+        try:
+            await self.redis_client.delete(*keys)
+            return True
+        except Exception as e:
+            logger.warning("cache delete failed", extra={"keys": list(keys), "error": str(e)})
+            return False
+
+
+# Global Redis cache manager instance
+cache_manager = RedisCacheManager()
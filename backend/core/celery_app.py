@@ -0,0 +1,69 @@
+"""
+Celery app - hàng đợi task nền (broker/result backend trên Redis)
+Worker chạy riêng: celery -A core.celery_app worker
+"""
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+from celery import Celery
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+celery_app = Celery(
+    "jvb_backend",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["tasks.document_tasks", "tasks.maintenance_tasks"],
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    # Ack sau khi xử lý xong: worker chết giữa chừng thì task được giao lại
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Task nặng (embed cả file) - mỗi process chỉ giữ 1 task chờ
+    worker_prefetch_multiplier=1,
+    # Giới hạn số task chạy đồng thời -> trần bộ nhớ của worker có thể đoán trước
+    worker_concurrency=settings.MAX_PROCESS_CONCURRENCY,
+    result_expires=3600,
+    # Celery beat (worker chạy kèm --beat): tạo trước partition tháng cho bảng log
+    beat_schedule={
+        "ensure-monthly-partitions": {
+            "task": "maintenance.ensure_partitions",
+            "schedule": 24 * 60 * 60,
+        },
+        "reap-stale-uploads": {
+            "task": "maintenance.reap_stale_uploads",
+            "schedule": 15 * 60,
+        },
+    },
+)
+
+# Queue mặc định của Celery - trên Redis broker là một list cùng tên
+DOCUMENT_QUEUE = celery_app.conf.task_default_queue
+
+_broker_client: Optional[redis.Redis] = None
+
+
+async def get_queue_depth() -> Optional[int]:
+    """
+    Số task đang chờ trong queue xử lý document
+    
+    Returns:
+        Độ dài queue, None nếu không đọc được broker (fail-open)
+    """
+    global _broker_client
+    
+    try:
+        if _broker_client is None:
+            _broker_client = redis.from_url(settings.CELERY_BROKER_URL)
+        return await _broker_client.llen(DOCUMENT_QUEUE)
+    except Exception as e:
+        logger.warning("queue depth check failed", extra={"error": str(e)})
+        return None
@@ -0,0 +1,72 @@
+"""
+Gzip Response Compression
+Nén response JSON/text (lịch sử chat, danh sách document...) trước khi trả về browser
+"""
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Chỉ nén nội dung dạng text - file (pdf, ảnh, zip) thường đã được nén sẵn
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/")
+
+
+class GZipMiddleware:
+    """
+    ASGI middleware nén response bằng gzip khi client gửi `Accept-Encoding: gzip`
+
+    Chỉ nén response một khối (không streaming) có kích thước >= minimum_size.
+    Response streaming (SSE chat, tải file) được giữ nguyên: GZipMiddleware của
+    Starlette nén cả stream và giữ lại từng event SSE trong buffer của gzip.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, compresslevel: int = 5) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        body_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, body_started
+
+            if message["type"] == "http.response.start":
+                # Giữ lại headers cho tới khi biết body có nén được không
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or body_started:
+                await send(message)
+                return
+
+            body_started = True
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_CONTENT_TYPES)
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = gzip.compress(body, compresslevel=self.compresslevel)
+            headers["Content-Encoding"] = "gzip"
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
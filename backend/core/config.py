@@ -3,8 +3,10 @@ Cấu hình ứng dụng FastAPI
 """
 from pydantic_settings import BaseSettings
 from datetime import timedelta
+from functools import cached_property
 from typing import Optional
-import json
+
+import orjson
 
 
 class Settings(BaseSettings):
@@ -12,10 +14,34 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str
+    DATABASE_USE_PGBOUNCER: bool = False  # DATABASE_URL trỏ tới PgBouncer (pool_mode=transaction)
+    DATABASE_STATEMENT_TIMEOUT_MS: int = 0  # Postgres statement_timeout cho sync engine (0 = tắt; áp cả init_db/Celery)
+    DATABASE_POOL_SIZE: int = 20  # Connection giữ sẵn của sync engine (mỗi process)
+    DATABASE_MAX_OVERFLOW: int = 40  # Connection sync mở thêm khi burst
+    DATABASE_ASYNC_POOL_SIZE: int = 20  # Connection giữ sẵn của async engine (mỗi process)
+    DATABASE_ASYNC_MAX_OVERFLOW: int = 30  # Connection mở thêm khi burst
+    DATABASE_CONNECTION_BUDGET: int = 800  # Tổng connection các Gunicorn worker được mở (Dockerfile.prod chia ra số worker)
+    DATABASE_ECHO: bool = False  # Log mọi câu SQL (logger sqlalchemy.engine, INFO) - chỉ bật khi cần xem
     
     # Redis
     REDIS_URL: str
     REDIS_BLACKLIST_DB: int
+    REDIS_CACHE_DB: int = 3  # Cache cho hot read endpoints (presence dùng DB 2)
+    REDIS_CACHE_ENABLED: bool = True  # Tắt để bỏ qua cache (mọi read đi thẳng DB)
+    # Vẫn đọc key blacklist/token_pair dạng cũ (JWT nguyên văn) - tắt sau REFRESH_TOKEN_EXPIRE_DAYS
+    REDIS_LEGACY_TOKEN_KEYS: bool = True
+    # Số connection tối đa mỗi pool Redis (blacklist/presence/cache); hết thì request chờ tối đa REDIS_POOL_TIMEOUT giây
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: int = 5
+    # Nhớ trong process các token vừa kiểm tra là KHÔNG bị blacklist (giây, 0 = tắt)
+    # Logout ở process khác có hiệu lực chậm tối đa bấy nhiêu giây
+    BLACKLIST_NEGATIVE_CACHE_TTL: int = 15
+    
+    # Celery (task queue cho xử lý document)
+    CELERY_BROKER_URL: str = "redis://redis:6379/4"
+    CELERY_RESULT_BACKEND: str = "redis://redis:6379/5"
+    MAX_PROCESS_CONCURRENCY: int = 4  # Số task xử lý document chạy đồng thời mỗi worker
+    MAX_PROCESS_BACKLOG: int = 100  # Quá số task chờ này thì upload trả 503
     
     # JWT Settings (⚠️ KHÔNG hardcode SECRET_KEY - phải từ .env)
     SECRET_KEY: str
@@ -39,12 +65,13 @@ class Settings(BaseSettings):
     # Admin Settings - Parse JSON string from .env
     ADMIN_EMAIL: str = '[]'
     
-    def get_admin_emails(self) -> list[str]:
-        """Parse ADMIN_EMAIL JSON string to list"""
+    @cached_property
+    def admin_emails_list(self) -> list[str]:
+        """Parse ADMIN_EMAIL JSON string to list (parse một lần, cache trên instance)"""
         try:
             if isinstance(self.ADMIN_EMAIL, list):
                 return self.ADMIN_EMAIL
-            return json.loads(self.ADMIN_EMAIL)
+            return orjson.loads(self.ADMIN_EMAIL)
         except Exception:
             return []
     
@@ -55,6 +82,8 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    WORKERS: int = 1  # Số process khi chạy `python main.py` với DEBUG=False (prod dùng Gunicorn)
+    ACCESS_LOG_SAMPLE_RATE: float = 0.01  # Tỉ lệ request ghi access log (lỗi 5xx luôn ghi)
     
     # MinIO Settings (Object Storage)
     MINIO_ENDPOINT: str
@@ -63,12 +92,23 @@ class Settings(BaseSettings):
     MINIO_BUCKET_NAME: str = "jvb-documents"
     MINIO_SECURE: bool = False
     MINIO_URL: str  # Public URL for accessing uploaded files (e.g., http://localhost:9000)
+    MINIO_PART_SIZE: int = 64 * 1024 * 1024  # Part size khi multipart upload (>= 8 MiB)
+    MINIO_UPLOAD_THREADS: int = 8  # Số part upload song song
+    MINIO_POOL_MAXSIZE: int = 50  # Số connection HTTP giữ lại tới MinIO (dùng chung mọi request)
+    MINIO_REGION: str = "us-east-1"  # Region ký presigned URL (không phải gọi MinIO để hỏi region)
     
     # Qdrant Settings (Vector Database)
     QDRANT_HOST: str = "qdrant"
     QDRANT_PORT: int = 6333
     QDRANT_COLLECTION_NAME: str = "jvb_embeddings"
     QDRANT_API_KEY: Optional[str] = None
+    QDRANT_TIMEOUT: int = 5  # Giây - request Qdrant treo thì lỗi sớm thay vì giữ worker
+    QDRANT_POOL_MAXSIZE: int = 64  # Số connection HTTP tối đa tới Qdrant (dùng chung mọi request)
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = True  # Vector gửi dạng protobuf nhị phân thay vì JSON
+    # Quantization khi tạo collection: int8 (1 byte/dim) hoặc binary (1 bit/dim, cần oversampling
+    # cao hơn ở ai-service). Giữ giống QDRANT_QUANTIZATION_TYPE của ai-service
+    QDRANT_QUANTIZATION_TYPE: str = "int8"
     
     # Cohere Settings (Embeddings)
     COHERE_API_KEY: str
@@ -83,17 +123,25 @@ class Settings(BaseSettings):
     MONGODB_URI: str = "mongodb://mongo:27017"
     MONGODB_DB_NAME: str = "jvb_chat"
     
-    def get_cors_origins(self) -> list[str]:
-        """Convert CORS_ORIGINS string to list"""
+    @cached_property
+    def cors_origins_list(self) -> list[str]:
+        """Convert CORS_ORIGINS string to list (parse một lần, cache trên instance)"""
         if isinstance(self.CORS_ORIGINS, list):
             return self.CORS_ORIGINS
         if self.CORS_ORIGINS == "*":
             return ["*"]
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+        # Bỏ phần tử rỗng (dấu phẩy thừa cuối chuỗi trong .env)
+        return [origin for origin in map(str.strip, self.CORS_ORIGINS.split(",")) if origin]
+    
+    @cached_property
+    def cors_origins_set(self) -> frozenset[str]:
+        """CORS origins dạng frozenset - kiểm tra Origin header O(1) thay vì duyệt list"""
+        return frozenset(self.cors_origins_list)
     
     class Config:
         env_file = ".env"
         case_sensitive = True
+        frozen = True  # Chỉ đọc sau khi load; cached_property vẫn ghi thẳng vào __dict__
 
 
 settings = Settings()
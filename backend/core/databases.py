@@ -3,21 +3,60 @@ Cấu hình kết nối Database PostgreSQL
 """
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+from typing import Any, AsyncGenerator, Dict, Generator, Iterable, Sequence
+from uuid import uuid4
+import importlib
+import io
+import json
 
 from .config import settings
 
-# Import all models to register them before creating tables
-from models import base, users, documents, chat, groups, conversations, notifications  # noqa: F401
+
+# Các module model cần import để SQLAlchemy đăng ký mapper + relationship theo tên
+MODEL_MODULES = (
+    "models.base",
+    "models.users",
+    "models.documents",
+    "models.chat",
+    "models.groups",
+    "models.conversations",
+    "models.notifications",
+)
+
+
+# Số dòng mỗi câu INSERT ... VALUES nhiều dòng khi executemany (bulk insert chunks)
+INSERTMANYVALUES_PAGE_SIZE = 1000
+
+
+def _sync_connect_args() -> Dict[str, Any]:
+    """
+    connect_args cho psycopg2: statement_timeout để hủy query chạy quá lâu
+    
+    Mặc định tắt: sync engine còn chạy init_db DDL, COPY ingest của Celery và
+    task bảo trì (partition, reaper), những việc này được phép chạy lâu.
+    PgBouncer (transaction pooling) không nhận startup parameter "options"
+    nên bỏ qua khi DATABASE_USE_PGBOUNCER
+    """
+    if settings.DATABASE_USE_PGBOUNCER or settings.DATABASE_STATEMENT_TIMEOUT_MS <= 0:
+        return {}
+    return {"options": f"-c statement_timeout={settings.DATABASE_STATEMENT_TIMEOUT_MS}"}
 
 
 # Tạo engine kết nối database
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,  # Kiểm tra connection trước khi sử dụng
-    pool_size=20,
-    max_overflow=0,
+    echo=False,  # Log SQL qua logger sqlalchemy.engine (DATABASE_ECHO), xem core/logger
+    # Dev: ping trước mỗi checkout; prod dựa vào pool_recycle, bớt 1 round-trip
+    pool_pre_ping=settings.DEBUG,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,  # Hấp thụ burst thay vì bắt request chờ connection
+    pool_recycle=1800,  # Đóng connection quá 30 phút, tránh connection đã bị server/NAT cắt
+    pool_timeout=10,  # Hết connection quá 10s thì lỗi ngay, không treo request
+    pool_use_lifo=True,  # Dùng lại connection vừa trả -> connection thừa được idle và đóng dần
+    connect_args=_sync_connect_args(),
+    insertmanyvalues_page_size=INSERTMANYVALUES_PAGE_SIZE,
 )
 
 # Tạo session factory
@@ -28,6 +67,142 @@ SessionLocal = sessionmaker(
 )
 
 
+def _to_async_url(database_url: str) -> str:
+    """
+    Chuyển DATABASE_URL (psycopg2) sang driver asyncpg
+    
+    Args:
+        database_url: URL dạng postgresql:// hoặc postgresql+psycopg2://
+    
+    Returns:
+        URL dạng postgresql+asyncpg://
+    """
+    scheme, sep, rest = database_url.partition("://")
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return database_url
+
+
+def _async_engine_options() -> Dict[str, Any]:
+    """
+    Tham số pool cho async engine
+    
+    Sau PgBouncer (transaction pooling) việc pooling do PgBouncer đảm nhận:
+    dùng NullPool và tắt prepared statement cache của asyncpg, vì connection
+    backend có thể khác nhau giữa các transaction.
+    
+    Returns:
+        kwargs cho create_async_engine
+    """
+    if settings.DATABASE_USE_PGBOUNCER:
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                # Tên prepared statement duy nhất, tránh trùng trên connection dùng chung
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            },
+        }
+    return {
+        "pool_pre_ping": True,
+        "pool_size": settings.DATABASE_ASYNC_POOL_SIZE,
+        "max_overflow": settings.DATABASE_ASYNC_MAX_OVERFLOW,
+        "pool_timeout": 30,  # Chờ connection rảnh tối đa 30s rồi báo lỗi
+        "pool_recycle": 1800,  # Giống sync engine: bỏ connection quá 30 phút
+    }
+
+
+# Async engine (asyncpg) cho các route async - không block event loop
+async_engine = create_async_engine(
+    _to_async_url(settings.DATABASE_URL),
+    echo=False,  # Log SQL qua logger sqlalchemy.engine (DATABASE_ECHO), xem core/logger
+    insertmanyvalues_page_size=INSERTMANYVALUES_PAGE_SIZE,
+    **_async_engine_options(),
+)
+
+# Async session factory - expire_on_commit=False để đọc attributes sau commit
+# mà không cần lazy load (lazy load không được phép trong async)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def register_models() -> None:
+    """
+    Import toàn bộ models để đăng ký mapper (relationship khai báo bằng tên class)
+    
+    Không import lúc load module - gọi khi startup (init_db), trong Celery worker
+    và các script chạy riêng, trước query đầu tiên
+    """
+    for module_name in MODEL_MODULES:
+        importlib.import_module(module_name)
+
+
+def _copy_csv_field(value: Any) -> str:
+    """None -> NULL (để trống, không quote); còn lại luôn quote - chuỗi rỗng vẫn là chuỗi rỗng"""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(db: Session, table_name: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+    """
+    Ghi nhiều dòng bằng COPY ... FROM STDIN (CSV) trong transaction hiện tại của session
+    
+    Một lệnh stream toàn bộ dữ liệu: không render/parse INSERT nhiều VALUES như
+    executemany. Cột không liệt kê lấy DEFAULT phía server (created_at, updated_at...)
+    
+    Args:
+        db: Sync session (psycopg2)
+        table_name: Tên bảng
+        columns: Tên cột theo thứ tự giá trị trong mỗi dòng
+        rows: Các dòng giá trị (dict/list được ghi dạng JSON)
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_csv_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def ensure_monthly_partitions(conn) -> None:
+    """
+    Tạo trước partition các tháng tới cho bảng partition theo tháng (models.base.partition_monthly)
+    
+    Idempotent - gọi lúc startup (init_db) và định kỳ qua Celery beat. DB chưa chạy
+    migrations/partition_log_tables.sql (chưa có function) thì bỏ qua.
+    
+    Args:
+        conn: Connection sync đang trong transaction
+    """
+    from models.base import MONTHLY_PARTITIONED_TABLES
+    
+    for table_name in MONTHLY_PARTITIONED_TABLES:
+        conn.execute(
+            text(
+                "DO $$ BEGIN "
+                "IF to_regproc('ensure_monthly_partitions') IS NOT NULL THEN "
+                f"PERFORM ensure_monthly_partitions('{table_name}'); "
+                "END IF; END $$"
+            )
+        )
+
+
 def get_db() -> Generator[Session, None, None]:
     """
     Dependency injection để lấy database session
@@ -42,12 +217,24 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency injection để lấy async database session
+    
+    Yield:
+        AsyncSession: SQLAlchemy async session object
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 async def init_db():
     """
     Khởi tạo database - tạo tất cả tables
     """
     from models.base import Base
     
+    register_models()
     Base.metadata.create_all(bind=engine)
 
     # Lightweight schema evolution for existing deployments without Alembic.
@@ -64,6 +251,13 @@ async def init_db():
                 "ADD COLUMN IF NOT EXISTS canonical_document_id UUID"
             )
         )
+        conn.execute(
+            text(
+                "ALTER TABLE documents "
+                "ADD COLUMN IF NOT EXISTS mime_sniffed VARCHAR(100)"
+            )
+        )
+        ensure_monthly_partitions(conn)
 
 
 async def close_db():
@@ -71,3 +265,4 @@ async def close_db():
     Đóng kết nối database
     """
     engine.dispose()
+    await async_engine.dispose()
@@ -0,0 +1,31 @@
+"""
+HTTP client gọi AI Service
+Một AsyncClient dùng chung cho cả app (tạo trong lifespan, xem main.py)
+"""
+from typing import Any
+
+import httpx
+
+
+# zstd cần httpx >= 0.27.1 (extra [zstd]); bản cũ không giải nén được body zstd
+AI_SERVICE_HEADERS = {"Accept-Encoding": "zstd, gzip"}
+
+
+def create_ai_service_client(base_url: str, **kwargs: Any) -> httpx.AsyncClient:
+    """
+    Tạo AsyncClient tới AI Service (keep-alive pool, nhận response nén zstd/gzip)
+    
+    Args:
+        base_url: URL của AI Service (settings.AI_SERVICE_URL)
+        **kwargs: Tham số thêm cho httpx.AsyncClient (vd. transport khi test)
+    
+    Returns:
+        httpx.AsyncClient
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=AI_SERVICE_HEADERS,
+        timeout=httpx.Timeout(300.0, connect=5.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        **kwargs,
+    )
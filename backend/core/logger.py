@@ -0,0 +1,95 @@
+"""
+Cấu hình logging cho backend
+Log được đẩy vào queue (QueueHandler) và một QueueListener ở thread nền ghi
+ra stderr dạng JSON, nên request/worker không phải chờ lock của stream
+"""
+import logging
+import logging.config
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+import orjson
+
+from .config import settings
+
+
+# Các attribute mặc định của LogRecord - phần còn lại là field từ extra={...}
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format LogRecord thành một dòng JSON (kèm các field truyền qua extra)
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(payload, default=str).decode()
+
+
+def setup_logging() -> None:
+    """
+    Gắn QueueHandler vào root logger và start QueueListener ghi ra stderr
+
+    Gọi một lần lúc startup (lifespan), dừng bằng shutdown_logging()
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    logging.config.dictConfig({
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {
+            "queue": {
+                "class": "logging.handlers.QueueHandler",
+                "queue": _log_queue,
+            },
+        },
+        "root": {
+            "level": "DEBUG" if settings.DEBUG else "INFO",
+            "handlers": ["queue"],
+        },
+        "loggers": {
+            # Log SQL chỉ khi DATABASE_ECHO, không gắn theo DEBUG: SQL chỉ bị
+            # format khi logger bật, query không phải trả chi phí đó mặc định
+            "sqlalchemy.engine": {
+                "level": "INFO" if settings.DATABASE_ECHO else "WARNING",
+            },
+        },
+    })
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JSONFormatter())
+    _listener = logging.handlers.QueueListener(
+        _log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """
+    Dừng QueueListener, flush các log còn trong queue
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
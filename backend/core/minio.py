@@ -2,10 +2,49 @@
 MinIO Client - Object Storage Connection
 Quản lý kết nối tới MinIO S3-compatible storage
 """
+import logging
+import os
+from typing import Optional
+from urllib.parse import urlparse
+
+import certifi
+import urllib3
 from minio import Minio
 from minio.error import S3Error
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# Timeout giống mặc định của SDK (5 phút) - upload/download file lớn
+MINIO_HTTP_TIMEOUT = 300
+
+
+def _build_http_client() -> urllib3.PoolManager:
+    """
+    Tạo PoolManager dùng chung cho MinIO client
+    
+    Pool mặc định của SDK chỉ giữ 10 connection: khi nhiều request + các part
+    multipart chạy song song, connection thừa bị đóng và phải handshake lại.
+    Giữ tối đa MINIO_POOL_MAXSIZE connection keep-alive để tái sử dụng.
+    
+    Returns:
+        urllib3.PoolManager
+    """
+    return urllib3.PoolManager(
+        num_pools=10,
+        maxsize=max(settings.MINIO_POOL_MAXSIZE, settings.MINIO_UPLOAD_THREADS),
+        block=False,
+        timeout=urllib3.Timeout(connect=MINIO_HTTP_TIMEOUT, read=MINIO_HTTP_TIMEOUT),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=urllib3.Retry(
+            total=3,
+            backoff_factor=0.1,
+            status_forcelist=[500, 502, 503, 504],
+        ),
+    )
+
 
 class MinIOClient:
     """
@@ -13,28 +52,53 @@ class MinIOClient:
     """
     _instance = None
     _client = None
+    _public_client = None
+    _http = None
     
     def __new__(cls):
+        # Chỉ dựng client ở lần đầu - không có __init__ nên MinIOClient() sau đó
+        # trả về instance cũ mà không chạy lại gì
         if cls._instance is None:
             cls._instance = super(MinIOClient, cls).__new__(cls)
+            cls._instance._init_clients()
         return cls._instance
     
-    def __init__(self):
+    def _init_clients(self):
         """Khởi tạo MinIO client"""
-        if self._client is None:
-            self._client = Minio(
-                endpoint=settings.MINIO_ENDPOINT,
-                access_key=settings.MINIO_ACCESS_KEY,
-                secret_key=settings.MINIO_SECRET_KEY,
-                secure=settings.MINIO_SECURE
-            )
-            print(f"✅ MinIO client initialized: {settings.MINIO_ENDPOINT}")
+        self._http = _build_http_client()
+        self._client = Minio(
+            endpoint=settings.MINIO_ENDPOINT,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_SECURE,
+            http_client=self._http
+        )
+        logger.debug("minio client initialized", extra={"endpoint": settings.MINIO_ENDPOINT})
+        
+        # Presigned URL ký theo host -> phải ký bằng host mà browser truy cập
+        # (MINIO_URL), không phải host nội bộ trong docker network
+        public_url = urlparse(settings.MINIO_URL)
+        self._public_client = Minio(
+            endpoint=public_url.netloc,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=public_url.scheme == "https",
+            region=settings.MINIO_REGION
+        )
     
     @property
     def client(self) -> Minio:
         """Lấy MinIO client instance"""
         return self._client
     
+    @property
+    def public_client(self) -> Minio:
+        """
+        MinIO client theo MINIO_URL - chỉ dùng để ký presigned URL
+        (có region nên không gọi network)
+        """
+        return self._public_client
+    
     async def ensure_bucket_exists(self, bucket_name: str = None) -> bool:
         """
         Đảm bảo bucket tồn tại, nếu không thì tạo mới
@@ -50,10 +114,10 @@ class MinIOClient:
         try:
             if not self._client.bucket_exists(bucket):
                 self._client.make_bucket(bucket)
-                print(f"✅ MinIO bucket created: {bucket}")
+                logger.info("minio bucket created", extra={"bucket": bucket})
             return True
         except S3Error as e:
-            print(f"❌ MinIO bucket error: {e}")
+            logger.error("minio bucket error: %s", e, extra={"bucket": bucket})
             return False
     
     async def connect(self):
@@ -61,9 +125,24 @@ class MinIOClient:
         await self.ensure_bucket_exists()
     
     async def disconnect(self):
-        """Ngắt kết nối (MinIO không cần close connection)"""
-        print("✅ MinIO client closed")
+        """Đóng các connection đang giữ trong pool"""
+        if self._http is not None:
+            self._http.clear()
+        logger.debug("minio client closed")
 
 
-# Global instance
-minio_client = MinIOClient()
+# Global instance - dựng ở lần gọi get_minio_client() đầu tiên
+_minio_client: Optional[MinIOClient] = None
+
+
+def get_minio_client() -> MinIOClient:
+    """
+    Lấy MinIOClient, khởi tạo ở lần gọi đầu tiên
+    
+    Import core.minio không tạo client: worker/script không dùng storage
+    không phải trả chi phí dựng client và PoolManager
+    """
+    global _minio_client
+    if _minio_client is None:
+        _minio_client = MinIOClient()
+    return _minio_client
@@ -2,12 +2,37 @@
 Qdrant Client - Vector Database Connection
 Quản lý kết nối tới Qdrant vector database
 """
+import logging
+
+import httpx
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct
 from qdrant_client.http import models
 from typing import Optional
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# HNSW khi tạo collection (mặc định của Qdrant: m=16, ef_construct=100)
+HNSW_M = 16
+HNSW_EF_CONSTRUCT = 128
+
+
+def _quantization_config():
+    """Quantization config theo QDRANT_QUANTIZATION_TYPE (int8 mặc định), giữ trong RAM"""
+    if settings.QDRANT_QUANTIZATION_TYPE == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=0.99,
+            always_ram=True
+        )
+    )
+
 
 class QdrantClientManager:
     """
@@ -17,28 +42,33 @@ class QdrantClientManager:
     _client = None
     
     def __new__(cls):
+        # Chỉ dựng client ở lần đầu, QdrantClientManager() sau đó trả về instance cũ
         if cls._instance is None:
             cls._instance = super(QdrantClientManager, cls).__new__(cls)
+            cls._instance._init_client()
         return cls._instance
     
-    def __init__(self):
+    def _init_client(self):
         """Khởi tạo Qdrant client"""
-        if self._client is None:
-            # Connect to Qdrant
-            if settings.QDRANT_API_KEY:
-                # Cloud version with API key
-                self._client = QdrantClient(
-                    host=settings.QDRANT_HOST,
-                    port=settings.QDRANT_PORT,
-                    api_key=settings.QDRANT_API_KEY
-                )
-            else:
-                # Local version without API key
-                self._client = QdrantClient(
-                    host=settings.QDRANT_HOST,
-                    port=settings.QDRANT_PORT
-                )
-            print(f"✅ Qdrant client initialized: {settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
+        # Connect to Qdrant (api_key=None với bản local)
+        # limits được chuyển cho httpx.Client của REST client: một pool keep-alive
+        # dùng chung cho mọi upsert/search thay vì mở connection mới khi tải cao
+        self._client = QdrantClient(
+            host=settings.QDRANT_HOST,
+            port=settings.QDRANT_PORT,
+            api_key=settings.QDRANT_API_KEY,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            timeout=settings.QDRANT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.QDRANT_POOL_MAXSIZE,
+                max_keepalive_connections=settings.QDRANT_POOL_MAXSIZE // 2,
+            ),
+        )
+        logger.debug(
+            "qdrant client initialized",
+            extra={"host": settings.QDRANT_HOST, "port": settings.QDRANT_PORT},
+        )
     
     @property
     def client(self) -> QdrantClient:
@@ -64,20 +94,25 @@ class QdrantClientManager:
             
             if collection not in collection_names:
                 # Create collection with vector configuration
+                # Vector float32 gốc để trên disk, RAM chỉ giữ bản quantized
+                # (int8 ~4x, binary ~32x nhỏ hơn)
                 self._client.create_collection(
                     collection_name=collection,
                     vectors_config=VectorParams(
                         size=settings.VECTOR_DIMENSION,  # Cohere embed-multilingual-v3.0 = 1024
-                        distance=Distance.COSINE  # Cosine similarity
-                    )
+                        distance=Distance.COSINE,  # Cosine similarity
+                        on_disk=True
+                    ),
+                    quantization_config=_quantization_config(),
+                    hnsw_config=models.HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_EF_CONSTRUCT)
                 )
-                print(f"✅ Qdrant collection created: {collection}")
+                logger.info("qdrant collection created", extra={"collection": collection})
             else:
-                print(f"✅ Qdrant collection already exists: {collection}")
+                logger.debug("qdrant collection already exists", extra={"collection": collection})
             
             return True
         except Exception as e:
-            print(f"❌ Qdrant collection error: {e}")
+            logger.error("qdrant collection error: %s", e, extra={"collection": collection})
             return False
     
     async def connect(self):
@@ -85,9 +120,24 @@ class QdrantClientManager:
         await self.ensure_collection_exists()
     
     async def disconnect(self):
-        """Ngắt kết nối"""
-        print("✅ Qdrant client closed")
+        """Ngắt kết nối, đóng connection pool"""
+        if self._client is not None:
+            self._client.close()
+        logger.debug("qdrant client closed")
+
+
+# Global instance - dựng ở lần gọi get_qdrant_client() đầu tiên
+_qdrant_client: Optional[QdrantClientManager] = None
 
 
-# Global instance
-qdrant_client = QdrantClientManager()
+def get_qdrant_client() -> QdrantClientManager:
+    """
+    Lấy QdrantClientManager, khởi tạo ở lần gọi đầu tiên
+    
+    Import core.qdrant không tạo client: worker/script không dùng vector DB
+    không phải trả chi phí dựng client
+    """
+    global _qdrant_client
+    if _qdrant_client is None:
+        _qdrant_client = QdrantClientManager()
+    return _qdrant_client
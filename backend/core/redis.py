@@ -1,12 +1,96 @@
 """
 Quản lý kết nối Redis cho Token Blacklist
 """
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
 import redis.asyncio as redis
-from typing import Optional
+from redis.exceptions import ResponseError
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import timedelta
 
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
+
+def _token_digest(token: str) -> str:
+    """
+    Rút gọn JWT (500-1500 bytes) thành 32 ký tự hex để làm Redis key
+    
+    Key ngắn -> ít bytes trên network mỗi lần EXISTS/SETEX và ít RAM trên Redis
+    """
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+# Giá trị lưu cho key blacklist - chỉ cần key tồn tại, giữ value 1 byte
+BLACKLIST_MARKER = "1"
+
+# Số token tối đa giữ trong negative cache (LRU)
+NEGATIVE_CACHE_MAXSIZE = 10000
+
+# Trả về {tồn tại, TTL} của key blacklist đầu tiên tìm thấy trong KEYS (1 round-trip)
+BLACKLIST_STATUS_LUA = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        return {1, redis.call('TTL', key)}
+    end
+end
+return {0, -2}
+"""
+
+
+# Pool dùng chung theo Redis DB (blacklist, presence, cache) - xem get_redis_pool
+_pools: Dict[int, redis.BlockingConnectionPool] = {}
+
+
+def get_redis_pool(db: int) -> redis.BlockingConnectionPool:
+    """
+    Lấy connection pool dùng chung cho một Redis DB (tạo lần đầu gọi)
+    
+    Các manager cùng DB dùng chung một pool thay vì mỗi manager một pool riêng.
+    Mỗi pool giới hạn REDIS_MAX_CONNECTIONS connection: khi burst, request chờ
+    connection rảnh (tối đa REDIS_POOL_TIMEOUT giây) thay vì mở thêm không giới hạn.
+    Response được parse bằng hiredis (C) nếu đã cài - redis-py tự chọn parser.
+    
+    Args:
+        db: Số Redis DB
+    
+    Returns:
+        BlockingConnectionPool của DB đó
+    """
+    pool = _pools.get(db)
+    if pool is None:
+        pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            db=db,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            encoding="utf8",
+            decode_responses=True,
+        )
+        _pools[db] = pool
+    return pool
+
+
+async def close_redis_pools() -> None:
+    """
+    Đóng toàn bộ pool dùng chung - gọi một lần khi shutdown, sau disconnect() của các manager
+    """
+    for pool in _pools.values():
+        await pool.disconnect()
+    _pools.clear()
+
+
+def _blacklist_key(token: str) -> str:
+    return f"blacklist:{_token_digest(token)}"
+
+
+def _token_pair_key(access_token: str) -> str:
+    return f"token_pair:{_token_digest(access_token)}"
+
 
 class RedisBlacklistManager:
     """
@@ -18,21 +102,40 @@ class RedisBlacklistManager:
     
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
+        # blacklist key -> thời điểm hết hạn (monotonic) của kết quả "không bị blacklist"
+        self._negative_cache: "OrderedDict[str, float]" = OrderedDict()
+        # Lua script EXISTS + TTL, None nếu server không cho chạy script
+        self._status_script = None
+    
+    def _negative_cache_hit(self, key: str) -> bool:
+        """Token đã được xác nhận không bị blacklist trong BLACKLIST_NEGATIVE_CACHE_TTL giây qua"""
+        expires_at = self._negative_cache.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._negative_cache[key]
+            return False
+        self._negative_cache.move_to_end(key)
+        return True
+    
+    def _remember_not_blacklisted(self, key: str) -> None:
+        if settings.BLACKLIST_NEGATIVE_CACHE_TTL <= 0:
+            return
+        self._negative_cache[key] = time.monotonic() + settings.BLACKLIST_NEGATIVE_CACHE_TTL
+        self._negative_cache.move_to_end(key)
+        if len(self._negative_cache) > NEGATIVE_CACHE_MAXSIZE:
+            self._negative_cache.popitem(last=False)
     
     async def connect(self):
         """
-        Kết nối tới Redis server
+        Kết nối tới Redis server (pool dùng chung của REDIS_BLACKLIST_DB)
         """
-        self.redis_client = await redis.from_url(
-            settings.REDIS_URL,
-            db=settings.REDIS_BLACKLIST_DB,
-            encoding="utf8",
-            decode_responses=True,
-        )
+        self.redis_client = redis.Redis(connection_pool=get_redis_pool(settings.REDIS_BLACKLIST_DB))
+        self._status_script = self.redis_client.register_script(BLACKLIST_STATUS_LUA)
     
     async def disconnect(self):
         """
-        Ngắt kết nối Redis
+        Ngắt kết nối Redis (pool dùng chung do close_redis_pools đóng)
         """
         if self.redis_client:
             await self.redis_client.close()
@@ -58,29 +161,112 @@ class RedisBlacklistManager:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
         
-        key = f"blacklist:{token}"
+        key = _blacklist_key(token)
+        self._negative_cache.pop(key, None)
         try:
             await self.redis_client.setex(
                 key,
                 int(ttl.total_seconds()),
-                "blacklisted"
+                BLACKLIST_MARKER
             )
-            print(f"✅ Token added to blacklist: {key[:50]}...")
+            logger.debug("token blacklisted", extra={"key": key})
             return True
         except Exception as e:
             # KHÔNG bỏ qua lỗi - raise để app biết Redis có vấn đề
-            print(f"❌ Error adding token to blacklist: {e}")
+            logger.error("failed to blacklist token: %s", e)
             raise RuntimeError(f"Failed to add token to blacklist: {e}")
     
-    async def is_blacklisted(self, token: str) -> bool:
+    async def blacklist_tokens(
+        self,
+        tokens: Iterable[Tuple[str, timedelta]],
+        drop_pair_for: Optional[str] = None,
+    ) -> bool:
         """
-        Kiểm tra token có bị blacklist không
+        Blacklist nhiều token trong một round-trip (pipeline, không transaction)
+        
+        Args:
+            tokens: Các cặp (token, ttl) cần blacklist - ttl <= 0 thì bỏ qua
+            drop_pair_for: Access token cần xóa mapping token_pair (logout)
+        
+        Returns:
+            True nếu ghi thành công
+            
+        Raises:
+            RuntimeError: Nếu Redis không connect hoặc có lỗi
+        """
+        if not self.redis_client:
+            raise RuntimeError("Redis client not connected")
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for token, ttl in tokens:
+                    seconds = int(ttl.total_seconds())
+                    if seconds > 0:
+                        key = _blacklist_key(token)
+                        self._negative_cache.pop(key, None)
+                        pipe.setex(key, seconds, BLACKLIST_MARKER)
+                if drop_pair_for:
+                    pipe.delete(_token_pair_key(drop_pair_for))
+                    if settings.REDIS_LEGACY_TOKEN_KEYS:
+                        pipe.delete(f"token_pair:{drop_pair_for}")
+                await pipe.execute()
+            return True
+        except Exception as e:
+            # KHÔNG bỏ qua lỗi - raise để app biết Redis có vấn đề
+            logger.error("failed to blacklist tokens: %s", e)
+            raise RuntimeError(f"Failed to add tokens to blacklist: {e}")
+    
+    async def blacklist_status(self, token: str) -> Tuple[bool, int]:
+        """
+        Kiểm tra token có bị blacklist không, kèm TTL còn lại - một round-trip
         
         Args:
             token: JWT token cần kiểm tra
         
         Returns:
-            True nếu token bị blacklist, False nếu không
+            (True, TTL giây) nếu token bị blacklist, (False, -2) nếu không
+            
+        Raises:
+            RuntimeError: Nếu Redis không connect hoặc có lỗi
+        """
+        if not self.redis_client:
+            raise RuntimeError("Redis client not connected")
+        
+        keys = [_blacklist_key(token)]
+        # Phần lớn request dùng token hợp lệ -> bỏ qua Redis nếu vừa kiểm tra
+        if self._negative_cache_hit(keys[0]):
+            return False, -2
+        if settings.REDIS_LEGACY_TOKEN_KEYS:
+            # Token logout trước khi đổi format key vẫn phải bị chặn
+            keys.append(f"blacklist:{token}")
+        try:
+            if self._status_script is not None:
+                try:
+                    exists, ttl = await self._status_script(keys=keys)
+                except ResponseError as e:
+                    # Scripting bị tắt (vd. managed Redis chặn EVAL) -> dùng EXISTS
+                    logger.warning("lua script unavailable, falling back to EXISTS: %s", e)
+                    self._status_script = None
+            if self._status_script is None:
+                exists, ttl = await self.redis_client.exists(*keys), -1
+            if not exists:
+                self._remember_not_blacklisted(keys[0])
+                return False, -2
+            return True, ttl
+        except Exception as e:
+            # KHÔNG bỏ qua lỗi - raise để app biết Redis có vấn đề
+            logger.error("failed to check token blacklist: %s", e)
+            raise RuntimeError(f"Failed to check token blacklist: {e}")
+    
+    async def are_blacklisted(self, tokens: List[str]) -> List[bool]:
+        """
+        Kiểm tra nhiều token cùng lúc bằng một lệnh MGET (vd. access + refresh khi refresh)
+        
+        Args:
+            tokens: Danh sách JWT token cần kiểm tra
+        
+        Returns:
+            List bool theo đúng thứ tự tokens - True nếu token bị blacklist
             
         Raises:
             RuntimeError: Nếu Redis không connect hoặc có lỗi
@@ -88,14 +274,53 @@ class RedisBlacklistManager:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
         
-        key = f"blacklist:{token}"
+        results = [False] * len(tokens)
+        # Token vừa xác nhận không bị blacklist thì không hỏi lại Redis
+        # (digest mỗi token chỉ tính một lần)
+        pending = []
+        for index, token in enumerate(tokens):
+            key = _blacklist_key(token)
+            if not self._negative_cache_hit(key):
+                pending.append((index, key, token))
+        if not pending:
+            return results
+        
+        keys = [key for _, key, _ in pending]
+        if settings.REDIS_LEGACY_TOKEN_KEYS:
+            keys += [f"blacklist:{token}" for _, _, token in pending]
         try:
-            result = await self.redis_client.exists(key)
-            return bool(result)
+            values = await self.redis_client.mget(keys)
         except Exception as e:
             # KHÔNG bỏ qua lỗi - raise để app biết Redis có vấn đề
-            print(f"Error checking token blacklist: {e}")
+            logger.error("failed to check token blacklist: %s", e)
             raise RuntimeError(f"Failed to check token blacklist: {e}")
+        
+        count = len(pending)
+        for position, (index, key, _) in enumerate(pending):
+            blacklisted = values[position] is not None
+            if settings.REDIS_LEGACY_TOKEN_KEYS:
+                blacklisted = blacklisted or values[count + position] is not None
+            if blacklisted:
+                results[index] = True
+            else:
+                self._remember_not_blacklisted(key)
+        return results
+    
+    async def is_blacklisted(self, token: str) -> bool:
+        """
+        Kiểm tra token có bị blacklist không
+        
+        Args:
+            token: JWT token cần kiểm tra
+        
+        Returns:
+            True nếu token bị blacklist, False nếu không
+            
+        Raises:
+            RuntimeError: Nếu Redis không connect hoặc có lỗi
+        """
+        blacklisted, _ = await self.blacklist_status(token)
+        return blacklisted
     
     async def remove_from_blacklist(self, token: str) -> bool:
         """
@@ -110,12 +335,14 @@ class RedisBlacklistManager:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
         
-        key = f"blacklist:{token}"
+        keys = [_blacklist_key(token)]
+        if settings.REDIS_LEGACY_TOKEN_KEYS:
+            keys.append(f"blacklist:{token}")
         try:
-            await self.redis_client.delete(key)
+            await self.redis_client.delete(*keys)
             return True
         except Exception as e:
-            print(f"Error removing token from blacklist: {e}")
+            logger.error("failed to remove token from blacklist: %s", e)
             return False
     
     async def get_ttl(self, token: str) -> int:
@@ -131,12 +358,12 @@ class RedisBlacklistManager:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
         
-        key = f"blacklist:{token}"
+        key = _blacklist_key(token)
         try:
             ttl = await self.redis_client.ttl(key)
             return ttl
         except Exception as e:
-            print(f"Error getting token TTL: {e}")
+            logger.error("failed to get token TTL: %s", e)
             return -1
     
     async def store_token_pair(
@@ -160,17 +387,17 @@ class RedisBlacklistManager:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
         
-        key = f"token_pair:{access_token}"
+        key = _token_pair_key(access_token)
         try:
             await self.redis_client.setex(
                 key,
                 int(ttl.total_seconds()),
                 refresh_token
             )
-            print(f"✅ Token pair stored: {key[:60]}...")
+            logger.debug("token pair stored", extra={"key": key})
             return True
         except Exception as e:
-            print(f"❌ Error storing token pair: {e}")
+            logger.error("failed to store token pair: %s", e)
             raise RuntimeError(f"Failed to store token pair: {e}")
     
     async def get_refresh_token(self, access_token: str) -> Optional[str]:
@@ -186,12 +413,14 @@ class RedisBlacklistManager:
         if not self.redis_client:
             raise RuntimeError("Redis client not connected")
         
-        key = f"token_pair:{access_token}"
+        key = _token_pair_key(access_token)
         try:
             refresh_token = await self.redis_client.get(key)
+            if refresh_token is None and settings.REDIS_LEGACY_TOKEN_KEYS:
+                refresh_token = await self.redis_client.get(f"token_pair:{access_token}")
             return refresh_token
         except Exception as e:
-            print(f"Error getting refresh token: {e}")
+            logger.error("failed to get refresh token: %s", e)
             return None
 
 
@@ -0,0 +1,31 @@
+"""
+JSON Response dùng orjson
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse as _FastAPIORJSONResponse
+
+
+def _orjson_default(value: Any) -> Any:
+    """Kiểu orjson không tự serialize: Decimal -> str (giống Pydantic mode="json")"""
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(_FastAPIORJSONResponse):
+    """
+    ORJSONResponse nhận thêm Decimal (confidence_score, cost từ cột Numeric)
+
+    Payload trả thẳng qua response này không đi qua jsonable_encoder, nên
+    Decimal phải được xử lý ở đây; UUID/datetime orjson serialize native
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
@@ -2,18 +2,29 @@
 FastAPI main application
 """
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import APIRouter, Depends, FastAPI, Request
+import logging
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, Response
+import orjson
 
 from core.config import settings
+from core.logger import setup_logging, shutdown_logging
+from core.responses import ORJSONResponse
+from core.compression import GZipMiddleware
+from core.access_log import AccessLogMiddleware
 from core.databases import init_db, close_db
-from core.redis import redis_blacklist
-from core.minio import minio_client
-from core.qdrant import qdrant_client
+from core.http_client import create_ai_service_client
+from core.redis import redis_blacklist, close_redis_pools
+from core.cache import cache_manager
+from core.celery_app import get_queue_depth
+from core.minio import get_minio_client
+from core.qdrant import get_qdrant_client
 from core.mongo import mongo_chat_client
 from services.chat_history_service import chat_history_service
 from services.token_service import token_service
 from services.user_presence import user_presence
+from api.dependencies import get_current_user, verify_admin
 from api.auth import router as auth_router
 from api.users import router as users_router
 from api.documents import router as documents_router
@@ -23,6 +34,9 @@ from api.messaging import router as messaging_router
 from api.admin import router as admin_router
 
 
+logger = logging.getLogger(__name__)
+
+
 # ============================================
 # Lifespan Events
 # ============================================
@@ -32,34 +46,39 @@ async def lifespan(app: FastAPI):
     Quản lý vòng đời ứng dụng
     """
     # Startup
-    print("🚀 Starting up application...")
+    setup_logging()
+    logger.info("application startup")
     await init_db()
     await redis_blacklist.connect()
+    await cache_manager.connect()
     await user_presence.connect()
-    await minio_client.connect()
-    await qdrant_client.connect()
+    # API dùng MinIO/Qdrant ở hầu hết request -> khởi tạo ngay lúc startup
+    await get_minio_client().connect()
+    await get_qdrant_client().connect()
     await mongo_chat_client.connect()
     if mongo_chat_client.enabled:
         chat_history_service.ensure_indexes()
-    print("✅ Database initialized")
-    print("✅ Redis blacklist connected")
-    print("✅ User presence tracker connected")
-    print("✅ MinIO connected")
-    print("✅ Qdrant connected")
-    if mongo_chat_client.enabled:
-        print("✅ Mongo chat history connected")
+    app.state.http = create_ai_service_client(settings.AI_SERVICE_URL)
+    logger.info(
+        "application ready",
+        extra={"mongo_chat_history": mongo_chat_client.enabled},
+    )
     
     yield
     
     # Shutdown
-    print("🛑 Shutting down application...")
+    logger.info("application shutdown")
+    await app.state.http.aclose()
     await user_presence.disconnect()
     await redis_blacklist.disconnect()
-    await minio_client.disconnect()
-    await qdrant_client.disconnect()
+    await cache_manager.disconnect()
+    await close_redis_pools()
+    await get_minio_client().disconnect()
+    await get_qdrant_client().disconnect()
     await mongo_chat_client.disconnect()
     await close_db()
-    print("✅ Resources cleaned up")
+    logger.info("resources cleaned up")
+    shutdown_logging()
 
 
 # ============================================
@@ -69,7 +88,8 @@ app = FastAPI(
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
     version=settings.API_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 
@@ -78,49 +98,110 @@ app = FastAPI(
 # ============================================
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.get_cors_origins(),
+    allow_origins=settings.cors_origins_list,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
+# ============================================
+# Compression: nén response JSON lớn (chat history, danh sách document)
+# ============================================
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+# ============================================
+# Access log lấy mẫu (thay access log của uvicorn/gunicorn), bỏ qua health check
+# Thêm sau CORS và GZip -> bọc ngoài hai middleware đó, đo cả thời gian nén
+# ============================================
+app.add_middleware(
+    AccessLogMiddleware,
+    sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+    skip_paths=("/health",),
+)
 
 
+# ============================================
+# Profiler (chỉ khi DEBUG): thêm ?profile=1 vào URL để xem flame HTML của request
+# ============================================
+if settings.DEBUG:
+    from pyinstrument import Profiler
+    
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        if not request.query_params.get("profile"):
+            return await call_next(request)
+        
+        # async_mode="enabled": chỉ đo task của request này, tính cả thời gian await
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        await call_next(request)
+        profiler.stop()
+        return HTMLResponse(profiler.output_html())
+
+
+# ============================================
+# Routers
+# ============================================
+# Router cần đăng nhập mount chung dưới một parent: dependency xác thực khai
+# báo một lần thay vì lặp ở từng router (get_current_user cache theo request)
+protected_router = APIRouter(dependencies=[Depends(get_current_user)])
+protected_router.include_router(users_router)
+protected_router.include_router(documents_router)
+protected_router.include_router(chat_router)
+protected_router.include_router(groups_router)
+protected_router.include_router(admin_router)
+
+# auth: public; messaging: WebSocket tự xác thực qua query token
 app.include_router(auth_router)
-app.include_router(users_router)
-app.include_router(documents_router)
-app.include_router(chat_router)
-app.include_router(groups_router)
+app.include_router(protected_router)
 app.include_router(messaging_router)
-app.include_router(admin_router)
 
 
 # ============================================
 # Routes
 # ============================================
-@app.get("/health")
+# Body của /health và / chỉ phụ thuộc settings (frozen) -> encode một lần lúc import,
+# mỗi lần probe/load balancer gọi chỉ trả lại bytes có sẵn
+HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": settings.API_TITLE,
+    "version": settings.API_VERSION
+})
+ROOT_BODY = orjson.dumps({
+    "message": "Welcome to JVB API",
+    "version": settings.API_VERSION,
+    "docs": "/docs"
+})
+
+
+@app.get("/health", response_class=Response)
 async def health_check():
     """
     Health check endpoint
     """
+    return Response(content=HEALTH_BODY, media_type="application/json")
+
+
+@app.get("/metrics", dependencies=[Depends(verify_admin)])
+async def metrics():
+    """
+    Backpressure của hàng đợi xử lý document (chỉ admin - lộ tải/cấu hình hệ thống)
+    """
     return {
-        "status": "healthy",
-        "service": settings.API_TITLE,
-        "version": settings.API_VERSION
+        "document_queue_depth": await get_queue_depth(),
+        "max_process_backlog": settings.MAX_PROCESS_BACKLOG,
+        "max_process_concurrency": settings.MAX_PROCESS_CONCURRENCY
     }
 
 
-@app.get("/")
+@app.get("/", response_class=Response)
 async def root():
     """
     Root endpoint
     """
-    return {
-        "message": "Welcome to JVB API",
-        "version": settings.API_VERSION,
-        "docs": "/docs"
-    }
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
 # ============================================
@@ -131,13 +212,14 @@ async def global_exception_handler(request, exc):
     """
     Global exception handler
     """
-    from fastapi.responses import JSONResponse
-    import traceback
-    
-    print(f"❌ Unhandled exception: {exc}")
-    traceback.print_exc()
+    # Đi qua QueueHandler (core/logger): ghi stderr ở thread nền, không block event loop
+    logger.error(
+        "unhandled exception",
+        exc_info=exc,
+        extra={"method": request.method, "path": request.url.path},
+    )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "detail": str(exc),
@@ -152,9 +234,17 @@ async def global_exception_handler(request, exc):
 if __name__ == "__main__":
     import uvicorn
     
+    # App truyền dạng import string: bắt buộc khi reload hoặc workers > 1
+    # uvloop + httptools chỉ định rõ để không âm thầm rơi về asyncio + h11
+    # Access log do AccessLogMiddleware lấy mẫu; logging do core.logger cấu hình
     uvicorn.run(
-        app,
+        "main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        workers=1 if settings.DEBUG else settings.WORKERS,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+        log_config=None,
     )
@@ -0,0 +1,16 @@
+-- Migration: Composite indexes matching chat query shapes (filter + ORDER BY)
+-- Run against jvb_postgres
+-- message_feedback.message_id is already UNIQUE, so it has its own index
+
+-- list_chat_sessions: WHERE user_id = ? ORDER BY updated_at DESC
+CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_id_updated_at ON chat_sessions(user_id, updated_at);
+
+-- get_session_messages / timeline: WHERE session_id = ? ORDER BY created_at
+CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_created_at ON chat_messages(session_id, created_at);
+
+-- AI usage history theo user: WHERE user_id = ? ORDER BY created_at
+CREATE INDEX IF NOT EXISTS ix_ai_usage_user_id_created_at ON ai_usage_history(user_id, created_at);
+
+-- Verify:
+-- EXPLAIN ANALYZE SELECT * FROM chat_messages WHERE session_id = '<id>' ORDER BY created_at LIMIT 50;
+-- -> Index Scan using ix_chat_messages_session_id_created_at
@@ -0,0 +1,7 @@
+-- Migration: GIN index cho tìm chat session theo document trong context_documents
+-- Run against jvb_postgres
+-- context_documents là UUID[] -> xóa document dùng context_documents @> ARRAY[...] qua index
+-- CONCURRENTLY: không khóa ghi bảng trong lúc build (không chạy trong transaction)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_sessions_context_documents_gin
+    ON chat_sessions USING GIN (context_documents);
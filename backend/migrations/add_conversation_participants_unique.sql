@@ -0,0 +1,61 @@
+-- Migration: Mỗi cặp user chỉ có 1 conversation, participant lưu theo thứ tự
+-- Run against jvb_postgres
+-- Chuẩn hóa thứ tự cặp, gộp các conversation trùng (chuyển tin nhắn về bản cũ nhất),
+-- rồi mới tạo UNIQUE + CHECK
+
+BEGIN;
+
+-- 1. participant_1 <= participant_2
+UPDATE conversations
+SET participant_1 = LEAST(participant_1, participant_2),
+    participant_2 = GREATEST(participant_1, participant_2)
+WHERE participant_1 > participant_2;
+
+-- 2. Chuyển tin nhắn của conversation trùng về conversation cũ nhất của cặp
+WITH ranked AS (
+    SELECT id,
+           FIRST_VALUE(id) OVER (
+               PARTITION BY participant_1, participant_2
+               ORDER BY created_at, id
+           ) AS keep_id
+    FROM conversations
+)
+UPDATE direct_messages dm
+SET conversation_id = ranked.keep_id
+FROM ranked
+WHERE dm.conversation_id = ranked.id
+  AND ranked.id <> ranked.keep_id;
+
+-- 3. Bản giữ lại lấy tin nhắn cuối mới nhất trong các bản trùng
+UPDATE conversations c
+SET last_message_at = latest.last_message_at,
+    last_message_content = latest.last_message_content
+FROM (
+    SELECT DISTINCT ON (participant_1, participant_2)
+           participant_1, participant_2, last_message_at, last_message_content
+    FROM conversations
+    ORDER BY participant_1, participant_2, last_message_at DESC
+) latest
+WHERE c.participant_1 = latest.participant_1
+  AND c.participant_2 = latest.participant_2
+  AND (c.participant_1, c.participant_2) IN (
+      SELECT participant_1, participant_2
+      FROM conversations
+      GROUP BY participant_1, participant_2
+      HAVING COUNT(*) > 1
+  );
+
+-- 4. Xóa các bản trùng (giữ bản cũ nhất)
+DELETE FROM conversations a
+USING conversations b
+WHERE a.participant_1 = b.participant_1
+  AND a.participant_2 = b.participant_2
+  AND (a.created_at, a.id) > (b.created_at, b.id);
+
+-- 5. Constraint
+ALTER TABLE conversations
+    ADD CONSTRAINT uq_conversations_participants UNIQUE (participant_1, participant_2);
+ALTER TABLE conversations
+    ADD CONSTRAINT ck_conversations_participants_sorted CHECK (participant_1 <= participant_2);
+
+COMMIT;
@@ -0,0 +1,75 @@
+-- Migration: member_count / message_count / total_tokens_used do trigger cập nhật
+-- Run against jvb_postgres
+-- Counter được UPDATE trong cùng transaction với INSERT/DELETE dòng con (khóa dòng cha),
+-- backend không còn tự tăng/giảm. Cuối file đồng bộ lại counter từ dữ liệu hiện có.
+-- DDL giống hệt bản khai báo trong models/groups.py, models/chat.py (tạo cùng create_all)
+
+BEGIN;
+
+ALTER TABLE groups ALTER COLUMN member_count SET DEFAULT 0;
+ALTER TABLE chat_sessions ALTER COLUMN message_count SET DEFAULT 0;
+ALTER TABLE chat_sessions ALTER COLUMN total_tokens_used SET DEFAULT 0;
+
+-- 1. group_members -> groups.member_count
+CREATE OR REPLACE FUNCTION group_members_count_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE groups SET member_count = member_count + 1 WHERE id = NEW.group_id;
+    ELSE
+        UPDATE groups SET member_count = GREATEST(member_count - 1, 0) WHERE id = OLD.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_group_members_count ON group_members;
+CREATE TRIGGER trg_group_members_count
+AFTER INSERT OR DELETE ON group_members
+FOR EACH ROW EXECUTE FUNCTION group_members_count_trigger();
+
+-- 2. chat_messages -> chat_sessions.message_count, total_tokens_used
+-- (INSERT cũng đẩy updated_at để danh sách session sắp xếp theo hoạt động mới nhất)
+CREATE OR REPLACE FUNCTION chat_messages_count_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE chat_sessions
+        SET message_count = message_count + 1,
+            total_tokens_used = total_tokens_used + COALESCE(NEW.total_tokens, 0),
+            updated_at = timezone('utc', clock_timestamp())
+        WHERE id = NEW.session_id;
+    ELSE
+        UPDATE chat_sessions
+        SET message_count = GREATEST(message_count - 1, 0),
+            total_tokens_used = GREATEST(total_tokens_used - COALESCE(OLD.total_tokens, 0), 0)
+        WHERE id = OLD.session_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_chat_messages_count ON chat_messages;
+CREATE TRIGGER trg_chat_messages_count
+AFTER INSERT OR DELETE ON chat_messages
+FOR EACH ROW EXECUTE FUNCTION chat_messages_count_trigger();
+
+-- 3. Đồng bộ counter hiện có
+UPDATE groups g
+SET member_count = COALESCE(m.cnt, 0)
+FROM groups g2
+LEFT JOIN (
+    SELECT group_id, COUNT(*) AS cnt FROM group_members GROUP BY group_id
+) m ON m.group_id = g2.id
+WHERE g.id = g2.id AND g.member_count IS DISTINCT FROM COALESCE(m.cnt, 0);
+
+UPDATE chat_sessions s
+SET message_count = COALESCE(m.cnt, 0),
+    total_tokens_used = COALESCE(m.tokens, 0)
+FROM chat_sessions s2
+LEFT JOIN (
+    SELECT session_id, COUNT(*) AS cnt, SUM(total_tokens) AS tokens
+    FROM chat_messages GROUP BY session_id
+) m ON m.session_id = s2.id
+WHERE s.id = s2.id
+  AND (s.message_count, s.total_tokens_used) IS DISTINCT FROM (COALESCE(m.cnt, 0), COALESCE(m.tokens, 0));
+
+COMMIT;
@@ -0,0 +1,5 @@
+-- Migration: MIME type thật của file (worker đọc magic bytes sau khi upload)
+-- Run against jvb_postgres
+-- Upload chỉ nhận theo Content-Type; worker hash + sniff rồi cập nhật content_hash / mime_sniffed
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS mime_sniffed VARCHAR(100);
@@ -0,0 +1,12 @@
+-- Migration: Lưu object key MinIO riêng (file_path bỏ tiền tố bucket)
+-- Run against jvb_postgres
+-- Download/preview/delete/xử lý AI dùng thẳng object_name, không split file_path mỗi request
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS object_name TEXT;
+
+-- Backfill: file_path có dạng "<bucket>/<object_name>"
+UPDATE documents
+SET object_name = substring(file_path from position('/' in file_path) + 1)
+WHERE object_name IS NULL;
+
+ALTER TABLE documents ALTER COLUMN object_name SET NOT NULL;
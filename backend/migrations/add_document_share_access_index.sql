@@ -0,0 +1,10 @@
+-- Migration: Index cho kiểm tra quyền truy cập document trong một query
+-- Run against jvb_postgres
+-- documents.id là primary key nên WHERE id = ? AND user_id = ? đã dùng pkey,
+-- phần cần index là nhánh EXISTS trên document_shares
+
+-- _get_owned_document(include_shared=True):
+-- WHERE id = ? AND (user_id = ? OR EXISTS (SELECT 1 FROM document_shares
+--                   WHERE document_id = documents.id AND shared_with_user_id = ?))
+CREATE INDEX IF NOT EXISTS ix_document_shares_document_id_shared_with_user_id
+    ON document_shares(document_id, shared_with_user_id);
@@ -0,0 +1,6 @@
+-- Migration: GIN index cho lọc documents theo tag
+-- Run against jvb_postgres
+-- tags là TEXT[] (ARRAY) -> GET /api/documents?tag=... dùng tags @> ARRAY[...] qua index
+
+CREATE INDEX IF NOT EXISTS ix_documents_tags_gin
+    ON documents USING GIN (tags);
@@ -0,0 +1,22 @@
+-- Migration: Composite indexes cho timeline tin nhắn / thông báo (filter + ORDER BY created_at)
+-- Run against jvb_postgres
+-- CONCURRENTLY: không khóa ghi bảng khi tạo index; không chạy được trong transaction
+-- -> chạy từng câu (psql mặc định autocommit), KHÔNG bọc trong BEGIN/COMMIT
+-- Postgres đọc index ngược được nên (x, created_at) dùng được cho cả ORDER BY ... DESC
+
+-- get_conversation_messages: WHERE conversation_id = ? ORDER BY created_at LIMIT N
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_direct_messages_conversation_id_created_at
+    ON direct_messages(conversation_id, created_at);
+
+-- get_group_messages: WHERE group_id = ? ORDER BY created_at LIMIT N
+-- unread count: WHERE group_id = ? AND created_at > last_read_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_group_messages_group_id_created_at
+    ON group_messages(group_id, created_at);
+
+-- Thông báo chưa đọc mới nhất: WHERE user_id = ? AND is_read = false ORDER BY created_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_user_id_is_read_created_at
+    ON notifications(user_id, is_read, created_at);
+
+-- Verify:
+-- EXPLAIN ANALYZE SELECT * FROM group_messages WHERE group_id = '<id>' ORDER BY created_at DESC LIMIT 50;
+-- -> Index Scan Backward using ix_group_messages_group_id_created_at (không có Sort)
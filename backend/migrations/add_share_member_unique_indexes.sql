@@ -0,0 +1,24 @@
+-- Migration: UNIQUE cho document_shares/group_members để UPSERT bằng ON CONFLICT
+-- Run against jvb_postgres
+-- Xóa bản ghi trùng (giữ dòng mới nhất) trước khi tạo UNIQUE index
+
+-- share_document: INSERT ... ON CONFLICT (document_id, shared_with_user_id) DO UPDATE
+DELETE FROM document_shares a
+USING document_shares b
+WHERE a.document_id = b.document_id
+  AND a.shared_with_user_id = b.shared_with_user_id
+  AND (a.shared_at, a.id) < (b.shared_at, b.id);
+
+DROP INDEX IF EXISTS ix_document_shares_document_id_shared_with_user_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_document_shares_document_id_shared_with_user_id
+    ON document_shares(document_id, shared_with_user_id);
+
+-- add_group_member: INSERT ... ON CONFLICT (group_id, user_id) DO NOTHING
+DELETE FROM group_members a
+USING group_members b
+WHERE a.group_id = b.group_id
+  AND a.user_id = b.user_id
+  AND (a.joined_at, a.id) > (b.joined_at, b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_group_members_group_id_user_id
+    ON group_members(group_id, user_id);
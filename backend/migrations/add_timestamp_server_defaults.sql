@@ -0,0 +1,54 @@
+-- Migration: Timestamp mặc định sinh phía Postgres thay vì datetime.utcnow() của app
+-- Run against jvb_postgres
+-- Cột vẫn là timestamp không timezone (UTC) - API/frontend giữ nguyên format
+-- Chỉ đổi DEFAULT, không ghi lại dữ liệu
+-- updated_at được SQLAlchemy render vào UPDATE ... SET (onupdate), không cần trigger
+
+ALTER TABLE users ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE users ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE user_sessions ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE user_sessions ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE login_history ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE login_history ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE user_settings ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE user_settings ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE documents ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE documents ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE document_chunks ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE document_chunks ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE document_embeddings ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE document_embeddings ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE document_shares ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE document_shares ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE groups ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE groups ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_members ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_members ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_messages ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_messages ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_files ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_files ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE chat_sessions ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE chat_sessions ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE chat_messages ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE chat_messages ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE message_feedback ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE message_feedback ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE ai_usage_history ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE ai_usage_history ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE conversations ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE conversations ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE direct_messages ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE direct_messages ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE friendships ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE friendships ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE message_reactions ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE message_reactions ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE notifications ALTER COLUMN created_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE notifications ALTER COLUMN updated_at SET DEFAULT timezone('utc', clock_timestamp());
+
+ALTER TABLE document_shares ALTER COLUMN shared_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE groups ALTER COLUMN last_message_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_members ALTER COLUMN joined_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE group_files ALTER COLUMN shared_at SET DEFAULT timezone('utc', clock_timestamp());
+ALTER TABLE conversations ALTER COLUMN last_message_at SET DEFAULT timezone('utc', clock_timestamp());
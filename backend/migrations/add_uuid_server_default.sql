@@ -0,0 +1,26 @@
+-- Migration: id UUID mặc định sinh phía Postgres (gen_random_uuid)
+-- Run against jvb_postgres
+-- gen_random_uuid() có sẵn từ PostgreSQL 13 (image dùng postgres:16) - không cần pgcrypto
+-- Chỉ đổi DEFAULT, không ghi lại dữ liệu: chạy nhanh, khóa mỗi bảng trong chốc lát
+
+ALTER TABLE users ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE user_sessions ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE login_history ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE user_settings ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE documents ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE document_chunks ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE document_embeddings ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE document_shares ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE groups ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE group_members ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE group_messages ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE group_files ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE chat_sessions ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE chat_messages ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE message_feedback ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE ai_usage_history ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE conversations ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE direct_messages ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE friendships ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE message_reactions ALTER COLUMN id SET DEFAULT gen_random_uuid();
+ALTER TABLE notifications ALTER COLUMN id SET DEFAULT gen_random_uuid();
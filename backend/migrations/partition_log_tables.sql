@@ -0,0 +1,89 @@
+-- Migration: login_history, ai_usage_history partition theo tháng (RANGE created_at)
+-- Run against jvb_postgres
+-- Bảng log chỉ append: insert chỉ chạm B-tree nhỏ của partition tháng hiện tại, query
+-- theo khoảng thời gian chỉ quét partition liên quan, dữ liệu cũ DETACH/DROP theo tháng
+-- thay vì DELETE. Khóa phân vùng phải thuộc PK -> PK đổi thành (id, created_at).
+-- Bảng được dựng lại và copy dữ liệu trong một transaction (khóa bảng trong lúc chạy).
+-- Function giống hệt bản khai báo trong models/base.py
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent regclass, month_start date) RETURNS void AS $$
+DECLARE
+    from_date date := date_trunc('month', month_start)::date;
+BEGIN
+    EXECUTE 'CREATE TABLE IF NOT EXISTS '
+        || quote_ident(parent::text || '_' || to_char(from_date, 'YYYY_MM'))
+        || ' PARTITION OF ' || parent::text
+        || ' FOR VALUES FROM (' || quote_literal(from_date)
+        || ') TO (' || quote_literal((from_date + interval '1 month')::date) || ')';
+EXCEPTION WHEN others THEN
+    RAISE WARNING USING MESSAGE = 'create_monthly_partition ' || parent::text || ' ' || from_date || ': ' || SQLERRM;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent regclass, months_ahead integer DEFAULT 3) RETURNS void AS $$
+DECLARE
+    current_month date := date_trunc('month', timezone('utc', now()))::date;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = parent) THEN
+        RETURN;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_monthly_partitions'));
+    FOR i IN 0..months_ahead LOOP
+        PERFORM create_monthly_partition(parent, (current_month + make_interval(months => i))::date);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 1. login_history
+ALTER TABLE login_history RENAME TO login_history_old;
+ALTER TABLE login_history_old RENAME CONSTRAINT login_history_pkey TO login_history_old_pkey;
+
+CREATE TABLE login_history (
+    LIKE login_history_old INCLUDING DEFAULTS,
+    PRIMARY KEY (id, created_at),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) PARTITION BY RANGE (created_at);
+
+SELECT create_monthly_partition('login_history', m::date)
+FROM generate_series(
+    date_trunc('month', (SELECT MIN(created_at) FROM login_history_old)),
+    date_trunc('month', timezone('utc', now())),
+    interval '1 month'
+) AS m;
+SELECT ensure_monthly_partitions('login_history');
+CREATE TABLE login_history_default PARTITION OF login_history DEFAULT;
+
+INSERT INTO login_history SELECT * FROM login_history_old;
+DROP TABLE login_history_old;
+
+-- 2. ai_usage_history
+ALTER TABLE ai_usage_history RENAME TO ai_usage_history_old;
+ALTER TABLE ai_usage_history_old RENAME CONSTRAINT ai_usage_history_pkey TO ai_usage_history_old_pkey;
+ALTER INDEX IF EXISTS ix_ai_usage_history_user_id RENAME TO ix_ai_usage_history_old_user_id;
+ALTER INDEX IF EXISTS ix_ai_usage_user_id_created_at RENAME TO ix_ai_usage_old_user_id_created_at;
+
+CREATE TABLE ai_usage_history (
+    LIKE ai_usage_history_old INCLUDING DEFAULTS,
+    PRIMARY KEY (id, created_at),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE SET NULL
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX ix_ai_usage_history_user_id ON ai_usage_history (user_id);
+CREATE INDEX ix_ai_usage_user_id_created_at ON ai_usage_history (user_id, created_at);
+
+SELECT create_monthly_partition('ai_usage_history', m::date)
+FROM generate_series(
+    date_trunc('month', (SELECT MIN(created_at) FROM ai_usage_history_old)),
+    date_trunc('month', timezone('utc', now())),
+    interval '1 month'
+) AS m;
+SELECT ensure_monthly_partitions('ai_usage_history');
+CREATE TABLE ai_usage_history_default PARTITION OF ai_usage_history DEFAULT;
+
+INSERT INTO ai_usage_history SELECT * FROM ai_usage_history_old;
+DROP TABLE ai_usage_history_old;
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- Migration: chat_messages.role -> ENUM chat_message_role, message_feedback.is_helpful -> boolean
+-- Run against jvb_postgres
+-- ENUM lưu 4 byte/dòng thay cho varchar ("assistant" = 10 byte), is_helpful là ba trạng thái
+-- (true / false / NULL). ALTER TYPE viết lại toàn bộ bảng và giữ ACCESS EXCLUSIVE lock:
+-- chạy trong giờ thấp điểm. Rewrite đã nén dòng nên không cần VACUUM FULL sau đó.
+
+BEGIN;
+
+DO $$ BEGIN
+    CREATE TYPE chat_message_role AS ENUM ('user', 'assistant');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+ALTER TABLE chat_messages
+    ALTER COLUMN role TYPE chat_message_role USING role::chat_message_role;
+
+ALTER TABLE message_feedback
+    ALTER COLUMN is_helpful TYPE boolean
+    USING CASE is_helpful WHEN 'helpful' THEN true WHEN 'not_helpful' THEN false END;
+
+COMMIT;
+
+ANALYZE chat_messages;
+ANALYZE message_feedback;
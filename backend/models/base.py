@@ -1,21 +1,101 @@
-import uuid
-from datetime import datetime
-from sqlalchemy import Column, DateTime, String
+from sqlalchemy import DDL, Column, DateTime, String, Table, event, func, text
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.dialects.postgresql import UUID
 
 Base = declarative_base()
 
+# Thời điểm hiện tại theo UTC, kiểu timestamp không timezone (giữ nguyên format như
+# datetime.utcnow trước đây) - sinh phía Postgres, đồng hồ các worker lệch nhau không ảnh hưởng.
+# clock_timestamp() thay vì now(): now() cố định trong cả transaction, các dòng insert
+# cùng transaction sẽ trùng created_at và mất thứ tự
+UTC_NOW = text("timezone('utc', clock_timestamp())")
+
 
 class BaseModel(Base):
     """Base model với UUID primary key và timestamps"""
     __abstract__ = True
 
+    # UUID sinh phía Postgres (gen_random_uuid, có sẵn từ PG13): ORM lấy id qua RETURNING,
+    # bulk insert không phải gọi uuid4() cho từng dòng. Cần id trước khi flush thì tự truyền id=
     id = Column(
         UUID(as_uuid=True),
         primary_key=True,
-        default=uuid.uuid4,
+        server_default=text("gen_random_uuid()"),
+        nullable=False
+    )
+    created_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
+    updated_at = Column(
+        DateTime,
+        server_default=UTC_NOW,
+        onupdate=func.timezone("utc", func.clock_timestamp()),  # Render thẳng vào UPDATE ... SET
         nullable=False
     )
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Lấy giá trị sinh phía server qua RETURNING ngay trong INSERT/UPDATE, không
+    # expire attribute (lazy load sau đó không được phép với AsyncSession)
+    __mapper_args__ = {"eager_defaults": True}
+
+
+# ============================================
+# Partition theo tháng (RANGE created_at) cho bảng log append-only
+# ============================================
+# Bảng đã gọi partition_monthly - init_db/Celery beat tạo trước partition các tháng tới
+MONTHLY_PARTITIONED_TABLES = []
+
+# Tạo partition [tháng, tháng sau) nếu chưa có. Lỗi (thường do partition DEFAULT đã
+# chứa dòng của tháng đó) chỉ cảnh báo: dòng mới vẫn vào DEFAULT, insert không hỏng
+CREATE_MONTHLY_PARTITION_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent regclass, month_start date) RETURNS void AS $$
+DECLARE
+    from_date date := date_trunc('month', month_start)::date;
+BEGIN
+    EXECUTE 'CREATE TABLE IF NOT EXISTS '
+        || quote_ident(parent::text || '_' || to_char(from_date, 'YYYY_MM'))
+        || ' PARTITION OF ' || parent::text
+        || ' FOR VALUES FROM (' || quote_literal(from_date)
+        || ') TO (' || quote_literal((from_date + interval '1 month')::date) || ')';
+EXCEPTION WHEN others THEN
+    RAISE WARNING USING MESSAGE = 'create_monthly_partition ' || parent::text || ' ' || from_date || ': ' || SQLERRM;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+# Partition tháng hiện tại + months_ahead tháng tới; bỏ qua bảng chưa partitioned
+# (chưa chạy migration). Advisory lock: nhiều worker startup cùng lúc không tranh nhau
+ENSURE_MONTHLY_PARTITIONS_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent regclass, months_ahead integer DEFAULT 3) RETURNS void AS $$
+DECLARE
+    current_month date := date_trunc('month', timezone('utc', now()))::date;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = parent) THEN
+        RETURN;
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_monthly_partitions'));
+    FOR i IN 0..months_ahead LOOP
+        PERFORM create_monthly_partition(parent, (current_month + make_interval(months => i))::date);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+
+def partition_monthly(table: Table) -> None:
+    """
+    Khai báo DDL cho bảng PARTITION BY RANGE (created_at) theo tháng
+    
+    Model phải có postgresql_partition_by trong __table_args__ và created_at nằm
+    trong primary key (Postgres bắt buộc khóa phân vùng thuộc mọi unique/PK).
+    Khi create_all tạo bảng: tạo partition DEFAULT (lưới an toàn cho insert) và
+    partition các tháng tới. DB đã có sẵn: migrations/partition_log_tables.sql
+    
+    Args:
+        table: Table của model (Model.__table__)
+    """
+    MONTHLY_PARTITIONED_TABLES.append(table.name)
+    for ddl in (
+        CREATE_MONTHLY_PARTITION_FUNCTION,
+        ENSURE_MONTHLY_PARTITIONS_FUNCTION,
+        DDL("CREATE TABLE IF NOT EXISTS %(table)s_default PARTITION OF %(table)s DEFAULT"),
+        DDL("SELECT ensure_monthly_partitions('%(table)s')"),
+    ):
+        event.listen(table, "after_create", ddl.execute_if(dialect="postgresql"))
@@ -1,36 +1,51 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, JSON, Numeric
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, JSON, Numeric, Index, Enum, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 
-from .base import BaseModel
+from .base import BaseModel, UTC_NOW, partition_monthly
 
 
 class ChatSession(BaseModel):
     """Bảng lưu trữ phiên chat AI"""
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_user_id_updated_at", "user_id", "updated_at"),
+        # Tìm session theo document: context_documents @> ARRAY[...] dùng GIN index
+        Index("ix_chat_sessions_context_documents_gin", "context_documents", postgresql_using="gin"),
+    )
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(255), nullable=True)
     session_type = Column(String(50), default="general", nullable=False)  # general, document_qa
-    context_documents = Column(ARRAY(UUID(as_uuid=True)), nullable=True, default=[])
+    context_documents = Column(ARRAY(UUID(as_uuid=False)), nullable=True, default=[])  # load sẵn dạng str
     model_name = Column(String(100), nullable=False, default="gpt-3.5-turbo")
-    message_count = Column(Integer, default=0, nullable=False)
-    total_tokens_used = Column(Integer, default=0, nullable=False)
+    # Trigger trên chat_messages cập nhật (CHAT_MESSAGES_COUNT_FUNCTION bên dưới)
+    message_count = Column(Integer, server_default="0", nullable=False)
+    total_tokens_used = Column(Integer, server_default="0", nullable=False)
 
     # Relationships
     user = relationship("User", back_populates="chat_sessions")
-    messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan")
+    messages = relationship(
+        "ChatMessage",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        order_by="ChatMessage.created_at",
+    )
 
 
 class ChatMessage(BaseModel):
     """Bảng lưu trữ các tin nhắn trong phiên chat"""
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),
+    )
 
     session_id = Column(UUID(as_uuid=True), ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    role = Column(String(20), nullable=False)  # user, assistant
+    # ENUM 4 byte thay cho varchar ("assistant" 10 byte) trên bảng lớn nhất
+    role = Column(Enum("user", "assistant", name="chat_message_role"), nullable=False)
     content = Column(Text, nullable=False)
     retrieved_chunks = Column(ARRAY(UUID(as_uuid=True)), nullable=True, default=[])
     total_tokens = Column(Integer, nullable=False, default=0)
@@ -42,13 +57,46 @@ class ChatMessage(BaseModel):
     feedback = relationship("MessageFeedback", back_populates="message", cascade="all, delete-orphan", uselist=False)
 
 
+# chat_sessions.message_count/total_tokens_used do trigger cập nhật trong cùng
+# transaction với INSERT/DELETE chat_messages; INSERT đẩy luôn updated_at
+# (xem migrations/add_counter_triggers.sql cho DB đã có sẵn)
+CHAT_MESSAGES_COUNT_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION chat_messages_count_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE chat_sessions
+        SET message_count = message_count + 1,
+            total_tokens_used = total_tokens_used + COALESCE(NEW.total_tokens, 0),
+            updated_at = timezone('utc', clock_timestamp())
+        WHERE id = NEW.session_id;
+    ELSE
+        UPDATE chat_sessions
+        SET message_count = GREATEST(message_count - 1, 0),
+            total_tokens_used = GREATEST(total_tokens_used - COALESCE(OLD.total_tokens, 0), 0)
+        WHERE id = OLD.session_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+CHAT_MESSAGES_COUNT_TRIGGER = DDL("""
+CREATE TRIGGER trg_chat_messages_count
+AFTER INSERT OR DELETE ON chat_messages
+FOR EACH ROW EXECUTE FUNCTION chat_messages_count_trigger()
+""")
+
+event.listen(ChatMessage.__table__, "after_create", CHAT_MESSAGES_COUNT_FUNCTION.execute_if(dialect="postgresql"))
+event.listen(ChatMessage.__table__, "after_create", CHAT_MESSAGES_COUNT_TRIGGER.execute_if(dialect="postgresql"))
+
+
 class MessageFeedback(BaseModel):
     """Bảng lưu trữ phản hồi người dùng về tin nhắn AI"""
     __tablename__ = "message_feedback"
 
     message_id = Column(UUID(as_uuid=True), ForeignKey("chat_messages.id", ondelete="CASCADE"), nullable=False, unique=True)
     rating = Column(Integer, nullable=True)  # 1-5 star rating
-    is_helpful = Column(String(20), nullable=True)  # helpful, not_helpful
+    is_helpful = Column(Boolean, nullable=True)  # NULL = chưa đánh giá
     comment = Column(Text, nullable=True)
     feedback_type = Column(String(50), nullable=True)
 
@@ -59,6 +107,13 @@ class MessageFeedback(BaseModel):
 class AIUsageHistory(BaseModel):
     """Bảng ghi lại lịch sử sử dụng AI"""
     __tablename__ = "ai_usage_history"
+    __table_args__ = (
+        Index("ix_ai_usage_user_id_created_at", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Khóa phân vùng phải thuộc primary key -> PK (id, created_at)
+    created_at = Column(DateTime, primary_key=True, server_default=UTC_NOW, nullable=False)
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     session_id = Column(UUID(as_uuid=True), ForeignKey("chat_sessions.id", ondelete="SET NULL"), nullable=True)
@@ -72,3 +127,6 @@ class AIUsageHistory(BaseModel):
     # Relationships
     user = relationship("User", back_populates="ai_usage_history")
     session = relationship("ChatSession", foreign_keys=[session_id])
+
+
+partition_monthly(AIUsageHistory.__table__)
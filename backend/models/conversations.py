@@ -1,20 +1,25 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, UniqueConstraint, Index, CheckConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.hybrid import hybrid_property
 
-from .base import BaseModel
+from .base import BaseModel, UTC_NOW
 
 
 class Conversation(BaseModel):
     """Bảng lưu trữ cuộc trò chuyện trực tiếp giữa hai người"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Cặp participant lưu theo thứ tự (participant_1 <= participant_2) và là duy nhất:
+        # tìm conversation giữa 2 người = 1 lần tra index, không tạo trùng khi request song song
+        UniqueConstraint("participant_1", "participant_2", name="uq_conversations_participants"),
+        CheckConstraint("participant_1 <= participant_2", name="ck_conversations_participants_sorted"),
+    )
 
     participant_1 = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     participant_2 = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    last_message_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_message_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
     last_message_content = Column(Text, nullable=True)
 
     # Relationships
@@ -26,6 +31,9 @@ class Conversation(BaseModel):
 class DirectMessage(BaseModel):
     """Bảng lưu trữ tin nhắn trực tiếp"""
     __tablename__ = "direct_messages"
+    __table_args__ = (
+        Index("ix_direct_messages_conversation_id_created_at", "conversation_id", "created_at"),
+    )
 
     conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
     sender_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -1,30 +1,37 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, BigInteger, JSON
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, BigInteger, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 
-from .base import BaseModel
+from .base import BaseModel, UTC_NOW
 
 
 class Document(BaseModel):
     """Bảng lưu trữ tài liệu người dùng"""
     __tablename__ = "documents"
+    __table_args__ = (
+        # Lọc theo tag: tags @> ARRAY['ml'] dùng GIN index thay vì quét cả bảng
+        Index("ix_documents_tags_gin", "tags", postgresql_using="gin"),
+    )
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(500), nullable=False)
     file_name = Column(String(500), nullable=False)
     file_path = Column(Text, nullable=False)
+    # Object key trong bucket (file_path bỏ tiền tố bucket) - dùng trực tiếp cho MinIO
+    object_name = Column(Text, nullable=False)
     # SHA-256 hash of file bytes for dedup (per user).
     content_hash = Column(String(64), nullable=True, index=True)
     # Canonical document ID whose vectors/chunks this document reuses.
     canonical_document_id = Column(UUID(as_uuid=True), nullable=True, index=True)
     file_size = Column(BigInteger, nullable=False)
     file_type = Column(String(100), nullable=False)
+    # MIME type đọc từ magic bytes (worker), None nếu chưa kiểm tra / không nhận ra
+    mime_sniffed = Column(String(100), nullable=True)
     
     # Trạng thái xử lý
     is_processed = Column(Boolean, default=False, nullable=False)
-    processing_status = Column(String(50), default="pending", nullable=False)  # pending, processing, completed, failed
+    processing_status = Column(String(50), default="pending", nullable=False)  # pending_validation, processing, completed, failed, invalid
     
     # Phân loại
     category = Column(String(100), nullable=True)
@@ -71,11 +78,16 @@ class DocumentEmbedding(BaseModel):
 class DocumentShare(BaseModel):
     """Bảng quản lý việc chia sẻ tài liệu"""
     __tablename__ = "document_shares"
+    __table_args__ = (
+        # Kiểm tra quyền đọc: EXISTS (document_id = ? AND shared_with_user_id = ?)
+        # UNIQUE -> share_document UPSERT bằng ON CONFLICT
+        Index("ix_document_shares_document_id_shared_with_user_id", "document_id", "shared_with_user_id", unique=True),
+    )
 
     document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
     shared_with_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     permission = Column(String(20), default="view", nullable=False)  # view, edit, admin
-    shared_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    shared_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
 
     # Relationships
     document = relationship("Document", back_populates="shares")
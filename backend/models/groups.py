@@ -1,10 +1,9 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Index, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
-from .base import BaseModel
+from .base import BaseModel, UTC_NOW
 
 
 class Group(BaseModel):
@@ -16,9 +15,9 @@ class Group(BaseModel):
     is_public = Column(Boolean, default=False, nullable=False)
     join_code = Column(String(50), unique=True, nullable=True)
     description = Column(Text, nullable=True)
-    member_count = Column(Integer, default=0, nullable=False)
+    member_count = Column(Integer, server_default="0", nullable=False)  # Trigger trên group_members cập nhật
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    last_message_at = Column(DateTime, default=datetime.utcnow, nullable=True)
+    last_message_at = Column(DateTime, server_default=UTC_NOW, nullable=True)
     last_message_content = Column(Text, nullable=True)
 
     # Relationships
@@ -31,11 +30,15 @@ class Group(BaseModel):
 class GroupMember(BaseModel):
     """Bảng quản lý thành viên của nhóm"""
     __tablename__ = "group_members"
+    __table_args__ = (
+        # Mỗi user chỉ là member một lần - add_group_member dùng ON CONFLICT DO NOTHING
+        Index("uq_group_members_group_id_user_id", "group_id", "user_id", unique=True),
+    )
 
     group_id = Column(UUID(as_uuid=True), ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     role = Column(String(50), default="member", nullable=False)  # owner, admin, member
-    joined_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    joined_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
     last_read_at = Column(DateTime, nullable=True)  # Track when user last read group messages
 
     # Relationships
@@ -43,9 +46,37 @@ class GroupMember(BaseModel):
     user = relationship("User", back_populates="group_memberships")
 
 
+# groups.member_count do trigger cập nhật trong cùng transaction với INSERT/DELETE
+# group_members (xem migrations/add_counter_triggers.sql cho DB đã có sẵn)
+GROUP_MEMBERS_COUNT_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION group_members_count_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE groups SET member_count = member_count + 1 WHERE id = NEW.group_id;
+    ELSE
+        UPDATE groups SET member_count = GREATEST(member_count - 1, 0) WHERE id = OLD.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+
+GROUP_MEMBERS_COUNT_TRIGGER = DDL("""
+CREATE TRIGGER trg_group_members_count
+AFTER INSERT OR DELETE ON group_members
+FOR EACH ROW EXECUTE FUNCTION group_members_count_trigger()
+""")
+
+event.listen(GroupMember.__table__, "after_create", GROUP_MEMBERS_COUNT_FUNCTION.execute_if(dialect="postgresql"))
+event.listen(GroupMember.__table__, "after_create", GROUP_MEMBERS_COUNT_TRIGGER.execute_if(dialect="postgresql"))
+
+
 class GroupMessage(BaseModel):
     """Bảng lưu trữ tin nhắn trong nhóm"""
     __tablename__ = "group_messages"
+    __table_args__ = (
+        Index("ix_group_messages_group_id_created_at", "group_id", "created_at"),
+    )
 
     group_id = Column(UUID(as_uuid=True), ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -73,7 +104,7 @@ class GroupFile(BaseModel):
     group_id = Column(UUID(as_uuid=True), ForeignKey("groups.id", ondelete="CASCADE"), nullable=False, index=True)
     document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     uploaded_by_user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    shared_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    shared_at = Column(DateTime, server_default=UTC_NOW, nullable=False)
 
     # Relationships
     group = relationship("Group", back_populates="files")
@@ -4,7 +4,7 @@ from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, T
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 
-from .base import BaseModel
+from .base import BaseModel, UTC_NOW, partition_monthly
 
 
 class User(BaseModel):
@@ -85,6 +85,12 @@ class UserSession(BaseModel):
 class LoginHistory(BaseModel):
     """Bảng ghi lại lịch sử đăng nhập"""
     __tablename__ = "login_history"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    # Khóa phân vùng phải thuộc primary key -> PK (id, created_at)
+    created_at = Column(DateTime, primary_key=True, server_default=UTC_NOW, nullable=False)
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     ip_address = Column(String(45), nullable=True)
@@ -96,6 +102,9 @@ class LoginHistory(BaseModel):
     user = relationship("User", back_populates="login_history")
 
 
+partition_monthly(LoginHistory.__table__)
+
+
 class UserSettings(BaseModel):
     """Bảng cài đặt người dùng"""
     __tablename__ = "user_settings"
@@ -1,7 +1,7 @@
 """
 Pydantic schemas cho Admin API
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
@@ -36,8 +36,7 @@ class AdminUserResponse(BaseModel):
     last_seen: Optional[str]  # "Now", "2h ago", etc.
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AdminUserListResponse(BaseModel):
@@ -58,8 +57,7 @@ class AdminGroupResponse(BaseModel):
     last_active: Optional[str]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AdminGroupListResponse(BaseModel):
@@ -82,8 +80,7 @@ class AdminDocumentResponse(BaseModel):
     updated_at: datetime
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AdminDocumentListResponse(BaseModel):
@@ -104,8 +101,7 @@ class AdminActivityLogResponse(BaseModel):
     timestamp: str  # "2 minutes ago"
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AdminActivityLogListResponse(BaseModel):
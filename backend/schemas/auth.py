@@ -1,7 +1,7 @@
 """
 Pydantic schemas cho Authentication
 """
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from typing import Optional
 from datetime import datetime
 
@@ -17,8 +17,8 @@ class RegisterRequest(BaseModel):
     full_name: Optional[str] = Field(None, max_length=255)
     student_id: str = Field(..., min_length=8, max_length=8)
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "email": "user@example.com",
                 "username": "john_doe",
@@ -26,7 +26,8 @@ class RegisterRequest(BaseModel):
                 "full_name": "John Doe",
                 "student_id": "12345678"
             }
-        }
+        },
+    )
 
 
 class LoginRequest(BaseModel):
@@ -34,37 +35,40 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str = Field(..., max_length=72, description="Mật khẩu (tối đa 72 ký tự cho bcrypt)")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "email": "user@example.com",
                 "password": "secure_password123"
             }
-        }
+        },
+    )
 
 
 class RefreshTokenRequest(BaseModel):
     """Schema cho request làm mới access token"""
     refresh_token: str
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "refresh_token": "eyJhbGc..."
             }
-        }
+        },
+    )
 
 
 class LogoutRequest(BaseModel):
     """Schema cho request logout"""
     refresh_token: Optional[str] = None
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "refresh_token": "eyJhbGc..."
             }
-        }
+        },
+    )
 
 
 # ============================================
@@ -77,15 +81,16 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
     expires_in: int
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "access_token": "eyJhbGc...",
                 "refresh_token": "eyJhbGc...",
                 "token_type": "bearer",
                 "expires_in": 900
             }
-        }
+        },
+    )
 
 
 class AccessTokenResponse(BaseModel):
@@ -94,23 +99,25 @@ class AccessTokenResponse(BaseModel):
     token_type: str = "bearer"
     expires_in: int
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "access_token": "eyJhbGc...",
                 "token_type": "bearer",
                 "expires_in": 900
             }
-        }
+        },
+    )
 
 
 class MessageResponse(BaseModel):
     """Schema cho message response"""
     message: str
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "message": "Operation successful"
             }
-        }
+        },
+    )
@@ -0,0 +1,29 @@
+"""
+Base schema cho response dựng từ ORM object
+"""
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class ORMResponseModel(BaseModel):
+    """
+    Response schema có thể dựng từ row trong DB mà không validate
+
+    Chỉ dùng cho schema phẳng (không có field là model lồng nhau) với kiểu field
+    khớp kiểu Python của cột: model_construct không chuyển kiểu và không dựng
+    model con. Dữ liệu từ request vẫn đi qua model_validate.
+    """
+
+    @classmethod
+    def from_orm_trusted(cls, obj: Any) -> "ORMResponseModel":
+        """
+        Dựng schema từ ORM object đọc từ DB của mình (bỏ qua validation)
+
+        Args:
+            obj: SQLAlchemy object có đủ attribute theo tên field
+
+        Returns:
+            Instance của schema
+        """
+        return cls.model_construct(**{name: getattr(obj, name) for name in cls.model_fields})
@@ -1,12 +1,14 @@
 """
 Pydantic schemas cho Chat
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
 
+from schemas.base import ORMResponseModel
+
 
 # ============================================
 # Request Schemas
@@ -25,15 +27,16 @@ class ChatSessionCreateRequest(BaseModel):
         description="Model name (auto-selected by AI Service based on intent, this field is for logging only)"
     )
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "title": "Java Learning Session",
                 "session_type": "document_qa",
                 "context_documents": ["550e8400-e29b-41d4-a716-446655440000"],
                 "model_name": "auto"
             }
-        }
+        },
+    )
 
 
 class ChatMessageCreateRequest(BaseModel):
@@ -42,34 +45,36 @@ class ChatMessageCreateRequest(BaseModel):
     content: str = Field(..., min_length=1)
     retrieved_chunks: Optional[List[UUID]] = []
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "session_id": "550e8400-e29b-41d4-a716-446655440000",
                 "content": "How to implement Java generics?",
                 "retrieved_chunks": ["550e8400-e29b-41d4-a716-446655440001"]
             }
-        }
+        },
+    )
 
 
 class MessageFeedbackRequest(BaseModel):
     """Schema cho request feedback tin nhắn"""
     message_id: UUID
     rating: Optional[int] = Field(None, ge=1, le=5)
-    is_helpful: Optional[str] = Field(None, pattern="^(helpful|not_helpful)$")
+    is_helpful: Optional[bool] = None
     comment: Optional[str] = None
     feedback_type: Optional[str] = None
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "message_id": "550e8400-e29b-41d4-a716-446655440000",
                 "rating": 5,
-                "is_helpful": "helpful",
+                "is_helpful": True,
                 "comment": "Very helpful response",
                 "feedback_type": "positive"
             }
-        }
+        },
+    )
 
 
 class ChatAskRequest(BaseModel):
@@ -84,8 +89,8 @@ class ChatAskRequest(BaseModel):
     temperature: Optional[float] = Field(default=0.7, ge=0.0, le=1.0)
     max_tokens: Optional[int] = Field(default=4000, ge=100, le=16000)
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "question": "Tài liệu này nói về gì?",
                 "document_ids": None,
@@ -94,7 +99,8 @@ class ChatAskRequest(BaseModel):
                 "temperature": 0.7,
                 "max_tokens": 4000
             }
-        }
+        },
+    )
 
 
 # ============================================
@@ -105,15 +111,14 @@ class MessageFeedbackResponse(BaseModel):
     id: UUID
     message_id: UUID
     rating: Optional[int]
-    is_helpful: Optional[str]
+    is_helpful: Optional[bool]
     comment: Optional[str]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-class ChatMessageResponse(BaseModel):
+class ChatMessageResponse(ORMResponseModel):
     """Schema cho response chat message"""
     id: UUID
     session_id: UUID
@@ -125,9 +130,10 @@ class ChatMessageResponse(BaseModel):
     confidence_score: Optional[Decimal]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        revalidate_instances="never",
+        json_schema_extra={
             "example": {
                 "id": "550e8400-e29b-41d4-a716-446655440000",
                 "session_id": "550e8400-e29b-41d4-a716-446655440001",
@@ -139,7 +145,8 @@ class ChatMessageResponse(BaseModel):
                 "confidence_score": 0.95,
                 "created_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
 
 
 class ChatSessionResponse(BaseModel):
@@ -155,9 +162,10 @@ class ChatSessionResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        revalidate_instances="never",
+        json_schema_extra={
             "example": {
                 "id": "550e8400-e29b-41d4-a716-446655440000",
                 "user_id": "550e8400-e29b-41d4-a716-446655440001",
@@ -170,15 +178,15 @@ class ChatSessionResponse(BaseModel):
                 "created_at": "2024-02-01T10:00:00",
                 "updated_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
 
 
 class ChatSessionDetailResponse(ChatSessionResponse):
     """Schema cho response chi tiết chat session"""
     messages: Optional[List[ChatMessageResponse]] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ContextChunkResponse(BaseModel):
@@ -191,6 +199,11 @@ class ContextChunkResponse(BaseModel):
     file_name: str
     title: Optional[str] = None
 
+    model_config = ConfigDict(
+        from_attributes=True,
+        revalidate_instances="never",
+    )
+
 
 class ChatAskResponse(BaseModel):
     """Schema cho response hỏi AI trong chat session"""
@@ -203,8 +216,8 @@ class ChatAskResponse(BaseModel):
     doc_map: Optional[List[dict]] = []
     quota_info: Optional[dict] = None
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "session_id": "550e8400-e29b-41d4-a716-446655440000",
                 "user_message": {
@@ -221,7 +234,8 @@ class ChatAskResponse(BaseModel):
                 "processing_time": 2.5,
                 "model_used": "command-r7b-12-2024"
             }
-        }
+        },
+    )
 
 
 class AIUsageResponse(BaseModel):
@@ -237,5 +251,10 @@ class AIUsageResponse(BaseModel):
     error_message: Optional[str]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============================================
+# List adapters - build một lần lúc import, dùng lại cho mọi request
+# ============================================
+ChatSessionListAdapter = TypeAdapter(List[ChatSessionResponse])
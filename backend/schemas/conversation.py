@@ -1,7 +1,7 @@
 """
 Pydantic schemas cho Direct Message (Conversation)
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
@@ -16,26 +16,28 @@ class DirectMessageCreateRequest(BaseModel):
     content: Optional[str] = None
     message_type: str = "text"  # text, image, file
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "receiver_id": "550e8400-e29b-41d4-a716-446655440000",
                 "content": "Hi, how are you?",
                 "message_type": "text"
             }
-        }
+        },
+    )
 
 
 class ConversationCreateRequest(BaseModel):
     """Schema cho request tạo conversation"""
     participant_2_id: UUID
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "participant_2_id": "550e8400-e29b-41d4-a716-446655440000"
             }
-        }
+        },
+    )
 
 
 # ============================================
@@ -57,8 +59,7 @@ class FriendSearchResult(BaseModel):
     avatar_url: Optional[str] = None
     friendship_status: Optional[str] = None  # pending, accepted, none
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============================================
@@ -70,8 +71,7 @@ class MessageSenderResponse(BaseModel):
     full_name: Optional[str] = None
     avatar_url: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DirectMessageResponse(BaseModel):
@@ -89,8 +89,7 @@ class DirectMessageResponse(BaseModel):
     created_at: datetime
     sender: Optional[MessageSenderResponse] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ConversationParticipantResponse(BaseModel):
@@ -100,8 +99,7 @@ class ConversationParticipantResponse(BaseModel):
     avatar_url: Optional[str] = None
     student_id: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ConversationResponse(BaseModel):
@@ -116,16 +114,14 @@ class ConversationResponse(BaseModel):
     other_user: Optional[ConversationParticipantResponse] = None
     unread_count: int = 0
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ConversationDetailResponse(ConversationResponse):
     """Schema cho response chi tiết conversation"""
     messages: Optional[List[DirectMessageResponse]] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ============================================
@@ -137,8 +133,7 @@ class GroupMessageSenderResponse(BaseModel):
     full_name: Optional[str] = None
     avatar_url: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class GroupMessageResponse(BaseModel):
@@ -154,8 +149,7 @@ class GroupMessageResponse(BaseModel):
     created_at: datetime
     sender: Optional[GroupMessageSenderResponse] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class GroupConversationResponse(BaseModel):
@@ -167,8 +161,7 @@ class GroupConversationResponse(BaseModel):
     member_count: int = 0
     unread_count: int = 0
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class UnifiedConversationResponse(BaseModel):
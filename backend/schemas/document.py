@@ -1,11 +1,13 @@
 """
 Pydantic schemas cho Document
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
 
+from schemas.base import ORMResponseModel
+
 
 # ============================================
 # Request Schemas
@@ -16,14 +18,15 @@ class DocumentCreateRequest(BaseModel):
     category: Optional[str] = Field(None, max_length=100)
     tags: Optional[List[str]] = []
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "title": "My Java Document",
                 "category": "programming",
                 "tags": ["java", "tutorial"]
             }
-        }
+        },
+    )
 
 
 class DocumentUpdateRequest(BaseModel):
@@ -32,14 +35,37 @@ class DocumentUpdateRequest(BaseModel):
     category: Optional[str] = Field(None, max_length=100)
     tags: Optional[List[str]] = None
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "title": "Updated Java Document",
                 "category": "programming",
                 "tags": ["java", "advanced"]
             }
-        }
+        },
+    )
+
+
+class DocumentUploadInitRequest(BaseModel):
+    """Schema cho request khởi tạo upload (client PUT file thẳng lên MinIO)"""
+    file_name: str = Field(..., max_length=500)
+    content_type: str = Field(..., max_length=100)
+    file_size: int = Field(..., ge=0)
+    title: Optional[str] = Field(None, max_length=500)
+    category: Optional[str] = Field(None, max_length=100)
+    tags: Optional[List[str]] = []
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "file_name": "java_guide.pdf",
+                "content_type": "application/pdf",
+                "file_size": 1024000,
+                "title": "Java Programming Guide",
+                "tags": ["java", "guide"]
+            }
+        },
+    )
 
 
 class DocumentShareRequest(BaseModel):
@@ -47,13 +73,14 @@ class DocumentShareRequest(BaseModel):
     shared_with_user_id: UUID
     permission: str = Field(default="view", pattern="^(view|edit|admin)$")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "shared_with_user_id": "550e8400-e29b-41d4-a716-446655440000",
                 "permission": "view"
             }
-        }
+        },
+    )
 
 
 # ============================================
@@ -67,8 +94,7 @@ class DocumentChunkResponse(BaseModel):
     token_count: int
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DocumentEmbeddingResponse(BaseModel):
@@ -77,8 +103,7 @@ class DocumentEmbeddingResponse(BaseModel):
     embedding_model: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DocumentShareResponse(BaseModel):
@@ -89,11 +114,10 @@ class DocumentShareResponse(BaseModel):
     permission: str
     shared_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
-class DocumentResponse(BaseModel):
+class DocumentResponse(ORMResponseModel):
     """Schema cho response document"""
     id: UUID
     user_id: UUID
@@ -108,9 +132,9 @@ class DocumentResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
             "example": {
                 "id": "550e8400-e29b-41d4-a716-446655440000",
                 "user_id": "550e8400-e29b-41d4-a716-446655440001",
@@ -125,7 +149,21 @@ class DocumentResponse(BaseModel):
                 "created_at": "2024-02-01T10:00:00",
                 "updated_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
+
+
+class DocumentUploadInitResponse(BaseModel):
+    """Schema cho response khởi tạo upload"""
+    document_id: UUID
+    upload_url: str
+    expires_in: int  # Giây
+
+
+class DocumentDownloadUrlResponse(BaseModel):
+    """Schema cho response presigned URL download"""
+    url: str
+    expires_in: int  # Giây
 
 
 class DocumentDetailResponse(DocumentResponse):
@@ -134,5 +172,10 @@ class DocumentDetailResponse(DocumentResponse):
     embeddings: Optional[List[DocumentEmbeddingResponse]] = []
     shares: Optional[List[DocumentShareResponse]] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============================================
+# List adapters - build một lần lúc import, dùng lại cho mọi request
+# ============================================
+DocumentListAdapter = TypeAdapter(List[DocumentResponse])
@@ -1,7 +1,7 @@
 """
 Pydantic schemas cho Group
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
@@ -17,15 +17,16 @@ class GroupCreateRequest(BaseModel):
     description: Optional[str] = None
     is_public: bool = True
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "group_name": "Java Developers",
                 "group_type": "chat",
                 "description": "A group for Java developers",
                 "is_public": False
             }
-        }
+        },
+    )
 
 
 class GroupUpdateRequest(BaseModel):
@@ -34,26 +35,28 @@ class GroupUpdateRequest(BaseModel):
     description: Optional[str] = None
     is_public: Optional[bool] = None
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "group_name": "Advanced Java Developers",
                 "description": "For advanced Java developers only",
                 "is_public": False
             }
-        }
+        },
+    )
 
 
 class GroupMemberAddRequest(BaseModel):
     """Schema cho request thêm member vào group"""
     user_id: UUID
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "user_id": "550e8400-e29b-41d4-a716-446655440000"
             }
-        }
+        },
+    )
 
 
 class GroupMessageCreateRequest(BaseModel):
@@ -62,14 +65,15 @@ class GroupMessageCreateRequest(BaseModel):
     message_type: str = Field(default="text", pattern="^(text|file|image)$")
     content: str = Field(..., min_length=1)
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "group_id": "550e8400-e29b-41d4-a716-446655440000",
                 "message_type": "text",
                 "content": "Hello everyone!"
             }
-        }
+        },
+    )
 
 
 class GroupFileShareRequest(BaseModel):
@@ -77,13 +81,14 @@ class GroupFileShareRequest(BaseModel):
     group_id: UUID
     document_id: UUID
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "group_id": "550e8400-e29b-41d4-a716-446655440000",
                 "document_id": "550e8400-e29b-41d4-a716-446655440001"
             }
-        }
+        },
+    )
 
 
 # ============================================
@@ -97,8 +102,7 @@ class GroupMemberResponse(BaseModel):
     role: str
     joined_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class GroupMessageResponse(BaseModel):
@@ -111,9 +115,9 @@ class GroupMessageResponse(BaseModel):
     is_pinned: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
             "example": {
                 "id": "550e8400-e29b-41d4-a716-446655440000",
                 "group_id": "550e8400-e29b-41d4-a716-446655440001",
@@ -123,7 +127,8 @@ class GroupMessageResponse(BaseModel):
                 "is_pinned": False,
                 "created_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
 
 
 class GroupFileResponse(BaseModel):
@@ -134,8 +139,7 @@ class GroupFileResponse(BaseModel):
     uploaded_by_user_id: Optional[UUID]
     shared_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class GroupResponse(BaseModel):
@@ -151,9 +155,9 @@ class GroupResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
             "example": {
                 "id": "550e8400-e29b-41d4-a716-446655440000",
                 "group_name": "Java Developers",
@@ -166,7 +170,8 @@ class GroupResponse(BaseModel):
                 "created_at": "2024-02-01T10:00:00",
                 "updated_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
 
 
 class GroupDetailResponse(GroupResponse):
@@ -175,5 +180,4 @@ class GroupDetailResponse(GroupResponse):
     messages: Optional[List[GroupMessageResponse]] = []
     files: Optional[List[GroupFileResponse]] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -1,7 +1,7 @@
 """
 Pydantic schemas cho Notification
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
@@ -14,12 +14,13 @@ class NotificationMarkAsReadRequest(BaseModel):
     """Schema cho request đánh dấu notification đã đọc"""
     notification_id: UUID
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "notification_id": "550e8400-e29b-41d4-a716-446655440000"
             }
-        }
+        },
+    )
 
 
 # ============================================
@@ -37,9 +38,9 @@ class NotificationResponse(BaseModel):
     related_object_id: Optional[UUID]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
             "example": {
                 "id": "550e8400-e29b-41d4-a716-446655440000",
                 "user_id": "550e8400-e29b-41d4-a716-446655440001",
@@ -51,4 +52,5 @@ class NotificationResponse(BaseModel):
                 "related_object_id": "550e8400-e29b-41d4-a716-446655440002",
                 "created_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
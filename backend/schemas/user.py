@@ -1,11 +1,13 @@
 """
 Pydantic schemas cho User
 """
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
 
+from schemas.base import ORMResponseModel
+
 
 # ============================================
 # Request Schemas
@@ -14,12 +16,13 @@ class UserUpdateRequest(BaseModel):
     """Schema cho request cập nhật user - CHỈ cho phép sửa full_name"""
     full_name: Optional[str] = Field(None, max_length=255, description="Họ tên người dùng")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "full_name": "Nguyễn Văn A"
             }
-        }
+        },
+    )
 
 
 class ChangePasswordRequest(BaseModel):
@@ -27,13 +30,14 @@ class ChangePasswordRequest(BaseModel):
     current_password: str = Field(..., min_length=6, description="Mật khẩu hiện tại")
     new_password: str = Field(..., min_length=6, description="Mật khẩu mới")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "current_password": "OldPass123!",
                 "new_password": "NewPass123!"
             }
-        }
+        },
+    )
 
 
 class UserSettingsUpdateRequest(BaseModel):
@@ -44,8 +48,8 @@ class UserSettingsUpdateRequest(BaseModel):
     email_notifications: Optional[bool] = None
     two_factor_enabled: Optional[bool] = None
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "theme": "dark",
                 "language": "vi",
@@ -53,13 +57,14 @@ class UserSettingsUpdateRequest(BaseModel):
                 "email_notifications": True,
                 "two_factor_enabled": False
             }
-        }
+        },
+    )
 
 
 # ============================================
 # Response Schemas
 # ============================================
-class UserSettingsResponse(BaseModel):
+class UserSettingsResponse(ORMResponseModel):
     """Schema cho response cài đặt user"""
     user_id: UUID
     theme: str
@@ -70,9 +75,9 @@ class UserSettingsResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
             "example": {
                 "user_id": "550e8400-e29b-41d4-a716-446655440000",
                 "theme": "light",
@@ -83,10 +88,11 @@ class UserSettingsResponse(BaseModel):
                 "created_at": "2024-02-01T10:00:00",
                 "updated_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
 
 
-class UserResponse(BaseModel):
+class UserResponse(ORMResponseModel):
     """Schema cho response user"""
     id: UUID
     email: str
@@ -102,9 +108,9 @@ class UserResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
             "example": {
                 "id": "550e8400-e29b-41d4-a716-446655440000",
                 "email": "user@example.com",
@@ -119,12 +125,12 @@ class UserResponse(BaseModel):
                 "created_at": "2024-02-01T10:00:00",
                 "updated_at": "2024-02-01T10:00:00"
             }
-        }
+        },
+    )
 
 
 class UserDetailResponse(UserResponse):
     """Schema cho response chi tiết user (với settings)"""
     settings: Optional[UserSettingsResponse] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -8,11 +8,13 @@ from __future__ import annotations
 
 from sqlalchemy.orm import Session
 
-from core.databases import SessionLocal
+from core.databases import SessionLocal, register_models
 from core.mongo import mongo_chat_client
 from models.chat import ChatSession, ChatMessage
 from services.chat_history_service import chat_history_service
 
+register_models()
+
 
 def run_backfill(db: Session):
     sessions = db.query(ChatSession).all()
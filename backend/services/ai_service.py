@@ -4,12 +4,31 @@ Gọi AI Service microservice thay vì xử lý trực tiếp
 """
 from typing import List, Dict, Optional
 from uuid import UUID
+import hashlib
 import httpx
+import logging
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 
 from core.config import settings
+from core.databases import copy_rows
 from models.documents import Document, DocumentChunk, DocumentEmbedding
 from services.minio_service import minio_service
+from utils.validators import is_sniffed_mime_allowed, sniff_document_mime
+
+logger = logging.getLogger(__name__)
+
+# Số byte đầu file dùng để đọc magic bytes
+MIME_SNIFF_HEADER_SIZE = 16
+
+# AI Service trả các mã này khi quá tải/khởi động lại -> thử lại được
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class TransientProcessingError(Exception):
+    """Lỗi tạm thời khi xử lý document (mạng, DB mất kết nối, AI Service quá tải) -> retry được"""
 
 
 class AIService:
@@ -62,7 +81,8 @@ class AIService:
         db: Session
     ) -> bool:
         """
-        Xử lý document qua AI Service: load từ MinIO -> forward to AI Service
+        Xử lý document qua AI Service: load từ MinIO -> hash + kiểm tra MIME
+        -> dedup -> forward to AI Service
         AI Service sẽ xử lý: split -> embed -> lưu Qdrant
         Backend chỉ lưu chunks vào PostgreSQL
         
@@ -71,13 +91,15 @@ class AIService:
             db: Database session
         
         Returns:
-            bool: True nếu xử lý thành công
+            bool: True nếu xử lý thành công, False nếu nội dung file không khớp type
         
         Raises:
             Exception: Nếu xử lý thất bại
         """
         import asyncio
         
+        document = None
+        
         try:
             # 1. Lấy document từ database
             document = db.query(Document).filter(Document.id == document_id).first()
@@ -89,10 +111,30 @@ class AIService:
             db.commit()
             
             # 2. Download file từ MinIO
-            object_name = document.file_path.split("/", 1)[1]  # Remove bucket name
-            file_data = minio_service.download_file(object_name)
+            file_data = minio_service.download_file(document.object_name)
+            
+            # 3. Hash + MIME thật từ magic bytes (Content-Type do client tự khai)
+            document.content_hash = hashlib.sha256(file_data).hexdigest()
+            document.mime_sniffed = sniff_document_mime(file_data[:MIME_SNIFF_HEADER_SIZE])
+            if not is_sniffed_mime_allowed(document.file_type, document.mime_sniffed):
+                document.processing_status = "invalid"
+                db.commit()
+                logger.warning(
+                    "document content does not match declared type",
+                    extra={
+                        "document_id": str(document_id),
+                        "file_type": document.file_type,
+                        "mime_sniffed": document.mime_sniffed,
+                    },
+                )
+                return False
+            
+            # 4. Dedup trong cùng user: file đã xử lý -> dùng lại vectors/chunks
+            if self._reuse_processed_duplicate(document, db):
+                logger.info("document deduplicated", extra={"document_id": str(document_id)})
+                return True
             
-            # 3. Forward to AI Service for processing
+            # 5. Forward to AI Service for processing
             result = asyncio.run(self._process_document_async(
                 file_data=file_data,
                 file_name=document.file_name,
@@ -109,52 +151,120 @@ class AIService:
             if not result["success"]:
                 raise Exception(result.get("message", "AI Service processing failed"))
             
-            # 4. Lưu chunks và embeddings vào PostgreSQL
+            # 6. Lưu chunks và embeddings vào PostgreSQL
+            # COPY thay cho INSERT: mỗi bảng một lệnh stream CSV, cùng transaction
+            # với cập nhật trạng thái document bên dưới (một COMMIT)
             chunks_data = result.get("chunks", [])
             if chunks_data:
-                from models.documents import DocumentChunk, DocumentEmbedding
+                copy_rows(
+                    db,
+                    DocumentChunk.__tablename__,
+                    ("id", "document_id", "chunk_index", "chunk_text", "chunk_metadata", "token_count"),
+                    (
+                        (
+                            chunk_data["chunk_id"],
+                            document_id,
+                            chunk_data["chunk_index"],
+                            chunk_data["chunk_text"],
+                            chunk_data.get("chunk_metadata", {}),
+                            chunk_data["token_count"],
+                        )
+                        for chunk_data in chunks_data
+                    ),
+                )
                 
-                for chunk_data in chunks_data:
-                    # Create DocumentChunk
-                    chunk = DocumentChunk(
-                        id=chunk_data["chunk_id"],
-                        document_id=document_id,
-                        chunk_index=chunk_data["chunk_index"],
-                        chunk_text=chunk_data["chunk_text"],
-                        chunk_metadata=chunk_data.get("chunk_metadata", {}),
-                        token_count=chunk_data["token_count"]
-                    )
-                    db.add(chunk)
-                    
-                    # Create DocumentEmbedding (metadata only)
-                    embedding = DocumentEmbedding(
-                        chunk_id=chunk_data["chunk_id"],
-                        document_id=document_id,
-                        qdrant_point_id=chunk_data["chunk_id"],  # Same as chunk_id
-                        embedding_model="embed-multilingual-v3.0",
-                        vector_dimension=1024
-                    )
-                    db.add(embedding)
+                # DocumentEmbedding chỉ lưu metadata (vector nằm ở Qdrant)
+                copy_rows(
+                    db,
+                    DocumentEmbedding.__tablename__,
+                    ("chunk_id", "document_id", "qdrant_point_id", "embedding_model", "vector_dimension"),
+                    (
+                        (
+                            chunk_data["chunk_id"],
+                            document_id,
+                            chunk_data["chunk_id"],  # Same as chunk_id
+                            "embed-multilingual-v3.0",
+                            1024,
+                        )
+                        for chunk_data in chunks_data
+                    ),
+                )
                 
-                print(f"✅ Saved {len(chunks_data)} chunks to PostgreSQL")
+                logger.info(
+                    "saved document chunks",
+                    extra={"document_id": str(document_id), "chunk_count": len(chunks_data)},
+                )
             
             # Update document status
             document.is_processed = True
             document.processing_status = "completed"
             db.commit()
             
-            print(f"✅ Document {document_id} processed successfully via AI Service")
+            logger.info("document processed", extra={"document_id": str(document_id)})
             return True
         
         except Exception as e:
+            # Bỏ chunks chưa commit để lần retry không bị trùng khóa
+            db.rollback()
+            
             # Update status to failed
             if document:
                 document.processing_status = "failed"
                 db.commit()
             
-            print(f"❌ Document processing error: {e}")
+            logger.exception("document processing failed", extra={"document_id": str(document_id)})
+            # MinIO (urllib3) / Postgres mất kết nối -> task retry; lỗi còn lại là vĩnh viễn
+            if isinstance(e, (TransientProcessingError, OperationalError, Urllib3HTTPError)):
+                raise TransientProcessingError(f"Document processing failed: {e}") from e
             raise Exception(f"Document processing failed: {e}")
     
+    def _reuse_processed_duplicate(self, document: Document, db: Session) -> bool:
+        """
+        Trỏ document về bản đã xử lý có cùng content_hash của user (nếu có)
+        
+        Document dùng chung canonical vectors và object MinIO của bản cũ, object
+        vừa upload bị xóa. Ảnh luôn xử lý riêng để mỗi upload có document_id
+        riêng khi trích dẫn nguồn.
+        
+        Args:
+            document: Document vừa hash xong
+            db: Database session
+        
+        Returns:
+            True nếu đã dedup (không cần gọi AI Service)
+        """
+        if (document.file_type or "").startswith("image/") or (document.mime_sniffed or "").startswith("image/"):
+            return False
+        
+        existing = db.execute(
+            select(Document).where(
+                Document.user_id == document.user_id,
+                Document.content_hash == document.content_hash,
+                Document.id != document.id,
+                Document.is_processed == True,
+                Document.processing_status == "completed"
+            ).order_by(Document.created_at.asc()).limit(1)
+        ).scalar_one_or_none()
+        if existing is None:
+            return False
+        
+        uploaded_object = document.object_name
+        document.canonical_document_id = existing.canonical_document_id or existing.id
+        document.file_path = existing.file_path
+        document.object_name = existing.object_name
+        document.is_processed = True
+        document.processing_status = "completed"
+        db.commit()
+        
+        try:
+            minio_service.delete_file(uploaded_object)
+        except Exception:
+            logger.exception(
+                "failed to delete duplicate upload",
+                extra={"document_id": str(document.id), "object_name": uploaded_object},
+            )
+        return True
+    
     async def _process_document_async(
         self,
         file_data: bytes,
@@ -189,6 +299,15 @@ class AIService:
                 response.raise_for_status()
                 return response.json()
         
+        except httpx.TransportError as e:
+            raise TransientProcessingError(f"AI Service unreachable: {e}") from e
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in RETRYABLE_STATUS_CODES:
+                raise TransientProcessingError(f"AI Service unavailable: {e}") from e
+            return {
+                "success": False,
+                "message": f"AI Service request failed: {e}"
+            }
         except Exception as e:
             return {
                 "success": False,
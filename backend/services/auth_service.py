@@ -2,13 +2,16 @@
 Authentication Service - Business Logic Layer
 Xử lý các nghiệp vụ liên quan đến authentication: register, login, logout, etc.
 """
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime, timezone
-from typing import Dict, Optional
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional
+from uuid import UUID
 from fastapi import HTTPException, status
 
+from core.cache import cache_manager, user_cache_key
 from models.users import User
-from utils.password import hash_password, verify_password
+from utils.password import hash_password_async, verify_password_async
 from utils.validators import is_valid_email, is_valid_username, sanitize_string
 from services.token_service import token_service
 from services.user_presence import user_presence
@@ -16,19 +19,60 @@ from core.config import settings
 from schemas.jwt import create_jwt_user_data
 
 
+AUTH_USER_CACHE_TTL = 300  # Tối đa 5 phút, không vượt quá hạn của token
+AUTH_USER_CACHE_EXCLUDED = {"password_hash"}  # Không đưa secret lên Redis
+
+
+def _auth_user_cache_key(user_id: Any) -> str:
+    return f"auth:user:{user_id}"
+
+
+def _user_to_cache(user: User) -> Dict[str, Any]:
+    data = {}
+    for column in User.__table__.columns:
+        if column.key in AUTH_USER_CACHE_EXCLUDED:
+            continue
+        value = getattr(user, column.key)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, UUID):
+            value = str(value)
+        data[column.key] = value
+    return data
+
+
+def _user_from_cache(data: Dict[str, Any]) -> User:
+    """Dựng lại User (transient, chỉ có các cột) từ payload cache"""
+    values = {}
+    for column in User.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None:
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is UUID:
+                value = UUID(value)
+        values[column.key] = value
+    return User(**values)
+
+
 class AuthService:
     """
     Service xử lý business logic cho authentication
     """
     
     @staticmethod
-    async def get_current_user_from_token(token: str, db: Session) -> User:
+    async def get_current_user_from_token(token: str, db: AsyncSession) -> User:
         """
         Lấy thông tin user từ JWT token
         
         Args:
             token: JWT access token
-            db: Database session
+            db: Async database session (không block event loop khi cache miss)
         
         Returns:
             User object
@@ -64,8 +108,21 @@ class AuthService:
                 detail="Authentication service temporarily unavailable"
             )
         
-        # Get user from database
-        user = db.query(User).filter(User.id == payload.get("user_id")).first()
+        # Get user từ Redis cache (fail-open), miss thì query database
+        user_id = payload.get("user_id")
+        cache_key = _auth_user_cache_key(user_id)
+        cached = await cache_manager.get_json(cache_key)
+        if cached is not None:
+            user = _user_from_cache(cached)
+        else:
+            user = await db.get(User, UUID(user_id)) if user_id else None
+            if user:
+                ttl = AUTH_USER_CACHE_TTL
+                if payload.get("exp"):
+                    ttl = min(ttl, int(payload["exp"] - datetime.now(timezone.utc).timestamp()))
+                if ttl > 0:
+                    await cache_manager.set_json(cache_key, _user_to_cache(user), ttl)
+        
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -75,7 +132,17 @@ class AuthService:
         return user
     
     @staticmethod
-    def register_user(
+    async def invalidate_user_cache(user_id: Any) -> None:
+        """
+        Xóa User đã cache (auth + public profile) khi profile/role/trạng thái thay đổi
+        
+        Args:
+            user_id: ID của user
+        """
+        await cache_manager.delete(_auth_user_cache_key(user_id), user_cache_key(user_id))
+    
+    @staticmethod
+    async def register_user(
         email: str,
         username: str,
         password: str,
@@ -145,14 +212,14 @@ class AuthService:
             )
         
         # Xác định role: admin nếu email trong ADMIN_EMAIL, còn lại là user
-        admin_emails = settings.get_admin_emails()
+        admin_emails = settings.admin_emails_list
         user_role = "admin" if email in admin_emails else "user"
         
         # Tạo user mới
         new_user = User(
             email=email,
             username=username,
-            password_hash=hash_password(password),
+            password_hash=await hash_password_async(password),
             full_name=full_name,
             student_id=student_id,
             is_verified=False,
@@ -203,7 +270,7 @@ class AuthService:
             )
         
         # Kiểm tra password
-        if not verify_password(password, user.password_hash):
+        if not await verify_password_async(password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
@@ -220,6 +287,7 @@ class AuthService:
         user.last_login_at = datetime.now(timezone.utc)
         db.commit()
         db.refresh(user)
+        await AuthService.invalidate_user_cache(user.id)
         
         # Tạo token pair và store mapping trong Redis
         tokens = await token_service.create_token_pair(
@@ -258,16 +326,16 @@ class AuthService:
         try:
             from core.redis import redis_blacklist
             
+            # Token còn hạn cần blacklist - ghi chung một pipeline ở cuối
+            revoked = []
+            
             # Blacklist access_token nếu còn hạn
             try:
                 access_payload = token_service.verify_token(access_token, token_type="access")
-                access_expires_at = datetime.fromtimestamp(access_payload["exp"], tz=timezone.utc)
-                await token_service.blacklist_token(access_token, access_expires_at)
-                print("✅ Access token blacklisted")
+                revoked.append((access_token, datetime.fromtimestamp(access_payload["exp"], tz=timezone.utc)))
             except HTTPException:
                 # Token hết hạn hoặc invalid - không cần blacklist
                 print("⚠️ Access token expired/invalid - skip blacklist")
-                pass
             
             # TỰ động lấy refresh_token từ Redis mapping
             refresh_token = await redis_blacklist.get_refresh_token(access_token)
@@ -276,18 +344,20 @@ class AuthService:
                 # Blacklist refresh_token nếu còn hạn
                 try:
                     refresh_payload = token_service.verify_token(refresh_token, token_type="refresh")
-                    refresh_expires_at = datetime.fromtimestamp(refresh_payload["exp"], tz=timezone.utc)
-                    await token_service.blacklist_token(refresh_token, refresh_expires_at)
-                    print("✅ Refresh token blacklisted")
+                    revoked.append((refresh_token, datetime.fromtimestamp(refresh_payload["exp"], tz=timezone.utc)))
                 except HTTPException:
                     # Token hết hạn hoặc invalid - không cần blacklist
                     print("⚠️ Refresh token expired/invalid - skip blacklist")
-                    pass
             else:
                 print("⚠️ No refresh token found in mapping")
             
-            # Đánh dấu user offline
+            # SETEX access + refresh và xóa mapping token_pair: 1 round-trip
+            await token_service.revoke_tokens(revoked, access_token=access_token)
+            print(f"✅ {len(revoked)} token(s) blacklisted")
+            
+            # Đánh dấu user offline + bỏ User đã cache
             await user_presence.mark_user_offline(user_id)
+            await AuthService.invalidate_user_cache(user_id)
             
             return True
         except Exception as e:
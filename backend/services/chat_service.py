@@ -2,7 +2,9 @@
 Chat Service - Business Logic Layer
 Xử lý các nghiệp vụ liên quan đến chat: sessions, messages, feedback
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
 from typing import List, Optional
 from uuid import UUID
 from fastapi import HTTPException, status
@@ -17,13 +19,13 @@ class ChatService:
     """
     
     @staticmethod
-    def create_chat_session(
-        user_id: str,
+    async def create_chat_session(
+        user_id: UUID,
         title: str,
         session_type: str,
         context_documents: List[str],
         model_name: str,
-        db: Session
+        db: AsyncSession
     ) -> ChatSession:
         """
         Tạo chat session mới
@@ -48,15 +50,15 @@ class ChatService:
         )
         
         db.add(new_session)
-        db.commit()
-        db.refresh(new_session)
+        await db.commit()
+        await db.refresh(new_session)
         
         return new_session
     
     @staticmethod
-    def get_user_chat_sessions(
-        user_id: str,
-        db: Session,
+    async def get_user_chat_sessions(
+        user_id: UUID,
+        db: AsyncSession,
         skip: int = 0,
         limit: int = 10
     ) -> List[ChatSession]:
@@ -72,20 +74,29 @@ class ChatService:
         Returns:
             List of ChatSession objects
         """
-        sessions = db.query(ChatSession).filter(
-            ChatSession.user_id == user_id
-        ).order_by(ChatSession.updated_at.desc()).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(ChatSession)
+            .where(ChatSession.user_id == user_id)
+            .order_by(ChatSession.updated_at.desc())
+            .offset(skip)
+            .limit(limit)
+        )
         
-        return sessions
+        return result.scalars().all()
     
     @staticmethod
-    def get_chat_session_by_id(
+    async def get_chat_session_by_id(
         session_id: UUID,
-        user_id: str,
-        db: Session
+        user_id: UUID,
+        db: AsyncSession
     ) -> ChatSession:
         """
-        Lấy chi tiết chat session
+        Lấy chi tiết chat session (kèm messages)
+        
+        Messages được eager load bằng một SELECT ... IN (1 + 1 query), các
+        relationship khác bị raiseload để không phát sinh lazy load ngầm.
+        Session có rất nhiều messages nên dùng get_session_messages (phân trang)
+        thay vì nhúng toàn bộ vào response.
         
         Args:
             session_id: ID của session
@@ -96,11 +107,14 @@ class ChatService:
             ChatSession object
         
         Raises:
-            HTTPException: Nếu session không tồn tại hoặc user không có quyền
+            HTTPException: 404 nếu session không tồn tại hoặc không thuộc user
         """
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id
-        ).first()
+        result = await db.execute(
+            select(ChatSession)
+            .where(ChatSession.id == session_id, ChatSession.user_id == user_id)
+            .options(selectinload(ChatSession.messages), raiseload("*"))
+        )
+        session = result.scalar_one_or_none()
         
         if not session:
             raise HTTPException(
@@ -108,25 +122,23 @@ class ChatService:
                 detail="Chat session not found"
             )
         
-        if session.user_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to access this session"
-            )
-        
         return session
     
     @staticmethod
-    def update_chat_session_title(
+    async def update_chat_session_title(
         session_id: UUID,
-        user_id: str,
+        user_id: UUID,
         title: str,
-        db: Session
+        db: AsyncSession
     ) -> ChatSession:
         """Cập nhật tiêu đề session"""
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id
-        ).first()
+        result = await db.execute(
+            select(ChatSession).where(
+                ChatSession.id == session_id,
+                ChatSession.user_id == user_id
+            )
+        )
+        session = result.scalar_one_or_none()
         
         if not session:
             raise HTTPException(
@@ -134,25 +146,19 @@ class ChatService:
                 detail="Chat session not found"
             )
         
-        if session.user_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to modify this session"
-            )
-        
         session.title = title
-        db.commit()
-        db.refresh(session)
+        await db.commit()
+        await db.refresh(session)
         
         return session
     
     @staticmethod
-    def create_chat_message(
+    async def create_chat_message(
         session_id: UUID,
-        user_id: str,
+        user_id: UUID,
         content: str,
         retrieved_chunks: List[dict],
-        db: Session
+        db: AsyncSession
     ) -> ChatMessage:
         """
         Tạo message mới trong session
@@ -168,12 +174,16 @@ class ChatService:
             ChatMessage object mới
         
         Raises:
-            HTTPException: Nếu session không tồn tại hoặc user không có quyền
+            HTTPException: 404 nếu session không tồn tại hoặc không thuộc user
         """
         # Kiểm tra session tồn tại và user có quyền
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id
-        ).first()
+        result = await db.execute(
+            select(ChatSession).where(
+                ChatSession.id == session_id,
+                ChatSession.user_id == user_id
+            )
+        )
+        session = result.scalar_one_or_none()
         
         if not session:
             raise HTTPException(
@@ -181,12 +191,6 @@ class ChatService:
                 detail="Chat session not found"
             )
         
-        if session.user_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to send messages to this session"
-            )
-        
         # Tạo message
         new_message = ChatMessage(
             session_id=session_id,
@@ -196,21 +200,18 @@ class ChatService:
             retrieved_chunks=retrieved_chunks or []
         )
         
+        # message_count được trigger trên chat_messages tăng trong cùng transaction
         db.add(new_message)
-        
-        # Cập nhật message count
-        session.message_count += 1
-        
-        db.commit()
-        db.refresh(new_message)
+        await db.commit()
+        await db.refresh(new_message)
         
         return new_message
     
     @staticmethod
-    def get_session_messages(
+    async def get_session_messages(
         session_id: UUID,
-        user_id: str,
-        db: Session,
+        user_id: UUID,
+        db: AsyncSession,
         skip: int = 0,
         limit: int = 50
     ) -> List[ChatMessage]:
@@ -228,11 +229,15 @@ class ChatService:
             List of ChatMessage objects
         
         Raises:
-            HTTPException: Nếu session không tồn tại hoặc user không có quyền
+            HTTPException: 404 nếu session không tồn tại hoặc không thuộc user
         """
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id
-        ).first()
+        result = await db.execute(
+            select(ChatSession).where(
+                ChatSession.id == session_id,
+                ChatSession.user_id == user_id
+            )
+        )
+        session = result.scalar_one_or_none()
         
         if not session:
             raise HTTPException(
@@ -240,27 +245,25 @@ class ChatService:
                 detail="Chat session not found"
             )
         
-        if session.user_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to view this session"
-            )
-        
-        messages = db.query(ChatMessage).filter(
-            ChatMessage.session_id == session_id
-        ).order_by(ChatMessage.created_at.asc()).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.asc())
+            .offset(skip)
+            .limit(limit)
+        )
         
-        return messages
+        return result.scalars().all()
     
     @staticmethod
-    def create_or_update_message_feedback(
+    async def create_or_update_message_feedback(
         message_id: UUID,
-        user_id: str,
+        user_id: UUID,
         rating: Optional[int],
         is_helpful: Optional[bool],
         comment: Optional[str],
         feedback_type: Optional[str],
-        db: Session
+        db: AsyncSession
     ) -> MessageFeedback:
         """
         Tạo hoặc cập nhật feedback cho message
@@ -278,11 +281,14 @@ class ChatService:
             MessageFeedback object
         
         Raises:
-            HTTPException: Nếu message không tồn tại hoặc user không có quyền
+            HTTPException: 404 nếu message không tồn tại hoặc không thuộc user
         """
-        message = db.query(ChatMessage).filter(
-            ChatMessage.id == message_id
-        ).first()
+        result = await db.execute(
+            select(ChatMessage)
+            .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+            .where(ChatMessage.id == message_id, ChatSession.user_id == user_id)
+        )
+        message = result.scalar_one_or_none()
         
         if not message:
             raise HTTPException(
@@ -290,16 +296,11 @@ class ChatService:
                 detail="Message not found"
             )
         
-        if message.user_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to send feedback for this message"
-            )
-        
         # Kiểm tra feedback đã tồn tại
-        feedback = db.query(MessageFeedback).filter(
-            MessageFeedback.message_id == message_id
-        ).first()
+        result = await db.execute(
+            select(MessageFeedback).where(MessageFeedback.message_id == message_id)
+        )
+        feedback = result.scalar_one_or_none()
         
         if not feedback:
             feedback = MessageFeedback(message_id=message_id)
@@ -315,16 +316,16 @@ class ChatService:
         if feedback_type is not None:
             feedback.feedback_type = feedback_type
         
-        db.commit()
-        db.refresh(feedback)
+        await db.commit()
+        await db.refresh(feedback)
         
         return feedback
     
     @staticmethod
-    def delete_chat_session(
+    async def delete_chat_session(
         session_id: UUID,
-        user_id: str,
-        db: Session
+        user_id: UUID,
+        db: AsyncSession
     ) -> bool:
         """
         Xóa chat session
@@ -338,11 +339,15 @@ class ChatService:
             True nếu xóa thành công
         
         Raises:
-            HTTPException: Nếu session không tồn tại hoặc user không có quyền
+            HTTPException: 404 nếu session không tồn tại hoặc không thuộc user
         """
-        session = db.query(ChatSession).filter(
-            ChatSession.id == session_id
-        ).first()
+        result = await db.execute(
+            select(ChatSession).where(
+                ChatSession.id == session_id,
+                ChatSession.user_id == user_id
+            )
+        )
+        session = result.scalar_one_or_none()
         
         if not session:
             raise HTTPException(
@@ -350,14 +355,8 @@ class ChatService:
                 detail="Chat session not found"
             )
         
-        if session.user_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to delete this session"
-            )
-        
-        db.delete(session)
-        db.commit()
+        await db.delete(session)
+        await db.commit()
         
         return True
 
@@ -44,8 +44,7 @@ class GroupService:
             group_type=group_type,
             is_public=is_public,
             description=description,
-            created_by=creator_id,
-            member_count=1
+            created_by=creator_id
         )
         
         db.add(new_group)
@@ -268,9 +267,8 @@ class GroupService:
             role="member"
         )
         
+        # member_count được trigger trên group_members tăng trong cùng transaction
         db.add(new_member)
-        group.member_count += 1
-        
         db.commit()
         db.refresh(new_member)
         
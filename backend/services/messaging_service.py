@@ -4,6 +4,7 @@ Xử lý tin nhắn trực tiếp, nhóm, kết bạn, tìm kiếm người dùn
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_, func, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, timezone
@@ -25,24 +26,30 @@ class MessagingService:
     @staticmethod
     def get_or_create_conversation(user_id: str, other_user_id: str, db: Session) -> Conversation:
         """Lấy hoặc tạo conversation giữa 2 người"""
-        convo = db.query(Conversation).filter(
-            or_(
-                and_(Conversation.participant_1 == user_id, Conversation.participant_2 == other_user_id),
-                and_(Conversation.participant_1 == other_user_id, Conversation.participant_2 == user_id),
-            )
-        ).first()
+        # Cặp luôn lưu theo thứ tự UUID tăng dần (ck_conversations_participants_sorted)
+        participant_1, participant_2 = sorted((UUID(str(user_id)), UUID(str(other_user_id))))
+        pair_filter = and_(
+            Conversation.participant_1 == participant_1,
+            Conversation.participant_2 == participant_2,
+        )
 
-        if not convo:
-            convo = Conversation(
-                participant_1=user_id,
-                participant_2=other_user_id,
+        convo = db.query(Conversation).filter(pair_filter).first()
+        if convo:
+            return convo
+
+        # ON CONFLICT DO NOTHING: request song song tạo cùng cặp không sinh bản trùng
+        db.execute(
+            pg_insert(Conversation)
+            .values(
+                participant_1=participant_1,
+                participant_2=participant_2,
                 last_message_at=datetime.now(timezone.utc),
             )
-            db.add(convo)
-            db.commit()
-            db.refresh(convo)
+            .on_conflict_do_nothing(index_elements=[Conversation.participant_1, Conversation.participant_2])
+        )
+        db.commit()
 
-        return convo
+        return db.query(Conversation).filter(pair_filter).one()
 
     @staticmethod
     def get_user_conversations(user_id: str, db: Session) -> list:
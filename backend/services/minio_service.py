@@ -3,15 +3,29 @@ MinIO Service - Business Logic Layer
 Xử lý các nghiệp vụ liên quan đến object storage: upload, download, delete files
 """
 from minio.error import S3Error
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Iterator, Optional
 from datetime import timedelta
+from io import BytesIO
 import uuid
 import os
 
-from core.minio import minio_client
+from core.minio import get_minio_client
 from core.config import settings
 
 
+# Part nhỏ (< 8 MiB) làm multipart chậm hẳn - MinIO cũng chỉ nhận >= 5 MiB
+MIN_UPLOAD_PART_SIZE = 8 * 1024 * 1024
+UPLOAD_PART_SIZE = max(settings.MINIO_PART_SIZE, MIN_UPLOAD_PART_SIZE)
+UPLOAD_THREADS = max(settings.MINIO_UPLOAD_THREADS, 1)
+
+# Kích thước chunk khi stream object từ MinIO về client
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Thời hạn presigned URL: client upload/download thẳng với MinIO
+PRESIGNED_UPLOAD_EXPIRES = timedelta(minutes=15)
+PRESIGNED_DOWNLOAD_EXPIRES = timedelta(minutes=10)
+
+
 class MinIOService:
     """
     Service xử lý business logic cho MinIO object storage
@@ -19,20 +33,22 @@ class MinIOService:
     
     @staticmethod
     def upload_file(
-        file_data: bytes,
+        file_obj: BinaryIO,
         file_name: str,
         content_type: str,
         user_id: str,
+        length: int = -1,
         bucket_name: str = None
     ) -> dict:
         """
-        Upload file lên MinIO
+        Upload file lên MinIO (stream từ file object, không đọc hết vào RAM)
         
         Args:
-            file_data: File binary data (bytes)
+            file_obj: File object đọc được (vd: UploadFile.file)
             file_name: Tên file gốc
             content_type: MIME type của file
             user_id: ID của user (để tạo folder structure)
+            length: Kích thước file (bytes), -1 nếu chưa biết (multipart theo part_size)
             bucket_name: Tên bucket (mặc định lấy từ settings)
         
         Returns:
@@ -47,36 +63,64 @@ class MinIOService:
             Exception: Nếu upload thất bại
         """
         bucket = bucket_name or settings.MINIO_BUCKET_NAME
+        object_name = MinIOService.new_object_name(file_name, user_id)
         
-        try:
-            # Tạo object name với structure: user_id/uuid_filename
-            file_extension = os.path.splitext(file_name)[1]
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
-            object_name = f"{user_id}/{unique_filename}"
-            
-            # Convert bytes to BytesIO for MinIO
-            from io import BytesIO
-            file_io = BytesIO(file_data)
-            file_size = len(file_data)
-            
-            # Upload to MinIO
-            minio_client.client.put_object(
-                bucket_name=bucket,
-                object_name=object_name,
-                data=file_io,
-                length=file_size,
-                content_type=content_type
-            )
-            
-            return {
-                "object_name": object_name,
-                "file_path": f"{bucket}/{object_name}",
-                "bucket": bucket,
-                "size": file_size
-            }
+        file_size = MinIOService._put_stream(bucket, object_name, file_obj, length, content_type)
         
-        except S3Error as e:
-            raise Exception(f"MinIO upload error: {e}")
+        return {
+            "object_name": object_name,
+            "file_path": f"{bucket}/{object_name}",
+            "bucket": bucket,
+            "size": file_size
+        }
+    
+    @staticmethod
+    def new_object_name(file_name: str, user_id: str) -> str:
+        """
+        Tạo object name mới với structure: user_id/uuid_filename
+        
+        Args:
+            file_name: Tên file gốc (chỉ lấy extension)
+            user_id: ID của user
+        
+        Returns:
+            str: Object name trong bucket
+        """
+        file_extension = os.path.splitext(file_name)[1]
+        return f"{user_id}/{uuid.uuid4()}{file_extension}"
+    
+    @staticmethod
+    def upload_fileobj(
+        file_obj: BinaryIO,
+        object_name: str,
+        content_type: str,
+        length: int = -1,
+        bucket_name: str = None
+    ) -> str:
+        """
+        Upload file object lên MinIO với object name cố định và trả về URL public
+        
+        Args:
+            file_obj: File object đọc được (vd: UploadFile.file)
+            object_name: Tên object trong MinIO (vd: avatars/user_id.jpg)
+            content_type: MIME type của file
+            length: Kích thước file (bytes), -1 nếu chưa biết
+            bucket_name: Tên bucket (mặc định lấy từ settings)
+        
+        Returns:
+            str: Public URL của file
+        
+        Raises:
+            Exception: Nếu upload thất bại
+        """
+        bucket = bucket_name or settings.MINIO_BUCKET_NAME
+        
+        MinIOService._put_stream(bucket, object_name, file_obj, length, content_type)
+        
+        # Return public URL
+        # Format: http://minio:9000/bucket/object_name
+        minio_url = settings.MINIO_URL.rstrip('/')
+        return f"{minio_url}/{bucket}/{object_name}"
     
     @staticmethod
     def upload_file_bytes(
@@ -100,30 +144,45 @@ class MinIOService:
         Raises:
             Exception: Nếu upload thất bại
         """
-        bucket = bucket_name or settings.MINIO_BUCKET_NAME
+        return MinIOService.upload_fileobj(
+            file_obj=BytesIO(file_content),
+            object_name=object_name,
+            content_type=content_type,
+            length=len(file_content),
+            bucket_name=bucket_name
+        )
+    
+    @staticmethod
+    def _put_stream(
+        bucket: str,
+        object_name: str,
+        file_obj: BinaryIO,
+        length: int,
+        content_type: str
+    ) -> int:
+        """
+        put_object từ stream - SDK tự chia multipart theo UPLOAD_PART_SIZE và
+        upload UPLOAD_THREADS part song song (ThreadPool của SDK)
+        
+        Returns:
+            int: Số bytes đã upload
+        """
+        start = file_obj.tell()
         
         try:
-            # Convert bytes to BytesIO for MinIO
-            from io import BytesIO
-            file_io = BytesIO(file_content)
-            file_size = len(file_content)
-            
-            # Upload to MinIO
-            minio_client.client.put_object(
+            get_minio_client().client.put_object(
                 bucket_name=bucket,
                 object_name=object_name,
-                data=file_io,
-                length=file_size,
-                content_type=content_type
+                data=file_obj,
+                length=length,
+                content_type=content_type,
+                part_size=UPLOAD_PART_SIZE,
+                num_parallel_uploads=UPLOAD_THREADS
             )
-            
-            # Return public URL
-            # Format: http://minio:9000/bucket/object_name
-            minio_url = settings.MINIO_URL.rstrip('/')
-            return f"{minio_url}/{bucket}/{object_name}"
-        
         except S3Error as e:
             raise Exception(f"MinIO upload error: {e}")
+        
+        return length if length >= 0 else file_obj.tell() - start
     
     @staticmethod
     def download_file(
@@ -146,7 +205,7 @@ class MinIOService:
         bucket = bucket_name or settings.MINIO_BUCKET_NAME
         
         try:
-            response = minio_client.client.get_object(
+            response = get_minio_client().client.get_object(
                 bucket_name=bucket,
                 object_name=object_name
             )
@@ -160,6 +219,54 @@ class MinIOService:
         except S3Error as e:
             raise Exception(f"MinIO download error: {e}")
     
+    @staticmethod
+    def open_stream(
+        object_name: str,
+        bucket_name: str = None
+    ):
+        """
+        Mở object trên MinIO dạng stream (không đọc hết vào RAM)
+        
+        Caller phải đọc qua iter_stream (tự close + release connection)
+        
+        Args:
+            object_name: Tên object trong MinIO
+            bucket_name: Tên bucket (mặc định lấy từ settings)
+        
+        Returns:
+            urllib3 HTTPResponse của get_object
+        
+        Raises:
+            Exception: Nếu mở object thất bại
+        """
+        bucket = bucket_name or settings.MINIO_BUCKET_NAME
+        
+        try:
+            return get_minio_client().client.get_object(
+                bucket_name=bucket,
+                object_name=object_name
+            )
+        except S3Error as e:
+            raise Exception(f"MinIO download error: {e}")
+    
+    @staticmethod
+    def iter_stream(response, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Đọc response của open_stream theo từng chunk, trả connection về pool khi xong
+        
+        Args:
+            response: HTTPResponse từ open_stream
+            chunk_size: Kích thước mỗi chunk (bytes)
+        
+        Yields:
+            bytes: Từng chunk dữ liệu
+        """
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+    
     @staticmethod
     def delete_file(
         object_name: str,
@@ -181,7 +288,7 @@ class MinIOService:
         bucket = bucket_name or settings.MINIO_BUCKET_NAME
         
         try:
-            minio_client.client.remove_object(
+            get_minio_client().client.remove_object(
                 bucket_name=bucket,
                 object_name=object_name
             )
@@ -190,11 +297,76 @@ class MinIOService:
         except S3Error as e:
             raise Exception(f"MinIO delete error: {e}")
     
+    @staticmethod
+    def stat_file(
+        object_name: str,
+        bucket_name: str = None
+    ) -> Optional[dict]:
+        """
+        Lấy metadata của object (không tải nội dung)
+        
+        Args:
+            object_name: Tên object trong MinIO
+            bucket_name: Tên bucket (mặc định lấy từ settings)
+        
+        Returns:
+            dict {"size": int, "content_type": str} hoặc None nếu object không tồn tại
+        
+        Raises:
+            Exception: Nếu MinIO trả lỗi khác NoSuchKey
+        """
+        bucket = bucket_name or settings.MINIO_BUCKET_NAME
+        
+        try:
+            stat = get_minio_client().client.stat_object(
+                bucket_name=bucket,
+                object_name=object_name
+            )
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise Exception(f"MinIO stat error: {e}")
+        
+        return {"size": stat.size, "content_type": stat.content_type}
+    
+    @staticmethod
+    def get_presigned_upload_url(
+        object_name: str,
+        bucket_name: str = None,
+        expires: timedelta = PRESIGNED_UPLOAD_EXPIRES
+    ) -> str:
+        """
+        Tạo presigned PUT URL để client upload thẳng lên MinIO
+        
+        Args:
+            object_name: Tên object trong MinIO
+            bucket_name: Tên bucket (mặc định lấy từ settings)
+            expires: Thời gian hết hạn của URL
+        
+        Returns:
+            str: Presigned URL (host theo MINIO_URL)
+        
+        Raises:
+            Exception: Nếu tạo URL thất bại
+        """
+        bucket = bucket_name or settings.MINIO_BUCKET_NAME
+        
+        try:
+            return get_minio_client().public_client.presigned_put_object(
+                bucket_name=bucket,
+                object_name=object_name,
+                expires=expires
+            )
+        
+        except S3Error as e:
+            raise Exception(f"MinIO presigned URL error: {e}")
+    
     @staticmethod
     def get_presigned_url(
         object_name: str,
         bucket_name: str = None,
-        expires: timedelta = timedelta(hours=1)
+        expires: timedelta = timedelta(hours=1),
+        response_headers: Optional[dict] = None
     ) -> str:
         """
         Tạo presigned URL để download file (temporary access)
@@ -203,9 +375,10 @@ class MinIOService:
             object_name: Tên object trong MinIO
             bucket_name: Tên bucket (mặc định lấy từ settings)
             expires: Thời gian hết hạn của URL
+            response_headers: Header MinIO trả về thay (vd: response-content-disposition)
         
         Returns:
-            str: Presigned URL
+            str: Presigned URL (host theo MINIO_URL)
         
         Raises:
             Exception: Nếu tạo URL thất bại
@@ -213,10 +386,11 @@ class MinIOService:
         bucket = bucket_name or settings.MINIO_BUCKET_NAME
         
         try:
-            url = minio_client.client.presigned_get_object(
+            url = get_minio_client().public_client.presigned_get_object(
                 bucket_name=bucket,
                 object_name=object_name,
-                expires=expires
+                expires=expires,
+                response_headers=response_headers
             )
             return url
         
@@ -6,7 +6,7 @@ from typing import List, Dict, Optional
 from uuid import UUID
 from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
 
-from core.qdrant import qdrant_client
+from core.qdrant import get_qdrant_client
 from core.config import settings
 
 
@@ -60,7 +60,7 @@ class QdrantService:
             ]
             
             # Upsert to Qdrant
-            qdrant_client.client.upsert(
+            get_qdrant_client().client.upsert(
                 collection_name=collection,
                 points=point_structs
             )
@@ -120,7 +120,7 @@ class QdrantService:
                 query_filter = Filter(must=must_conditions)
             
             # Search
-            search_results = qdrant_client.client.search(
+            search_results = get_qdrant_client().client.search(
                 collection_name=collection,
                 query_vector=query_vector,
                 limit=limit,
@@ -163,7 +163,7 @@ class QdrantService:
         collection = collection_name or settings.QDRANT_COLLECTION_NAME
         
         try:
-            qdrant_client.client.delete(
+            get_qdrant_client().client.delete(
                 collection_name=collection,
                 points_selector=point_ids
             )
@@ -208,7 +208,7 @@ class QdrantService:
             query_filter = Filter(must=must_conditions)
             
             # Delete
-            qdrant_client.client.delete(
+            get_qdrant_client().client.delete(
                 collection_name=collection,
                 points_selector=query_filter
             )
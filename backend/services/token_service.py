@@ -2,7 +2,7 @@
 Dịch vụ xử lý JWT Access Token và Refresh Token
 """
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union
+from typing import List, Optional, Tuple, Union
 from fastapi import HTTPException, status
 
 from core.config import settings
@@ -170,12 +170,38 @@ class TokenService:
         return await redis_blacklist.add_to_blacklist(token, ttl)
     
     @staticmethod
-    async def refresh_access_token(refresh_token: str) -> str:
+    async def revoke_tokens(
+        tokens: List[Tuple[str, datetime]],
+        access_token: Optional[str] = None
+    ) -> bool:
+        """
+        Blacklist nhiều token (vd: access + refresh khi logout) trong một round-trip
+        
+        Args:
+            tokens: Các cặp (token, thời gian hết hạn)
+            access_token: Access token cần xóa mapping token_pair
+        
+        Returns:
+            True nếu ghi thành công
+        """
+        now = datetime.now(timezone.utc)
+        return await redis_blacklist.blacklist_tokens(
+            [(token, expires_at - now) for token, expires_at in tokens],
+            drop_pair_for=access_token
+        )
+    
+    @staticmethod
+    async def refresh_access_token(
+        refresh_token: str,
+        access_token: Optional[str] = None
+    ) -> str:
         """
         Làm mới Access Token bằng Refresh Token
         
         Args:
             refresh_token: JWT refresh token
+            access_token: Access token client đang giữ (cookie) - nếu đã bị
+                revoke thì cũng từ chối, kiểm tra chung 1 lệnh Redis
         
         Returns:
             Access token mới
@@ -186,8 +212,9 @@ class TokenService:
         # Xác minh refresh token
         payload = TokenService.verify_token(refresh_token, token_type="refresh")
         
-        # Kiểm tra refresh token có bị blacklist không
-        if await TokenService.is_token_blacklisted(refresh_token):
+        # Kiểm tra refresh (+ access) token có bị blacklist không - 1 round-trip
+        tokens = [refresh_token, access_token] if access_token else [refresh_token]
+        if any(await redis_blacklist.are_blacklisted(tokens)):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Refresh token has been revoked",
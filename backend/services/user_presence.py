@@ -5,7 +5,7 @@ import redis.asyncio as redis
 from typing import Optional
 from datetime import datetime, timezone
 
-from core.config import settings
+from core.redis import get_redis_pool
 
 
 class UserPresenceManager:
@@ -22,18 +22,13 @@ class UserPresenceManager:
     
     async def connect(self):
         """
-        Kết nối tới Redis server
+        Kết nối tới Redis server (pool dùng chung của presence DB)
         """
-        self.redis_client = await redis.from_url(
-            settings.REDIS_URL,
-            db=self.presence_db,
-            encoding="utf8",
-            decode_responses=True,
-        )
+        self.redis_client = redis.Redis(connection_pool=get_redis_pool(self.presence_db))
     
     async def disconnect(self):
         """
-        Ngắt kết nối Redis
+        Ngắt kết nối Redis (pool dùng chung do close_redis_pools đóng)
         """
         if self.redis_client:
             await self.redis_client.close()
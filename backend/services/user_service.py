@@ -8,7 +8,7 @@ from fastapi import HTTPException, status
 
 from models.users import User, UserSettings
 from utils.validators import is_valid_email, sanitize_string
-from utils.password import hash_password, verify_password
+from utils.password import hash_password_async, verify_password_async
 
 
 class UserService:
@@ -158,7 +158,7 @@ class UserService:
         return settings
     
     @staticmethod
-    def change_password(
+    async def change_password(
         user_id: str,
         current_password: str,
         new_password: str,
@@ -188,14 +188,14 @@ class UserService:
             )
         
         # Verify current password
-        if not verify_password(current_password, user.password_hash):
+        if not await verify_password_async(current_password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
             )
         
         # Hash and update new password
-        user.password_hash = hash_password(new_password)
+        user.password_hash = await hash_password_async(new_password)
         db.commit()
         
         return True
@@ -0,0 +1,36 @@
+"""
+Document Tasks - xử lý document (split -> embed -> Qdrant) trên Celery worker
+"""
+from uuid import UUID
+
+from core.celery_app import celery_app
+from core.databases import SessionLocal, register_models
+from services.ai_service import TransientProcessingError, ai_service
+
+# Worker không chạy lifespan/init_db của API -> tự đăng ký mapper
+register_models()
+
+
+@celery_app.task(
+    bind=True,
+    name="documents.process",
+    # Chỉ retry lỗi tạm thời; "not found"/file sai type retry cũng không khỏi
+    autoretry_for=(TransientProcessingError,),
+    retry_backoff=True,
+    max_retries=5,
+)
+def process_document_task(self, document_id: str) -> bool:
+    """
+    Xử lý document qua AI Service với DB session riêng của worker
+    
+    Args:
+        document_id: ID của document (str để serialize JSON)
+    
+    Returns:
+        True nếu xử lý thành công
+    """
+    db = SessionLocal()
+    try:
+        return ai_service.process_document(UUID(document_id), db)
+    finally:
+        db.close()
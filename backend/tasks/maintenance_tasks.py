@@ -0,0 +1,69 @@
+"""
+Maintenance Tasks - việc định kỳ trên database (chạy qua Celery beat)
+"""
+from datetime import timedelta
+import logging
+
+from sqlalchemy import delete, func
+
+from core.celery_app import celery_app
+from core.databases import SessionLocal, engine, ensure_monthly_partitions, register_models
+from models.documents import Document
+from services.minio_service import minio_service, PRESIGNED_UPLOAD_EXPIRES
+
+# Worker không chạy lifespan/init_db của API -> tự đăng ký mapper
+register_models()
+
+logger = logging.getLogger(__name__)
+
+# Thêm thời gian sau khi presigned URL hết hạn: PUT bắt đầu sát giờ hết hạn vẫn kịp /complete
+STALE_UPLOAD_GRACE = timedelta(minutes=5)
+
+
+@celery_app.task(name="maintenance.ensure_partitions")
+def ensure_partitions_task() -> None:
+    """
+    Tạo trước partition các tháng tới (login_history, ai_usage_history)
+    
+    API chỉ tạo lúc startup - task này giữ partition đủ cho deployment chạy lâu không restart
+    """
+    with engine.begin() as conn:
+        ensure_monthly_partitions(conn)
+
+
+@celery_app.task(name="maintenance.reap_stale_uploads")
+def reap_stale_uploads_task() -> int:
+    """
+    Xóa document kẹt ở trạng thái uploading (client không PUT xong / không gọi /complete)
+    
+    Presigned URL đã hết hạn nên upload không thể hoàn tất nữa. Xóa cả object
+    (nếu client đã PUT một phần hoặc PUT xong nhưng không gọi /complete)
+    
+    Returns:
+        Số document đã xóa
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            delete(Document)
+            .where(
+                Document.processing_status == "uploading",
+                Document.created_at
+                < func.timezone("utc", func.clock_timestamp()) - (PRESIGNED_UPLOAD_EXPIRES + STALE_UPLOAD_GRACE),
+            )
+            .returning(Document.object_name)
+        )
+        object_names = [name for name in result.scalars().all() if name]
+        db.commit()
+    finally:
+        db.close()
+    
+    for object_name in object_names:
+        try:
+            minio_service.delete_file(object_name)
+        except Exception as e:
+            logger.warning("stale upload object delete failed", extra={"object_name": object_name, "error": str(e)})
+    
+    if object_names:
+        logger.info("stale uploads reaped", extra={"count": len(object_names)})
+    return len(object_names)
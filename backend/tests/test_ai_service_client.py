@@ -0,0 +1,42 @@
+"""
+Client AI Service giải nén được response zstd (ZstdMiddleware của ai-service)
+"""
+import asyncio
+
+import httpx
+import orjson
+import zstandard
+
+from core.http_client import create_ai_service_client
+
+
+# Reply >= 1 KB: ngưỡng minimum_size để ai-service nén zstd
+PAYLOAD = {"answer": "x" * 2048, "contexts": [{"chunk_text": "y" * 512, "score": 0.9}]}
+
+
+async def _ai_service_app(scope, receive, send):
+    """ASGI app trả JSON giống ai-service: nén zstd khi client gửi Accept-Encoding: zstd"""
+    accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"")
+    body = orjson.dumps(PAYLOAD)
+    headers = [(b"content-type", b"application/json")]
+    if b"zstd" in accept_encoding:
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+        headers.append((b"content-encoding", b"zstd"))
+    headers.append((b"content-length", str(len(body)).encode()))
+    
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def test_zstd_reply_round_trip():
+    async def run():
+        async with create_ai_service_client(
+            "http://ai-service",
+            transport=httpx.ASGITransport(app=_ai_service_app),
+        ) as client:
+            return await client.post("/api/rag/query", json={"question": "?"})
+    
+    response = asyncio.run(run())
+    
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.json() == PAYLOAD
@@ -1,7 +1,7 @@
 """
 Utils package initialization
 """
-from .password import hash_password, verify_password
+from .password import hash_password, verify_password, hash_password_async, verify_password_async
 from .jwt import encode_jwt, decode_jwt, get_token_expiration
 from .validators import (
     is_valid_email,
@@ -16,6 +16,8 @@ __all__ = [
     # Password utils
     "hash_password",
     "verify_password",
+    "hash_password_async",
+    "verify_password_async",
     
     # JWT utils
     "encode_jwt",
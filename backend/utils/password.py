@@ -6,10 +6,15 @@ Quy trình:
 1. Lấy password người dùng nhập (vd: !hugAfi35sg...)
 2. Hash qua SHA-256 tạo chuỗi 64 ký tự hex (luôn < 72 bytes)
 3. Đưa chuỗi 64 ký tự vào bcrypt để băm và lưu DB
+
+bcrypt (cost 12) tốn ~200ms CPU mỗi lần: route async dùng bản *_async, chạy trong
+threadpool (bcrypt nhả GIL khi băm) để không chặn event loop
 """
 import bcrypt
 import hashlib
 
+from fastapi.concurrency import run_in_threadpool
+
 
 def _prepare_password(password: str) -> bytes:
     """
@@ -91,3 +96,30 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except Exception:
         # Return False if verification fails for any reason
         return False
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    hash_password chạy trong threadpool - dùng trong route/service async
+    
+    Args:
+        password: Plain text password từ user
+    
+    Returns:
+        Bcrypt hashed string để lưu vào database
+    """
+    return await run_in_threadpool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password chạy trong threadpool - dùng trong route/service async
+    
+    Args:
+        plain_password: Password người dùng nhập khi login
+        hashed_password: Bcrypt hash từ database
+    
+    Returns:
+        True nếu password đúng, False nếu sai
+    """
+    return await run_in_threadpool(verify_password, plain_password, hashed_password)
@@ -133,3 +133,85 @@ def is_valid_uuid(uuid_string: str) -> bool:
     """
     pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
     return bool(re.match(pattern, uuid_string.lower()))
+
+
+# Magic bytes của các định dạng ảnh được chấp nhận
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_image_mime(header: bytes) -> Optional[str]:
+    """
+    Xác định MIME type ảnh thật từ các byte đầu file (không tin Content-Type của client)
+    
+    Args:
+        header: Ít nhất 12 byte đầu của file
+    
+    Returns:
+        MIME type (image/jpeg, image/png, image/gif, image/webp) hoặc None nếu không phải ảnh
+    """
+    for signature, mime in _IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+# Magic bytes của các định dạng tài liệu (docx/xlsx là file ZIP, xls là OLE2)
+_DOCUMENT_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+)
+
+# Content-Type client khai báo -> các MIME sniff được chấp nhận
+# Type không có trong bảng (text, code, heic...) không kiểm tra được bằng magic bytes
+EXPECTED_SNIFFED_MIMES = {
+    "application/pdf": {"application/pdf"},
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": {"application/zip"},
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": {"application/zip"},
+    "application/vnd.ms-excel": {"application/x-ole-storage"},
+    "image/jpeg": {"image/jpeg"},
+    "image/jpg": {"image/jpeg"},
+    "image/png": {"image/png"},
+    "image/webp": {"image/webp"},
+    "image/gif": {"image/gif"},
+}
+
+
+def sniff_document_mime(header: bytes) -> Optional[str]:
+    """
+    Xác định MIME type thật của file tài liệu/ảnh từ các byte đầu file
+    
+    Args:
+        header: Ít nhất 12 byte đầu của file
+    
+    Returns:
+        MIME type nhận ra được hoặc None (vd: file text)
+    """
+    for signature, mime in _DOCUMENT_SIGNATURES:
+        if header.startswith(signature):
+            return mime
+    return sniff_image_mime(header)
+
+
+def is_sniffed_mime_allowed(declared_type: Optional[str], sniffed_mime: Optional[str]) -> bool:
+    """
+    Kiểm tra nội dung file có khớp Content-Type client khai báo
+    
+    Args:
+        declared_type: Content-Type lúc upload
+        sniffed_mime: Kết quả sniff_document_mime
+    
+    Returns:
+        False nếu type khai báo có chữ ký đặc trưng mà nội dung không khớp
+    """
+    expected = EXPECTED_SNIFFED_MIMES.get((declared_type or "").lower())
+    if expected is None:
+        return True
+    return sniffed_mime in expected
@@ -458,7 +458,7 @@ export function AIChatPage() {
             try {
               const statuses = await documentService.checkBatchProcessingStatus(docIds)
               const allDone = statuses.every(
-                (s) => s.is_processed || s.processing_status === "failed"
+                (s) => s.is_processed || s.processing_status === "failed" || s.processing_status === "invalid"
               )
               if (allDone) break
             } catch {
@@ -11,28 +11,41 @@ export interface DocumentUploadParams {
   tags?: string[]
 }
 
+interface DocumentUploadInit {
+  document_id: string
+  upload_url: string
+  expires_in: number
+}
+
 export const documentService = {
   // List user documents
   listDocuments: async (skip = 0, limit = 10): Promise<Document[]> => {
     return api.get<Document[]>(`/api/documents?skip=${skip}&limit=${limit}`)
   },
 
-  // Upload document
+  // Upload document: file goes straight to MinIO via a presigned PUT URL,
+  // the backend only creates the record and enqueues processing
   uploadDocument: async (params: DocumentUploadParams): Promise<Document> => {
-    const formData = new FormData()
-    formData.append('file', params.file)
-    
-    if (params.title) {
-      formData.append('title', params.title)
-    }
-    if (params.category) {
-      formData.append('category', params.category)
-    }
-    if (params.tags && params.tags.length > 0) {
-      formData.append('tags', JSON.stringify(params.tags))
+    const contentType = params.file.type || 'application/octet-stream'
+    const init = await api.post<DocumentUploadInit>('/api/documents/upload/init', {
+      file_name: params.file.name,
+      content_type: contentType,
+      file_size: params.file.size,
+      title: params.title,
+      category: params.category,
+      tags: params.tags ?? [],
+    })
+
+    const uploadResponse = await fetch(init.upload_url, {
+      method: 'PUT',
+      headers: { 'Content-Type': contentType },
+      body: params.file,
+    })
+    if (!uploadResponse.ok) {
+      throw new Error('Upload failed')
     }
 
-    return api.post<Document>('/api/documents/upload', formData)
+    return api.post<Document>(`/api/documents/upload/${init.document_id}/complete`)
   },
 
   // Get document by ID
@@ -42,11 +55,10 @@ export const documentService = {
 
   // Download document
   downloadDocument: async (documentId: string): Promise<Blob> => {
-    const response = await fetch(`/api/documents/${documentId}/download`, {
-      headers: {
-        Authorization: `Bearer ${localStorage.getItem('access_token')}`,
-      },
-    })
+    const { url } = await api.get<{ url: string; expires_in: number }>(
+      `/api/documents/${documentId}/download-url`
+    )
+    const response = await fetch(url)
     
     if (!response.ok) {
       throw new Error('Download failed')